@@ -2,8 +2,12 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 
-from lib.data_loader import load_data, compute_price_to_income, cpi_pivot
-from lib.viz import line_cpi, choropleth_ratio, choropleth_income
+from lib.data_loader import data_status, load_data
+from lib.decimate import POINTS_PER_SERIES
+from lib.derived import get_ratio_df, get_cpi_wide, get_ratio_maps, get_income_maps
+from lib.viz import line_cpi, figure_for_year, plotly_chart
+
+DEFAULT_CPI_SERIES = ["CUUR0000SA0", "CUUR0000SAH"]  # all items, shelter
 
 st.set_page_config(
     page_title="Housing Affordability — CPI vs Income vs Home Prices",
@@ -16,18 +20,30 @@ st.caption("A portfolio app comparing housing costs (Redfin), incomes (ACS), and
 # ---------------- Sidebar ----------------
 with st.sidebar:
     st.header("Data Source")
-    source = st.radio("Use data from:", ["auto", "csv", "mysql"], index=0)
+    source = st.radio("Use data from:", ["auto", "csv", "sqlite", "mysql"], index=0)
+    mode = st.radio("Load mode:", ["aggregate", "stream"], index=0,
+                    help="stream folds the fact table in chunks with bounded memory.")
+    cpi_budget = st.number_input("CPI points per series", min_value=50, max_value=5_000,
+                                 value=POINTS_PER_SERIES, step=50,
+                                 help="Longer series are downsampled (LTTB) before plotting.")
     st.markdown("---")
     st.write("If housing is only at ZIP level (no county mapping yet), the app will gracefully fall back.")
     st.markdown("---")
     st.write("Tip: add DB creds & API keys in `.streamlit/secrets.toml`.")
 
 # --------------- Load & prep ---------------
-data = load_data(source)
+data = load_data(source, mode)
+status = data_status(source, mode)
+with st.sidebar:
+    if status["as_of"] is not None:
+        st.caption(f"Data as of {status['as_of']:%Y-%m-%d %H:%M:%S}"
+                   + (" · refreshing in the background…" if status["refreshing"] else ""))
+    if status["error"]:
+        st.caption(f"Last refresh failed ({status['error']}); showing the previous data.")
 acs, redfin, cpi, counties = data["acs"], data["redfin"], data["cpi"], data["counties"]
 
-ratio_df = compute_price_to_income(acs, redfin)  # may be EMPTY (no county mapping yet)
-cpi_wide = cpi_pivot(cpi)
+ratio_df = get_ratio_df(data)  # may be EMPTY (no county mapping yet)
+cpi_wide = get_cpi_wide(data)
 
 # --------------- KPIs (robust to missing ratio) ---------------
 def _safe_median(series):
@@ -35,14 +51,10 @@ def _safe_median(series):
     return float(s.median()) if not s.empty else float("nan")
 
 latest_income_year = pd.to_numeric(acs.get("year"), errors="coerce").max()
-latest_price_year = pd.to_numeric(redfin["period"].str[:4], errors="coerce").max()
+price_year = redfin["year"].to_numpy()  # integer year column added by load_data
+latest_price_year = price_year.max() if len(price_year) else float("nan")
 
-kpi_price = _safe_median(
-    redfin.loc[
-        redfin["period"].str.startswith(str(int(latest_price_year))) if pd.notna(latest_price_year) else [],
-        "median_sale_price",
-    ]
-)
+kpi_price = _safe_median(redfin["median_sale_price"][price_year == latest_price_year])
 kpi_income = _safe_median(acs.loc[acs["year"] == latest_income_year, "income_usd"])
 
 if ratio_df.empty:
@@ -55,7 +67,7 @@ else:
     latest_year = int(ratio_df["year"].max())
     kpi_ratio = _safe_median(ratio_df.loc[ratio_df["year"] == latest_year, "price_to_income"])
     # align other KPIs to the same year
-    kpi_price = _safe_median(redfin.loc[redfin["period"].str.startswith(str(latest_year)), "median_sale_price"])
+    kpi_price = _safe_median(redfin["median_sale_price"][price_year == latest_year])
     kpi_income = _safe_median(acs.loc[acs["year"] == latest_year, "income_usd"])
 
 c1, c2, c3 = st.columns(3)
@@ -65,7 +77,15 @@ c3.metric("Median Household Income", "—" if pd.isna(kpi_income) else f"${int(k
 
 # --------------- CPI chart ---------------
 st.subheader("Inflation Context — CPI Series")
-st.plotly_chart(line_cpi(cpi_wide), use_container_width=True)
+cpi_series = [c for c in cpi_wide.columns if c != "date"]
+picked = st.multiselect("CPI series", cpi_series,
+                        default=[s for s in DEFAULT_CPI_SERIES if s in cpi_series] or cpi_series[:3])
+cpi_dates = sorted(cpi_wide["date"].astype(str).unique())
+x_range = None
+if len(cpi_dates) > 1:
+    # zooming in re-decimates from full resolution, so a narrow range shows every point
+    x_range = st.select_slider("Date range", options=cpi_dates, value=(cpi_dates[0], cpi_dates[-1]))
+plotly_chart(line_cpi(cpi_wide, picked, cpi_budget, x_range), use_container_width=True)
 
 # --------------- Map (ratio if available; else income fallback) ---------------
 st.subheader("Affordability Map")
@@ -77,18 +97,14 @@ if ratio_df.empty:
         y_max = int(pd.to_numeric(acs["year"], errors="coerce").max())
         default_y = y_max if pd.notna(y_max) else y_min
         year = st.slider("Year (Income Map)", y_min, y_max, default_y, step=1)
-        acs_year = (
-            acs[acs["year"] == year]
-            .merge(counties[["county_fips", "county_name", "state"]], on="county_fips", how="left")
-        )
-        st.plotly_chart(choropleth_income(acs_year), use_container_width=True)
+        plotly_chart(figure_for_year(get_income_maps(data), year), use_container_width=True)
         st.caption("Fallback: mapping county incomes while affordability is being wired.")
 else:
     y_min = int(ratio_df["year"].min())
     y_max = int(ratio_df["year"].max())
     year = st.slider("Year (Affordability Map)", y_min, y_max, y_max, step=1)
-    st.plotly_chart(choropleth_ratio(ratio_df, counties, year), use_container_width=True)
-    st.caption("Plotly county GeoJSON requires 5-digit numeric FIPS; non-numeric IDs are ignored.")
+    plotly_chart(figure_for_year(get_ratio_maps(data), year), use_container_width=True)
+    st.caption("County shapes are local and keyed by 5-digit numeric FIPS; non-numeric IDs are ignored.")
 
 # --------------- How we compute (code explainer) ---------------
 st.markdown("---")
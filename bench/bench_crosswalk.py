@@ -0,0 +1,37 @@
+"""
+Benchmark: mapping ZIP x month housing rows to weighted county prices through lib/crosswalk.
+
+    python bench/bench_crosswalk.py              # 9M rows against the bundled sample crosswalk
+    python bench/bench_crosswalk.py 1000000 path/to/ZIP_COUNTY.csv
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from lib.crosswalk import load_crosswalk, weighted_county_prices  # noqa: E402
+
+def main(n_rows: int, path: str | None):
+    xwalk = load_crosswalk(path)
+    rng = np.random.default_rng(0)
+    periods = np.array([f"{y}-{m:02d}" for y in range(2012, 2025) for m in range(1, 13)])
+    rows = pd.DataFrame({
+        "zip_code": xwalk.zips[rng.integers(0, len(xwalk.zips), n_rows)].astype(str),
+        "period": periods[rng.integers(0, len(periods), n_rows)],
+        "median_sale_price": rng.lognormal(12.5, 0.5, n_rows).round(),
+    })
+    print(f"crosswalk: {len(xwalk.zips):,} ZIPs, {len(xwalk):,} ZIP-county pairs; input {n_rows:,} rows")
+
+    t0 = time.perf_counter()
+    row, _, _ = xwalk.lookup(rows["zip_code"].to_numpy())
+    t1 = time.perf_counter()
+    out = weighted_county_prices(rows, xwalk)
+    t2 = time.perf_counter()
+    print(f"lookup:                 {t1 - t0:7.2f} s  ({len(row):,} ZIP-county rows)")
+    print(f"weighted_county_prices: {t2 - t1:7.2f} s  ({len(out):,} county-months)")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 9_000_000, sys.argv[2] if len(sys.argv) > 2 else None)
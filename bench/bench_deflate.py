@@ -0,0 +1,64 @@
+"""
+Benchmark: real-dollar price-to-income on county-month rows, lib/deflate (dense CPI matrix, one
+gather + bincount) vs a pandas merge of the CPI series onto every row followed by groupby/merge.
+
+    python bench/bench_deflate.py              # 1M and 5M county-month rows, 20 CPI series
+    python bench/bench_deflate.py 250000       # custom sizes
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+from lib.deflate import ALL_ITEMS, CpiDeflator, real_price_to_income  # noqa: E402
+from lib.normalize import compact_frame, period_parts  # noqa: E402
+from synth_warehouse import housing_chunks, make_acs, make_counties, make_cpi  # noqa: E402
+
+def merge_baseline(redfin: pd.DataFrame, acs: pd.DataFrame, cpi: pd.DataFrame, base: str) -> pd.DataFrame:
+    s = cpi[cpi["series_id"] == ALL_ITEMS]
+    base_level = s.loc[s["date"] == base, "value"].iloc[0]
+    df = redfin.merge(s[["date", "value"]], left_on="period", right_on="date", how="left")
+    df["real_price"] = df["median_sale_price"] * base_level / df["value"]
+    yearly = df.groupby(["county_fips", "year"], as_index=False, observed=True)[["median_sale_price", "real_price"]].mean()
+    annual = s.assign(year=s["date"].str.slice(0, 4).astype(int)).groupby("year", as_index=False)["value"].mean()
+    out = yearly.merge(acs[["county_fips", "year", "income_usd"]], on=["county_fips", "year"], how="left")
+    out = out.merge(annual, on="year", how="left")
+    out["real_income"] = out["income_usd"] * base_level / out["value"]
+    out["real_price_to_income"] = (out["real_price"] / out["real_income"]).round(2)
+    return out
+
+def main(sizes):
+    cpi = make_cpi()
+    print(f"{'rows':>12} {'merge s':>9} {'deflate s':>10} {'speedup':>8} {'rebase all s':>13} {'max |diff|':>11}")
+    for n in sizes:
+        counties = make_counties(3100)
+        acs = make_acs(counties)
+        redfin = pd.concat(list(housing_chunks(counties, n)), ignore_index=True).drop(columns=["county_name", "state"])
+        redfin["year"], redfin["month"] = period_parts(redfin["period"])
+        base = cpi["date"].max()
+
+        t0 = time.perf_counter()
+        old = merge_baseline(redfin, acs, cpi, base)
+        t_merge = time.perf_counter() - t0
+
+        compact_frame(redfin)
+        t0 = time.perf_counter()
+        deflator = CpiDeflator.build(cpi)
+        new = real_price_to_income(redfin, acs, deflator, base=base)
+        t_new = time.perf_counter() - t0
+
+        # every series rebased to a new base month in one broadcast (uncached)
+        t0 = time.perf_counter()
+        deflator.factors(cpi["date"].min())
+        t_rebase = time.perf_counter() - t0
+
+        both = old.merge(new, on=["county_fips", "year"], suffixes=("_old", ""))
+        diff = (both["real_price_to_income_old"] - both["real_price_to_income"]).abs().max()
+        print(f"{n:>12,} {t_merge:>9.3f} {t_new:>10.3f} {t_merge / t_new:>7.1f}x {t_rebase:>13.5f} {diff:>11.3f}")
+        del redfin
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000_000, 5_000_000])
@@ -0,0 +1,56 @@
+"""
+Benchmark: memory of a row-level housing frame in the legacy dtypes (object strings, int64 /
+float64) vs lib/normalize.compact_frame (categorical keys, int16/int8 year/month, float32 price).
+
+    python bench/bench_dtypes.py              # 1M and 5M rows
+    python bench/bench_dtypes.py 250000       # custom sizes
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from lib.normalize import compact_frame, period_parts  # noqa: E402
+
+N_COUNTIES = 3100
+YEARS = range(2000, 2025)
+
+def synth(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Legacy shape: python-object keys, int64 year/month, float64 price."""
+    rng = np.random.default_rng(seed)
+    fips = np.array([f"{i:05d}" for i in range(1001, 1001 + N_COUNTIES)], dtype=object)
+    periods = np.array([f"{y}-{m:02d}" for y in YEARS for m in range(1, 13)], dtype=object)
+    # one python str per row, as read_csv / read_sql hand them back
+    county = [str(f) for f in fips[rng.integers(0, N_COUNTIES, n_rows)]]
+    period = [str(p) for p in periods[rng.integers(0, len(periods), n_rows)]]
+    df = pd.DataFrame({
+        "county_fips": pd.Series(county, dtype=object),
+        "period": pd.Series(period, dtype=object),
+        "median_sale_price": rng.lognormal(12.5, 0.5, n_rows).round(),
+    })
+    df["year"] = df["period"].str.slice(0, 4).astype(np.int64)
+    df["month"] = df["period"].str.slice(5, 7).astype(np.int64)
+    return df
+
+def mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True, index=False).sum() / 1e6
+
+def main(sizes):
+    print(f"{'rows':>12} {'legacy MB':>10} {'compact MB':>11} {'B/row':>12} {'compact s':>10} {'reduction':>10}")
+    for n in sizes:
+        df = synth(n)
+        before = mb(df)
+        t0 = time.perf_counter()
+        df["year"], df["month"] = period_parts(df["period"])
+        compact_frame(df)
+        elapsed = time.perf_counter() - t0
+        after = mb(df)
+        per_row = f"{before * 1e6 / n:.0f} -> {after * 1e6 / n:.0f}"
+        print(f"{n:>12,} {before:>10.1f} {after:>11.1f} {per_row:>12} {elapsed:>10.3f} {before / after:>9.1f}x")
+        del df
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000_000, 5_000_000])
@@ -0,0 +1,69 @@
+"""
+Benchmark: legacy pandas compute_price_to_income vs the vectorized engine in lib/data_loader.
+
+    python bench/bench_price_to_income.py            # 1M and 10M rows
+    python bench/bench_price_to_income.py 250000     # custom sizes
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from lib.data_loader import compute_price_to_income  # noqa: E402
+from lib.normalize import period_parts  # noqa: E402
+
+N_COUNTIES = 3100
+YEARS = range(2000, 2025)
+
+def legacy(acs: pd.DataFrame, redfin: pd.DataFrame) -> pd.DataFrame:
+    rf = redfin.copy()
+    rf["year"] = rf["period"].str.slice(0,4).astype(int)
+    yearly = (rf.groupby(["county_fips","year"], as_index=False)["median_sale_price"]
+                .mean().rename(columns={"median_sale_price":"avg_price"}))
+    out = yearly.merge(acs[["county_fips","year","income_usd"]], on=["county_fips","year"], how="left")
+    out["price_to_income"] = (out["avg_price"] / out["income_usd"]).round(2)
+    return out
+
+def synth(n_rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    fips = np.array([f"{i:05d}" for i in range(1001, 1001 + N_COUNTIES)])
+    periods = np.array([f"{y}-{m:02d}" for y in YEARS for m in range(1, 13)])
+    redfin = pd.DataFrame({
+        "county_fips": fips[rng.integers(0, N_COUNTIES, n_rows)],
+        "period": periods[rng.integers(0, len(periods), n_rows)],
+        "median_sale_price": rng.lognormal(12.5, 0.5, n_rows).round(),
+    })
+    acs = pd.DataFrame({
+        "county_fips": np.repeat(fips, len(YEARS)),
+        "year": np.tile(np.array(YEARS), N_COUNTIES),
+        "income_usd": rng.normal(70000, 15000, N_COUNTIES * len(YEARS)).round(),
+    })
+    return acs, redfin
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+def main(sizes):
+    print(f"{'rows':>12} {'legacy s':>10} {'engine s':>10} {'engine+parse s':>15} {'speedup':>8}")
+    for n in sizes:
+        acs, redfin = synth(n)
+        repeat = 3 if n <= 1_000_000 else 1
+        t_legacy = best_of(lambda: legacy(acs, redfin), repeat)
+        t_parse = best_of(lambda: compute_price_to_income(acs, redfin), repeat)
+        # load_data adds integer year/month and categorical FIPS once at load time; time the engine on that shape
+        redfin["year"], redfin["month"] = period_parts(redfin["period"])
+        redfin["county_fips"] = redfin["county_fips"].astype("category")
+        t_engine = best_of(lambda: compute_price_to_income(acs, redfin), repeat)
+        print(f"{n:>12,} {t_legacy:>10.3f} {t_engine:>10.3f} {t_parse:>15.3f} {t_legacy / t_engine:>7.1f}x")
+        del acs, redfin
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000_000, 10_000_000])
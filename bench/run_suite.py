@@ -0,0 +1,187 @@
+"""
+Benchmark suite: times and memory-profiles each pipeline stage and figure build on synthetic
+warehouses (bench/synth_warehouse.py) of increasing size, and writes the results to JSON.
+
+    python bench/run_suite.py                                   # 10k, 100k, 1M housing rows
+    python bench/run_suite.py --sizes 1000000 10000000 50000000 --repeat 1
+    python bench/run_suite.py --compare bench/results/suite-20240101-120000.json
+
+Each stage is timed on its own (best of --repeat) and then run once more under tracemalloc for
+the peak Python/numpy allocation; RSS is read after the stage. Loader stages call
+lib/data_loader._load_source directly (no source fallback, no refresher), with DATA_DIR,
+SQLITE_PATH and the snapshot directory pointed at the synthetic warehouse; "cold" stages delete
+the snapshots first. --compare prints the change per (rows, stage) against an earlier results file.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+from lib import data_loader as dl, snapshot  # noqa: E402
+from lib.catalog import clear_catalogs  # noqa: E402
+from lib.engines import dispose_all  # noqa: E402
+from lib.viz import (  # noqa: E402
+    choropleth_income_years, choropleth_ratio_years, line_cpi, line_prices, line_ratio,
+)
+from synth_warehouse import generate  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+def rss_mb() -> float | None:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def _payload_kb(out) -> float | None:
+    """Serialized JSON size of a figure or {key: figure} dict."""
+    figs = list(out.values()) if isinstance(out, dict) else [out]
+    if not figs or not hasattr(figs[0], "to_plotly_json"):
+        return None
+    return sum(len(pio.to_json(f, validate=False)) for f in figs) / 1024
+
+def measure(fn, repeat: int, setup=None, memory: bool = True) -> dict:
+    times, out = [], None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    res = {"seconds": min(times), "seconds_all": [round(t, 4) for t in times]}
+    if memory:
+        if setup:
+            setup()
+        tracemalloc.start()
+        fn()
+        res["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    res["rss_mb"] = rss_mb()
+    res["payload_kb"] = _payload_kb(out)
+    return res, out
+
+def _point_at(work: str):
+    """Point the loaders at a synthetic warehouse and forget everything cached for the previous one."""
+    dl.DATA_DIR = work
+    dl.SQLITE_PATH = os.path.join(work, "sample_dw.sqlite")
+    snapshot.SNAPSHOT_DIR = os.path.join(work, "snapshots")
+    dl.read_csv.clear()
+    clear_catalogs()
+    dispose_all()
+
+def _no_snapshots():
+    shutil.rmtree(snapshot.SNAPSHOT_DIR, ignore_errors=True)
+
+def run_size(rows: int, repeat: int, memory: bool, work: str) -> list:
+    results = []
+
+    def record(stage, fn, setup=None, **extra):
+        res, out = measure(fn, repeat, setup, memory)
+        results.append({"rows": rows, "stage": stage, **res, **extra})
+        kb = f"{res['payload_kb']:9.1f} KB" if res["payload_kb"] is not None else ""
+        peak = f"{res['peak_mb']:9.1f} MB peak" if memory else ""
+        print(f"{rows:>12,} {stage:<28} {res['seconds']:9.3f}s {peak} {kb}", flush=True)
+        return out
+
+    t0 = time.perf_counter()
+    info = generate(work, rows)
+    results.append({"rows": rows, "stage": "generate", "seconds": time.perf_counter() - t0,
+                    "counties": info["counties"], "rss_mb": rss_mb()})
+    print(f"{rows:>12,} {'generate':<28} {results[-1]['seconds']:9.3f}s  ({info['counties']:,} counties)", flush=True)
+    _point_at(work)
+
+    record("load csv aggregate (cold)", lambda: dl._load_source("csv", "aggregate", "full"), _no_snapshots)
+    record("load csv aggregate (snap)", lambda: dl._load_source("csv", "aggregate", "full"))
+    agg = record("load sqlite aggregate (cold)", lambda: dl._load_source("sqlite", "aggregate", "full"), _no_snapshots)
+    record("load sqlite stream (cold)", lambda: dl._load_source("sqlite", "stream", "full"), _no_snapshots)
+    raw = record("load sqlite raw (cold)", lambda: dl._load_source("sqlite", "raw", "full"), _no_snapshots)
+
+    ratio = record("compute_price_to_income raw",
+                   lambda: dl.compute_price_to_income(raw["acs"], raw["redfin"]))
+    record("compute_price_to_income agg",
+           lambda: dl.compute_price_to_income(agg["acs"], agg["redfin"], agg["redfin_yearly"]))
+    cpi_wide = record("cpi_pivot", lambda: dl.cpi_pivot(agg["cpi"]))
+    del raw
+
+    fips = str(agg["redfin_yearly"]["county_fips"].iloc[0])
+    one_county = agg["redfin_yearly"][agg["redfin_yearly"]["county_fips"] == fips]
+    record("viz line_cpi", lambda: line_cpi(cpi_wide))
+    record("viz line_prices", lambda: line_prices(one_county, fips))
+    record("viz line_ratio", lambda: line_ratio(ratio[ratio["county_fips"] == fips], fips))
+    record("viz choropleth_ratio_years", lambda: choropleth_ratio_years(ratio, agg["counties"]))
+    record("viz choropleth_income_years", lambda: choropleth_income_years(agg["acs"]))
+    return results
+
+def _meta() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"timestamp": datetime.now().isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count()}
+
+def compare(old_path: str, new: dict):
+    with open(old_path) as f:
+        old = {(r["rows"], r["stage"]): r for r in json.load(f)["results"]}
+    print(f"\nvs {old_path}")
+    print(f"{'rows':>12} {'stage':<28} {'old s':>9} {'new s':>9} {'change':>8} {'old MB':>9} {'new MB':>9}")
+    for r in new["results"]:
+        o = old.get((r["rows"], r["stage"]))
+        if o is None:
+            continue
+        change = (r["seconds"] / o["seconds"] - 1) * 100 if o["seconds"] else float("nan")
+        print(f"{r['rows']:>12,} {r['stage']:<28} {o['seconds']:9.3f} {r['seconds']:9.3f} {change:+7.0f}% "
+              f"{o.get('peak_mb') or float('nan'):9.1f} {r.get('peak_mb') or float('nan'):9.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time and memory-profile the pipeline on synthetic warehouses.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="housing fact rows per run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--work-dir", help="where synthetic warehouses are written (default: a temp dir)")
+    parser.add_argument("--out", help="results JSON (default: bench/results/suite-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    args = parser.parse_args(argv)
+
+    work_root = args.work_dir or tempfile.mkdtemp(prefix="housing-bench-")
+    out = {"meta": _meta(), "results": []}
+    try:
+        for rows in args.sizes:
+            work = os.path.join(work_root, f"rows-{rows}")
+            out["results"] += run_size(rows, args.repeat, not args.no_memory, work)
+            shutil.rmtree(work, ignore_errors=True)
+    finally:
+        dispose_all()
+        if not args.work_dir:
+            shutil.rmtree(work_root, ignore_errors=True)
+
+    path = args.out or os.path.join(RESULTS_DIR, f"suite-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(out, f, indent=1, default=float)
+    print(f"\nresults: {path}")
+    if args.compare:
+        compare(args.compare, out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Synthetic warehouse generator for the benchmark suite.
+
+Writes ACS / Redfin / CPI / county data in the schemas of the shipped samples (data/*_sample.csv)
+at any scale, as CSV files named like the samples (lib/data_loader.CSV_FILES) and, optionally, as a
+SQLite warehouse with the same tables, indexes and aggregate tables as data/sample_dw.sqlite.
+
+Shapes follow the real sources: Redfin rows are ZIP-level observations of a county-month
+(several per county and month, a county-specific price level with a yearly trend and lognormal
+noise); ACS has one income per county and year; CPI has N_CPI_SERIES monthly series. The row
+count of the housing fact is the scale knob; the county count grows with it up to the ~3,100
+real counties. Rows are generated and written in CHUNK_ROWS blocks, so 50M rows fit in memory.
+
+    python bench/synth_warehouse.py /tmp/dw 1000000            # CSV + SQLite, 1M housing rows
+    python bench/synth_warehouse.py /tmp/dw 50000000 --csv-only
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from lib.aggregates import build_aggregates  # noqa: E402
+from lib.data_loader import CSV_FILES, get_sqlite_engine  # noqa: E402
+from lib.engines import dispose_engine  # noqa: E402
+from lib.sql_utils import load_sample_into_sqlite  # noqa: E402
+
+MAX_COUNTIES = 3100
+ROWS_PER_COUNTY_MONTH = 4        # ZIP observations behind each county-month at full scale
+YEARS = range(2012, 2025)
+N_CPI_SERIES = 20
+CHUNK_ROWS = 1_000_000
+STATES = ["AL", "AZ", "CA", "CO", "FL", "GA", "IL", "MA", "MI", "MN", "NC", "NJ", "NY", "OH",
+          "OR", "PA", "TN", "TX", "VA", "WA"]
+
+def n_counties(rows: int) -> int:
+    months = len(YEARS) * 12
+    return int(np.clip(rows // (months * ROWS_PER_COUNTY_MONTH), 3, MAX_COUNTIES))
+
+def make_counties(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    state_idx = rng.integers(0, len(STATES), n)
+    state_fips = state_idx * 2 + 1                       # odd codes 01..39, like real state FIPS
+    county = np.arange(n) % 500 * 2 + 1
+    fips = [f"{s:02d}{c:03d}" for s, c in zip(state_fips, county)]
+    _, first = np.unique(fips, return_index=True)        # drop the rare collisions
+    df = pd.DataFrame({"county_fips": fips, "county_name": [f"Synth {i} County" for i in range(n)],
+                       "state": np.array(STATES)[state_idx], "state_fips": state_fips})
+    return df.iloc[np.sort(first)].reset_index(drop=True)
+
+def make_acs(counties: pd.DataFrame, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n, years = len(counties), np.array(YEARS)
+    base = rng.normal(65_000, 15_000, n).clip(25_000)
+    growth = 1 + rng.normal(0.03, 0.01, n)
+    income = base[:, None] * growth[:, None] ** (years - years[0])[None, :]
+    return pd.DataFrame({
+        "county_fips": np.repeat(counties["county_fips"].to_numpy(), len(years)),
+        "county_name": np.repeat(counties["county_name"].to_numpy(), len(years)),
+        "state": np.repeat(counties["state"].to_numpy(), len(years)),
+        "year": np.tile(years, n),
+        "income_usd": income.ravel().round(),
+    })
+
+def make_cpi(seed: int = 2) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    months = [f"{y}-{m:02d}" for y in YEARS for m in range(1, 13)]
+    series = ["CUUR0000SA0", "CUUR0000SAH"] + [f"CUUR0000S{i:03d}" for i in range(N_CPI_SERIES - 2)]
+    steps = rng.normal(0.002, 0.003, (len(series), len(months)))
+    values = 100 * np.exp(np.cumsum(steps, axis=1))
+    return pd.DataFrame({"date": np.tile(months, len(series)), "series_id": np.repeat(series, len(months)),
+                         "value": values.ravel().round(3)})
+
+def housing_chunks(counties: pd.DataFrame, rows: int, seed: int = 3):
+    """Redfin-shaped row blocks: county_fips, county_name, state, period, median_sale_price."""
+    rng = np.random.default_rng(seed)
+    periods = np.array([f"{y}-{m:02d}" for y in YEARS for m in range(1, 13)])
+    n = len(counties)
+    level = rng.lognormal(12.4, 0.45, n)
+    trend = 1 + rng.normal(0.05, 0.02, n)
+    fips, names, states = (counties[c].to_numpy() for c in ("county_fips", "county_name", "state"))
+    done = 0
+    while done < rows:
+        k = min(CHUNK_ROWS, rows - done)
+        c = rng.integers(0, n, k)
+        p = rng.integers(0, len(periods), k)
+        price = level[c] * trend[c] ** (p / 12) * rng.lognormal(0, 0.15, k)
+        yield pd.DataFrame({"county_fips": fips[c], "county_name": names[c], "state": states[c],
+                            "period": periods[p], "median_sale_price": price.round()})
+        done += k
+
+def _write_csv(df: pd.DataFrame, path: str, writer=None):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if writer is None:
+        writer = pv.CSVWriter(path, table.schema)
+    writer.write_table(table)
+    return writer
+
+def generate(out_dir: str, rows: int, csv: bool = True, sqlite: bool = True, seed: int = 0) -> dict:
+    """
+    Write a synthetic warehouse with `rows` housing rows to out_dir.
+    Returns {"counties", "rows", "csv": {...paths}, "sqlite": path or None, "seconds"}.
+    """
+    t0 = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    counties = make_counties(n_counties(rows), seed)
+    acs, cpi = make_acs(counties, seed + 1), make_cpi(seed + 2)
+    small = {"acs": acs, "cpi": cpi, "counties": counties}
+    paths = {kind: os.path.join(out_dir, name) for kind, name in CSV_FILES.items()}
+    db_path = os.path.join(out_dir, "sample_dw.sqlite") if sqlite else None
+    if db_path and os.path.exists(db_path):
+        os.remove(db_path)
+
+    writer, conn = None, None
+    for i, chunk in enumerate(housing_chunks(counties, rows, seed + 3)):
+        if csv:
+            writer = _write_csv(chunk, paths["redfin"], writer)
+        if db_path and i == 0:
+            load_sample_into_sqlite(db_path, acs, chunk, cpi, counties)
+            conn = sqlite3.connect(db_path)
+        elif db_path:
+            chunk.to_sql("fact_housing", conn, if_exists="append", index=False)
+    if writer is not None:
+        writer.close()
+    if csv:
+        for kind, df in small.items():
+            _write_csv(df, paths[kind]).close()
+    if conn is not None:
+        conn.commit()
+        conn.close()
+        engine = get_sqlite_engine(db_path)
+        build_aggregates(engine)
+        dispose_engine(engine)
+        with sqlite3.connect(db_path) as c:
+            c.execute("ANALYZE")
+        c.close()
+    return {"counties": len(counties), "rows": rows, "csv": paths if csv else None, "sqlite": db_path,
+            "seconds": time.perf_counter() - t0}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic ACS/Redfin/CPI warehouse (CSV + SQLite).")
+    parser.add_argument("out_dir")
+    parser.add_argument("rows", type=int, help="housing fact rows (e.g. 10000 .. 50000000)")
+    parser.add_argument("--csv-only", action="store_true")
+    parser.add_argument("--sqlite-only", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    info = generate(args.out_dir, args.rows, csv=not args.sqlite_only, sqlite=not args.csv_only, seed=args.seed)
+    print(f"{args.out_dir}: {info['rows']:,} housing rows, {info['counties']:,} counties in {info['seconds']:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Load-time job that builds and maintains the materialized aggregate tables:
+
+    agg_housing_county_month   county x month mean price (+ n_obs) from the housing fact
+    agg_housing_county_year    county x year, re-derived from the monthly table (mean x n_obs)
+    agg_price_to_income        yearly price joined to ACS income, with the ratio
+
+Everything runs as INSERT ... SELECT inside the warehouse (MySQL or the SQLite sample), so no fact
+rows cross the wire; load_data then reads a few thousand pre-aggregated rows instead.
+
+    python -m lib.aggregates --source sqlite               # full rebuild of the sample warehouse
+    python -m lib.aggregates --source mysql --since 2024-01  # only periods >= 2024-01
+    python -m lib.aggregates --source mysql --publish-crosswalk  # ZIP-level housing: load zip_county first
+"""
+import argparse
+
+from sqlalchemy import text
+
+from lib.data_loader import (
+    MYSQL_HOUSING_DELTA, MYSQL_HOUSING_MONTHLY, MYSQL_INCOME, SQLITE_INCOME,
+    _housing_fmt, get_mysql_engine, get_sqlite_engine,
+)
+from lib.catalog import clear_catalogs, get_catalog
+from lib.crosswalk import CROSSWALK_PATH, load_crosswalk, publish_crosswalk
+from lib.sql_utils import MYSQL_DDL
+
+AGG_NAMES = ("agg_housing_county_month", "agg_housing_county_year", "agg_price_to_income")
+
+SQLITE_AGG_DDL = [
+"""
+CREATE TABLE IF NOT EXISTS agg_housing_county_month(
+  county_fips        TEXT NOT NULL,
+  period             TEXT NOT NULL,   -- YYYY-MM
+  median_sale_price  REAL,
+  n_obs              REAL,
+  PRIMARY KEY (county_fips, period)
+);
+""",
+"CREATE INDEX IF NOT EXISTS idx_agg_hcm_period ON agg_housing_county_month(period);",
+"""
+CREATE TABLE IF NOT EXISTS agg_housing_county_year(
+  county_fips  TEXT NOT NULL,
+  year         INTEGER NOT NULL,
+  avg_price    REAL,
+  n_obs        REAL,
+  PRIMARY KEY (county_fips, year)
+);
+""",
+"CREATE INDEX IF NOT EXISTS idx_agg_hcy_year ON agg_housing_county_year(year);",
+"""
+CREATE TABLE IF NOT EXISTS agg_price_to_income(
+  county_fips      TEXT NOT NULL,
+  year             INTEGER NOT NULL,
+  avg_price        REAL,
+  income_usd       REAL,
+  price_to_income  REAL,
+  PRIMARY KEY (county_fips, year)
+);
+""",
+"CREATE INDEX IF NOT EXISTS idx_agg_pti_year ON agg_price_to_income(year);",
+]
+
+# ---- SQLite sample warehouse (fact_housing is already county x month; FIPS may be stored as INTEGER) ----
+SQLITE_BUILD_MONTHLY = """
+    INSERT INTO agg_housing_county_month (county_fips, period, median_sale_price, n_obs)
+    SELECT
+        CASE WHEN county_fips GLOB '[0-9]*' THEN substr('00000' || county_fips, -5) ELSE county_fips END,
+        substr(period, 1, 7),
+        AVG(median_sale_price),
+        COUNT(*)
+    FROM fact_housing
+    WHERE median_sale_price IS NOT NULL
+      AND substr(period, 1, 7) >= :cutoff
+    GROUP BY 1, 2
+"""
+
+# ---- Shared: yearly from monthly, ratio from yearly + income ----
+BUILD_YEARLY = """
+    INSERT INTO agg_housing_county_year (county_fips, year, avg_price, n_obs)
+    SELECT
+        county_fips,
+        {year_expr} AS year,
+        SUM(median_sale_price * n_obs) / SUM(n_obs),
+        SUM(n_obs)
+    FROM agg_housing_county_month
+    WHERE period >= :cutoff
+    GROUP BY county_fips, {year_expr}
+"""
+
+BUILD_RATIO = """
+    INSERT INTO agg_price_to_income (county_fips, year, avg_price, income_usd, price_to_income)
+    SELECT
+        y.county_fips,
+        y.year,
+        y.avg_price,
+        i.income_usd,
+        ROUND(y.avg_price / i.income_usd, 2)
+    FROM agg_housing_county_year y
+    LEFT JOIN ({income}) i
+      ON i.county_fips = y.county_fips AND i.year = y.year
+    WHERE y.year >= :year
+"""
+
+def create_agg_tables(conn):
+    if conn.dialect.name == "sqlite":
+        for ddl in SQLITE_AGG_DDL:
+            conn.exec_driver_sql(ddl)
+    else:
+        for name in AGG_NAMES:
+            conn.exec_driver_sql(MYSQL_DDL[name])
+
+def build_aggregates(engine, since: str | None = None, publish: bool = False) -> dict:
+    """
+    (Re)build the aggregate tables in one transaction. since="YYYY-MM" only replaces periods from
+    that month on (and the years they fall in); None rebuilds everything.
+    publish=True first replaces zip_county with the full HUD crosswalk file (MySQL only; required
+    once for ZIP-level housing). Returns row counts per table.
+    """
+    cutoff = since or "0000-00"
+    year = int(cutoff[:4])
+    year_cutoff = f"{year:04d}-00"
+    with engine.begin() as conn:
+        create_agg_tables(conn)
+        sqlite = conn.dialect.name == "sqlite"
+
+        conn.execute(text("DELETE FROM agg_housing_county_month WHERE period >= :cutoff"), {"cutoff": cutoff})
+        if sqlite:
+            conn.execute(text(SQLITE_BUILD_MONTHLY), {"cutoff": cutoff})
+        else:
+            tbl, geo = get_catalog(engine).housing_table()
+            if publish and geo != "county":
+                # the full HUD file only: the bundled sample covers three metros and would drop every other ZIP
+                xwalk = load_crosswalk(sample=False)
+                if xwalk is None:
+                    raise RuntimeError(f"Publishing the crosswalk needs the full HUD file at {CROSSWALK_PATH}.")
+                conn.exec_driver_sql(MYSQL_DDL["zip_county"])
+                publish_crosswalk(conn, xwalk)
+                geo = "crosswalk"
+            if geo == "zip":
+                raise RuntimeError(f"{tbl} has no county_fips and there is no zip_county table; install the "
+                                   f"HUD file at {CROSSWALK_PATH} and run with --publish-crosswalk.")
+            fmt = _housing_fmt(tbl, geo, delta=MYSQL_HOUSING_DELTA)
+            cutoff_id = int(cutoff.replace("-", "") + "01") if since else 0
+            conn.execute(text("INSERT INTO agg_housing_county_month (county_fips, period, median_sale_price, n_obs)"
+                              + MYSQL_HOUSING_MONTHLY.format(**fmt)), {"cutoff_id": cutoff_id})
+
+        year_expr = "CAST(substr(period, 1, 4) AS INTEGER)" if sqlite else "CAST(LEFT(period, 4) AS UNSIGNED)"
+        conn.execute(text("DELETE FROM agg_housing_county_year WHERE year >= :year"), {"year": year})
+        conn.execute(text(BUILD_YEARLY.format(year_expr=year_expr)), {"cutoff": year_cutoff})
+
+        conn.execute(text("DELETE FROM agg_price_to_income WHERE year >= :year"), {"year": year})
+        income = SQLITE_INCOME if sqlite else MYSQL_INCOME
+        conn.execute(text(BUILD_RATIO.format(income=income)), {"year": year})
+
+        counts = {name: conn.execute(text(f"SELECT COUNT(*) FROM {name}")).scalar() for name in AGG_NAMES}
+    clear_catalogs(engine)   # the agg tables may be new: loaders re-read the schema
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the materialized aggregate tables.")
+    parser.add_argument("--source", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--since", help="only rebuild periods >= YYYY-MM (default: full rebuild)")
+    parser.add_argument("--publish-crosswalk", action="store_true",
+                        help=f"replace zip_county with the full HUD file ({CROSSWALK_PATH}) first (MySQL)")
+    args = parser.parse_args(argv)
+    engine = get_sqlite_engine() if args.source == "sqlite" else get_mysql_engine()
+    for name, rows in build_aggregates(engine, args.since, args.publish_crosswalk).items():
+        print(f"{name}: {rows:,} rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Precomputed derived artefacts, written offline by precompute.py and opened by lib/derived.
+
+Artefacts are keyed by data version (the load_data fingerprint), so the app only ever opens the
+ones built from exactly the data it has loaded:
+
+    data/artefacts/<version>/manifest.json         names, build time, workers, partitions
+    data/artefacts/<version>/<name>.arrow          frames (uncompressed Feather)
+    data/artefacts/<version>/<name>/<key>.json     figure dicts, one Plotly JSON file per key (year)
+
+Artefact names are the lib/derived names ("cpi_wide", "ratio_maps:auto"); ":" becomes "-" on disk.
+A version folder is written to a temp dir and renamed into place, so readers never see half a
+build; the newest KEEP_VERSIONS versions are kept.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+import plotly.io as pio
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:  # no artefact tier: lib/derived builds everything in process
+    pa = None
+
+ARTEFACT_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "artefacts")
+KEEP_VERSIONS = 2
+
+def artefacts_enabled() -> bool:
+    return pa is not None
+
+def _file(name: str) -> str:
+    return name.replace(":", "-")
+
+def _manifest(version: str) -> dict | None:
+    try:
+        with open(os.path.join(ARTEFACT_DIR, version, "manifest.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def read_artefact(version: str, name: str):
+    """The precomputed frame or {key: figure} dict for (version, name), else None."""
+    if pa is None:
+        return None
+    manifest = _manifest(version)
+    if manifest is None:
+        return None
+    folder = os.path.join(ARTEFACT_DIR, version)
+    try:
+        if name in manifest["frames"]:
+            return feather.read_feather(os.path.join(folder, f"{_file(name)}.arrow"))
+        if name in manifest["figures"]:
+            out = {}
+            for key in manifest["figures"][name]:
+                with open(os.path.join(folder, _file(name), f"{key}.json")) as f:
+                    out[int(key)] = pio.from_json(f.read(), skip_invalid=True)
+            return out
+    except (OSError, ValueError, pa.ArrowInvalid):
+        return None
+    return None
+
+def write_artefacts(version: str, frames: dict, figures: dict, meta: dict | None = None):
+    """
+    frames: name -> DataFrame; figures: name -> {key: Plotly JSON string}. Replaces any earlier
+    build of the same version atomically.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is required to write artefacts.")
+    os.makedirs(ARTEFACT_DIR, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=ARTEFACT_DIR, prefix=".tmp-")
+    try:
+        for name, df in frames.items():
+            feather.write_feather(df.reset_index(drop=True), os.path.join(tmp, f"{_file(name)}.arrow"),
+                                  compression="uncompressed")
+        for name, figs in figures.items():
+            os.makedirs(os.path.join(tmp, _file(name)))
+            for key, fig_json in figs.items():
+                with open(os.path.join(tmp, _file(name), f"{key}.json"), "w") as f:
+                    f.write(fig_json)
+        manifest = {"version": version, "frames": list(frames),
+                    "figures": {name: [str(k) for k in figs] for name, figs in figures.items()},
+                    "built_at": time.time(), **(meta or {})}
+        with open(os.path.join(tmp, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+        folder = os.path.join(ARTEFACT_DIR, version)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(tmp, folder)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    _prune(keep=version)
+
+def _prune(keep: str):
+    dirs = [d for d in os.listdir(ARTEFACT_DIR)
+            if os.path.isdir(os.path.join(ARTEFACT_DIR, d)) and not d.startswith(".")]
+    dirs.sort(key=lambda d: os.path.getmtime(os.path.join(ARTEFACT_DIR, d)), reverse=True)
+    for d in [d for d in dirs if d != keep][KEEP_VERSIONS - 1:]:
+        shutil.rmtree(os.path.join(ARTEFACT_DIR, d), ignore_errors=True)
+
+def artefact_info() -> pd.DataFrame:
+    """One row per precomputed version, for the Settings page."""
+    rows = []
+    if os.path.isdir(ARTEFACT_DIR):
+        for version in sorted(os.listdir(ARTEFACT_DIR)):
+            manifest = _manifest(version) if not version.startswith(".") else None
+            if manifest:
+                rows.append({"version": version, "built_at": pd.Timestamp(manifest["built_at"], unit="s"),
+                             "seconds": manifest.get("seconds"), "workers": manifest.get("workers"),
+                             "artefacts": ", ".join([*manifest["frames"], *manifest["figures"]])})
+    return pd.DataFrame(rows, columns=["version", "built_at", "seconds", "workers", "artefacts"])
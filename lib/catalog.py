@@ -0,0 +1,189 @@
+"""
+Schema catalog for the warehouse (MySQL or the SQLite sample).
+
+The warehouse is introspected once per process: tables, columns, indexes and row-count estimates
+(information_schema.tables.TABLE_ROWS on MySQL, sqlite_stat1 from ANALYZE on SQLite). Query
+builders in lib/data_loader ask the catalog which housing table and aggregate tables exist instead
+of probing information_schema on every load, and the Schemas page renders from it.
+
+scan_warnings() runs EXPLAIN once per (warehouse, SQL) and reports full scans of tables above
+LARGE_TABLE_ROWS, so an unindexed access path is visible before it gets slow.
+
+A SQLite catalog is rebuilt when the database file changes (lib/warehouse replaces it on rebuild);
+MySQL catalogs live until clear_catalogs() (Settings > Clear cache, or after build_aggregates).
+"""
+import logging
+import os
+import re
+import threading
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+LARGE_TABLE_ROWS = 100_000   # full scans below this are not worth a warning
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_catalogs: dict = {}         # url -> (file stamp, SchemaCatalog)
+_plans: dict = {}            # (url, stamp, sql) -> list of warnings
+
+_FROM = re.compile(r"\b(?:FROM|JOIN)\s+`?(\w+)`?(?:\s+(?:AS\s+)?`?(\w+)`?)?", re.IGNORECASE)
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?")
+_KEYWORDS = {"where", "join", "inner", "left", "right", "cross", "on", "group", "order", "limit",
+             "union", "using", "natural", "outer", "having", "window"}
+
+class SchemaCatalog:
+    def __init__(self, dialect: str, tables: dict):
+        self.dialect = dialect
+        self.tables = tables        # name -> {"columns": {col: type}, "indexes": [...], "rows": int | None}
+
+    @classmethod
+    def build(cls, engine) -> "SchemaCatalog":
+        insp = inspect(engine)
+        columns = insp.get_multi_columns()
+        indexes = insp.get_multi_indexes()
+        pks = insp.get_multi_pk_constraint()
+        with engine.connect() as conn:
+            rows = _row_estimates(conn)
+        tables = {}
+        for (_, name), cols in columns.items():
+            idx = [{"name": i["name"], "columns": [c for c in i["column_names"] if c], "unique": bool(i["unique"])}
+                   for i in indexes.get((None, name), [])]
+            pk = pks.get((None, name)) or {}
+            if pk.get("constrained_columns"):
+                idx.insert(0, {"name": "PRIMARY", "columns": pk["constrained_columns"], "unique": True})
+            tables[name] = {"columns": {c["name"]: str(c["type"]) for c in cols},
+                            "indexes": idx, "rows": rows.get(name)}
+        return cls(engine.dialect.name, tables)
+
+    def has(self, *tables: str) -> bool:
+        return all(t in self.tables for t in tables)
+
+    def columns(self, table: str) -> list:
+        return list(self.tables.get(table, {}).get("columns", {}))
+
+    def rows(self, table: str) -> int | None:
+        return self.tables.get(table, {}).get("rows")
+
+    def housing_table(self) -> tuple[str, str]:
+        """
+        (table, geo) for the housing fact. Prefers fact_housing_v2; geo is
+          - "county":    the table carries county_fips, so the warehouse can group by county,
+          - "crosswalk": ZIP rows, but a zip_county crosswalk table exists to join through,
+          - "zip":       ZIP rows only.
+        """
+        tbl = "fact_housing_v2" if self.has("fact_housing_v2") else "fact_housing"
+        if "county_fips" in self.columns(tbl):
+            return tbl, "county"
+        return tbl, ("crosswalk" if self.has("zip_county") else "zip")
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per table: row estimate, column and index summaries."""
+        out = [{"table": name, "rows (est.)": t["rows"], "columns": len(t["columns"]),
+                "indexes": ", ".join(f"{i['name']}({', '.join(i['columns'])})" for i in t["indexes"])}
+               for name, t in sorted(self.tables.items())]
+        return pd.DataFrame(out, columns=["table", "rows (est.)", "columns", "indexes"])
+
+    def columns_frame(self, table: str) -> pd.DataFrame:
+        indexed = {c for i in self.tables[table]["indexes"] for c in i["columns"][:1]}
+        return pd.DataFrame([{"column": c, "type": t, "leading index column": c in indexed}
+                             for c, t in self.tables[table]["columns"].items()])
+
+def _row_estimates(conn) -> dict:
+    if conn.dialect.name == "sqlite":
+        stats = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")).first()
+        rows = {}
+        if stats:
+            # first number of each stat row is the table's row count at the last ANALYZE
+            for tbl, stat in conn.execute(text("SELECT tbl, stat FROM sqlite_stat1")):
+                rows.setdefault(tbl, int(stat.split()[0]))
+        names = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                  "AND name NOT LIKE 'sqlite_%'")).scalars()
+        for name in names:
+            if name not in rows:   # never analyzed: count it (once per process)
+                rows[name] = conn.execute(text(f'SELECT COUNT(*) FROM "{name}"')).scalar()
+        return rows
+    res = conn.execute(text("SELECT table_name, table_rows FROM information_schema.tables "
+                            "WHERE table_schema = DATABASE()"))
+    return {name: (int(n) if n is not None else None) for name, n in res}
+
+def _stamp(engine):
+    path = engine.url.database if engine.dialect.name == "sqlite" else None
+    if path and os.path.exists(path):
+        st_ = os.stat(path)
+        return st_.st_size, st_.st_mtime_ns
+    return None
+
+def get_catalog(engine) -> SchemaCatalog:
+    """Catalog of the warehouse behind `engine`, introspected on first use."""
+    url, stamp = str(engine.url), _stamp(engine)
+    hit = _catalogs.get(url)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    catalog = SchemaCatalog.build(engine)
+    with _lock:
+        _catalogs[url] = (stamp, catalog)
+    return catalog
+
+def clear_catalogs(engine=None):
+    with _lock:
+        if engine is None:
+            _catalogs.clear()
+            _plans.clear()
+        else:
+            _catalogs.pop(str(engine.url), None)
+
+# ---------- plan checks ----------
+def _aliases(sql: str) -> dict:
+    """alias (or table) -> table, from the FROM / JOIN clauses of `sql`."""
+    out = {}
+    for table, alias in _FROM.findall(sql):
+        out[table] = table
+        if alias and alias.lower() not in _KEYWORDS:
+            out[alias] = table
+    return out
+
+def _explain(conn, sql: str, params: dict | None) -> list:
+    """[(table or alias, how, est. rows or None)] for every full scan in the plan."""
+    if conn.dialect.name == "sqlite":
+        stmt = "EXPLAIN QUERY PLAN " + sql
+        plan = (conn.execute(text(stmt), params) if params else conn.exec_driver_sql(stmt)).fetchall()
+        scans = []
+        for row in plan:
+            m = _SQLITE_SCAN.match(row[-1])
+            if m:
+                scans.append((m.group(1), f"via index {m.group(2)}" if m.group(2) else "table scan", None))
+        return scans
+    plan = conn.execute(text("EXPLAIN " + sql), params or {}).mappings().fetchall()
+    return [(r["table"], "table scan" if r["type"] == "ALL" else "index scan", r.get("rows"))
+            for r in plan if r.get("type") in ("ALL", "index") and r.get("table")]
+
+def scan_warnings(engine, sql: str, params: dict | None = None,
+                  min_rows: int = LARGE_TABLE_ROWS, facts_only: bool = False) -> list[str]:
+    """
+    Full scans of tables with >= min_rows rows in the plan of `sql` (cached per warehouse + SQL).
+    facts_only limits the check to fact_* tables (aggregate tables are meant to be read whole).
+    Returns [] when the statement cannot be explained (the query itself will report the error).
+    """
+    key = (str(engine.url), _stamp(engine), sql, min_rows, facts_only)
+    if key in _plans:
+        return _plans[key]
+    catalog = get_catalog(engine)
+    aliases = _aliases(sql)
+    try:
+        with engine.connect() as conn:
+            scans = _explain(conn, sql, params)
+    except Exception:
+        scans = []
+    warnings = []
+    for name, how, est in scans:
+        table = aliases.get(name, name)
+        if facts_only and not table.startswith("fact_"):
+            continue
+        rows = est if est is not None else catalog.rows(table)
+        if rows is not None and rows >= min_rows:
+            warnings.append(f"Full scan of {table} (~{rows:,} rows, {how}).")
+    with _lock:
+        _plans[key] = warnings
+    return warnings
@@ -0,0 +1,55 @@
+"""
+County index for drill-down pages.
+
+Each indexed frame is sorted once by (county_fips, year) and stored with the [start, stop) row
+span of every county, so selecting a county is a dict lookup plus an iloc slice instead of a
+boolean scan over the whole frame. Display labels ("Cook County, IL — 17031") are precomputed
+per FIPS, so a selectbox can show them via format_func and still return the FIPS itself.
+Built once per data version by lib/derived.get_county_index.
+"""
+import numpy as np
+import pandas as pd
+
+class CountyIndex:
+    def __init__(self, fips: list, labels: dict, names: dict, frames: dict, spans: dict):
+        self.fips = fips            # selectable FIPS, ordered by label
+        self.labels = labels        # fips -> "Name, ST — FIPS"
+        self.names = names          # fips -> county name
+        self.frames = frames        # frame name -> frame sorted by (county_fips, year)
+        self.spans = spans          # frame name -> {fips: (start, stop)}
+
+    @classmethod
+    def build(cls, counties: pd.DataFrame, **frames: pd.DataFrame) -> "CountyIndex":
+        """counties: ['county_fips','county_name','state']; frames: any frames with county_fips (+ year)."""
+        meta = counties.drop_duplicates("county_fips")
+        fips = meta["county_fips"].astype(str).to_numpy()
+        names = dict(zip(fips, meta["county_name"].astype(str)))
+        labels = dict(zip(fips, meta["county_name"].astype(str) + ", " + meta["state"].astype(str) + " — " + fips))
+
+        sorted_frames, spans = {}, {}
+        for name, df in frames.items():
+            codes, keys = pd.factorize(df["county_fips"].astype(str), sort=True)
+            year = df["year"].to_numpy() if "year" in df.columns else np.zeros(len(df))
+            order = np.lexsort((year, codes))
+            sorted_frames[name] = df.iloc[order].reset_index(drop=True)
+            c = codes[order]
+            start = np.flatnonzero(np.r_[True, c[1:] != c[:-1]]) if len(c) else np.array([], dtype=np.int64)
+            stop = np.r_[start[1:], len(c)]
+            spans[name] = {keys[c[s]]: (int(s), int(e)) for s, e in zip(start, stop)}
+
+        ordered = sorted(labels, key=labels.get)
+        return cls(ordered, labels, names, sorted_frames, spans)
+
+    def __len__(self) -> int:
+        return len(self.fips)
+
+    def label(self, fips: str) -> str:
+        return self.labels.get(fips, fips)
+
+    def name(self, fips: str) -> str:
+        return self.names.get(fips, fips)
+
+    def rows(self, frame: str, fips: str) -> pd.DataFrame:
+        """One county's rows of an indexed frame, sorted by year (empty frame when absent)."""
+        start, stop = self.spans[frame].get(fips, (0, 0))
+        return self.frames[frame].iloc[start:stop]
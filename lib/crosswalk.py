@@ -0,0 +1,146 @@
+"""
+ZIP -> county crosswalk (HUD USPS ZIP-County style: zip, county, res_ratio, ...).
+
+The table is held as a compact CSR-style index over sorted integer ZIPs:
+    zips[i]                   unique ZIP (int32, sorted)
+    offsets[i]:offsets[i+1]   that ZIP's entries in counties / weights
+    counties[j]               county code (int32) into county_fips
+    weights[j]                residential ratio (float32)
+so mapping millions of ZIP rows is one searchsorted plus a few np.repeat calls, with no Python loop.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+CROSSWALK_PATH = os.path.join(DATA_DIR, "zip_county_crosswalk.csv")
+CROSSWALK_SAMPLE_PATH = os.path.join(DATA_DIR, "zip_county_crosswalk_sample.csv")
+
+class ZipCountyIndex:
+    def __init__(self, zips: np.ndarray, offsets: np.ndarray, counties: np.ndarray,
+                 weights: np.ndarray, county_fips: pd.Index):
+        self.zips = zips
+        self.offsets = offsets
+        self.counties = counties
+        self.weights = weights
+        self.county_fips = county_fips
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, weight: str = "res_ratio") -> "ZipCountyIndex":
+        """Build from a HUD-style frame; column names are matched case-insensitively."""
+        df = df.rename(columns=str.lower)
+        zips = pd.to_numeric(df["zip"], errors="coerce")
+        w = pd.to_numeric(df[weight], errors="coerce")
+        ok = zips.notna() & w.gt(0) & df["county"].notna()
+        zips = zips[ok].to_numpy(np.int32)
+        fips = df.loc[ok, "county"].astype(str).str.strip().str.zfill(5)
+        codes, uniques = pd.factorize(fips, sort=True)
+
+        order = np.argsort(zips, kind="stable")
+        zips, codes, w = zips[order], codes[order].astype(np.int32), w[ok].to_numpy(np.float32)[order]
+        # renormalize so a ZIP's weights sum to 1 over the counties we keep
+        uniq, start = np.unique(zips, return_index=True)
+        offsets = np.append(start, len(zips)).astype(np.int64)
+        totals = np.add.reduceat(w, start) if len(w) else w
+        w = w / np.repeat(totals, np.diff(offsets))
+        return cls(uniq.astype(np.int32), offsets, codes, w.astype(np.float32), pd.Index(uniques))
+
+    def __len__(self) -> int:
+        return len(self.counties)
+
+    def lookup(self, zip_codes) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Vectorized join. Returns (row, county_code, weight) with one entry per (input row, county)
+        pair; ZIPs missing from the crosswalk produce no entries.
+        """
+        z = np.asarray(zip_codes)
+        if z.dtype.kind in "iuf":
+            z = z.astype(np.float64)
+        else:
+            # parse each distinct ZIP once (~40k) instead of every row
+            codes, uniq = pd.factorize(z)
+            parsed = pd.to_numeric(pd.Series(uniq), errors="coerce").to_numpy(np.float64)
+            z = np.where(codes >= 0, parsed[codes] if len(parsed) else np.nan, np.nan)
+        if not len(self.zips):
+            empty = np.array([], dtype=np.int64)
+            return empty, empty.astype(np.int32), empty.astype(np.float32)
+        pos = np.minimum(np.searchsorted(self.zips, z), len(self.zips) - 1)
+        hit = ~np.isnan(z) & (self.zips[pos] == z)
+        counts = np.where(hit, self.offsets[pos + 1] - self.offsets[pos], 0)
+
+        row = np.repeat(np.arange(len(z)), counts)
+        first = np.cumsum(counts) - counts
+        entry = self.offsets[pos][row] + (np.arange(len(row)) - first[row])
+        return row, self.counties[entry], self.weights[entry]
+
+    def to_county(self, zip_rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Expand ZIP rows to weighted county rows: county_fips + every other column of zip_rows
+        (except zip_code), plus a `weight` column for weighted means downstream.
+        """
+        row, code, w = self.lookup(zip_rows["zip_code"].to_numpy())
+        out = {c: zip_rows[c].to_numpy()[row] for c in zip_rows.columns if c != "zip_code"}
+        out["county_fips"] = pd.Categorical.from_codes(code, categories=self.county_fips)
+        out["weight"] = w
+        return pd.DataFrame(out)
+
+    def zips_for(self, county_fips: str) -> list[str]:
+        """5-digit ZIPs with any residential share in `county_fips` (for county drill-down filters)."""
+        code = self.county_fips.get_indexer([county_fips])[0]
+        if code < 0:
+            return []
+        entry = np.flatnonzero(self.counties == code)
+        zips = self.zips[np.searchsorted(self.offsets, entry, side="right") - 1]
+        return [f"{z:05d}" for z in np.unique(zips)]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Flat (zip_code, county_fips, res_ratio) table, e.g. for loading into the warehouse."""
+        return pd.DataFrame({
+            "zip_code": pd.Series(np.repeat(self.zips, np.diff(self.offsets))).astype(str).str.zfill(5),
+            "county_fips": self.county_fips.take(self.counties),
+            "res_ratio": self.weights,
+        })
+
+def load_crosswalk(path: str | None = None, weight: str = "res_ratio", sample: bool = True) -> ZipCountyIndex | None:
+    """
+    Load the crosswalk from `path`, else data/zip_county_crosswalk.csv (full HUD file), else the
+    bundled sample (unless sample=False). Returns None when no file is available.
+    """
+    for p in (path, CROSSWALK_PATH, CROSSWALK_SAMPLE_PATH if sample else None):
+        if p and os.path.exists(p):
+            return ZipCountyIndex.from_frame(pd.read_csv(p, dtype={"zip": str, "county": str}), weight)
+    return None
+
+def publish_crosswalk(conn, xwalk: ZipCountyIndex, table: str = "zip_county"):
+    """
+    Replace the warehouse crosswalk table (see MYSQL_DDL["zip_county"]) so load_data can map
+    ZIP-level housing to counties with a warehouse-side join. Admin step only (lib/aggregates.py):
+    publish the full HUD file, never the sample.
+    """
+    conn.exec_driver_sql(f"DELETE FROM {table}")
+    xwalk.to_frame().to_sql(table, conn, if_exists="append", index=False, chunksize=10_000)
+
+def weighted_county_prices(zip_rows: pd.DataFrame, xwalk: ZipCountyIndex) -> pd.DataFrame:
+    """
+    ZIP x month prices -> county x month residential-weighted mean price.
+    Expects zip_rows with ['zip_code','period','median_sale_price']. Reduces with np.bincount over
+    flat (county, period) integer keys; n_obs is the weighted row count.
+    """
+    rows = zip_rows[["zip_code", "period", "median_sale_price"]].dropna()
+    price = rows["median_sale_price"].to_numpy(np.float64)
+    pcode, periods = pd.factorize(rows["period"], sort=True)
+    row, county, w = xwalk.lookup(rows["zip_code"].to_numpy())
+
+    n_periods = max(len(periods), 1)
+    key = county.astype(np.int64) * n_periods + pcode[row]
+    size = len(xwalk.county_fips) * n_periods
+    wsum = np.bincount(key, weights=w, minlength=size)
+    wp = np.bincount(key, weights=w * price[row], minlength=size)
+    idx = np.flatnonzero(wsum)
+    return pd.DataFrame({
+        "county_fips": xwalk.county_fips.take(idx // n_periods),
+        "period": pd.Index(periods).take(idx % n_periods),
+        "median_sale_price": wp[idx] / wsum[idx],
+        "n_obs": wsum[idx],
+    })
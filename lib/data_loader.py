@@ -1,9 +1,32 @@
+import hashlib
+import logging
 import os
+import numpy as np
 import pandas as pd
 import streamlit as st
-from sqlalchemy import create_engine, text
+from sqlalchemy import bindparam, text
+
+from lib import refresher
+from lib.catalog import get_catalog, scan_warnings
+from lib.crosswalk import CROSSWALK_PATH, ZipCountyIndex, load_crosswalk, weighted_county_prices
+from lib.engines import get_engine, read_parallel
+from lib.normalize import FLOAT64_COLUMNS, compact_frame, period_key, period_parts
+from lib.snapshot import read_snapshot, write_snapshot
+from lib.streaming import CHUNK_ROWS, concat_downcast, fold_housing
+from lib.tracing import trace, traced
+
+logger = logging.getLogger(__name__)
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+SQLITE_PATH = os.path.join(DATA_DIR, "sample_dw.sqlite")
+# Bump whenever the shape/dtypes of load_data frames change; invalidates local snapshots.
+SCHEMA_VERSION = 2
+CSV_FILES = {
+    "acs": "acs_income_sample.csv",
+    "redfin": "redfin_housing_sample.csv",
+    "cpi": "bls_cpi_sample.csv",
+    "counties": "county_fips_sample.csv",
+}
 
 @st.cache_data(show_spinner=False)
 def read_csv(name: str) -> pd.DataFrame:
@@ -18,6 +41,7 @@ def secrets_has_mysql() -> bool:
         return False
 
 def get_mysql_engine():
+    """Shared, pooled engine for the [mysql] secrets (see lib/engines.py)."""
     s = st.secrets["mysql"]
     # Support Unix socket connections if provided in secrets as `socket`.
     # Example secrets:
@@ -37,131 +61,768 @@ def get_mysql_engine():
             f"mysql+pymysql://{s['user']}:{s['password']}@{s['host']}:{s.get('port',3306)}/"
             f"{s['database']}"
         )
-    return create_engine(url, pool_pre_ping=True)
+    return get_engine(url)
 
 def _pad_fips(series: pd.Series) -> pd.Series:
-    s = series.astype(str).str.strip()
+    # pad each distinct ID once (~3k counties), then broadcast back to the rows
+    codes, uniques = pd.factorize(series)
+    s = pd.Series(uniques, dtype=object).astype(str).str.strip()
     is_num = s.str.fullmatch(r"\d+")
-    return s.where(~is_num, s.str.zfill(5))
+    padded = s.where(~is_num, s.str.zfill(5)).to_numpy(object)
+    out = np.where(codes >= 0, padded[codes] if len(padded) else None, None)
+    return pd.Series(out, index=series.index, dtype="str")
 
-@st.cache_data(show_spinner=True, ttl=300)
-def load_data(source: str = "auto"):
+# ---- Warehouse queries ----
+MYSQL_INCOME = """
+    SELECT
+        dl.county_geo_id AS county_fips,
+        dl.county_name,
+        dl.state_fips    AS state,
+        fi.year,
+        fi.income_usd
+    FROM fact_income fi
+    JOIN dim_location dl
+      ON dl.county_geo_id = fi.county_geo_id
+"""
+
+MYSQL_HOUSING_RAW = """
+    SELECT
+        {key_select}
+        fh.zip_code,
+        CONCAT(dd.year,'-', LPAD(dd.month,2,'0')) AS period,
+        fh.median_sale_price
+    FROM {tbl} fh
+    JOIN dim_date dd
+      ON dd.date_id = fh.date_id
+    WHERE fh.median_sale_price IS NOT NULL
+"""
+
+# Housing aggregates are pushed down to the warehouse. ZIP-level tables are mapped to counties
+# with a join to zip_county (HUD crosswalk) when the warehouse has it; n_obs is then the
+# residential-ratio weighted row count, so mean x n_obs stays the weighted sum.
+MYSQL_HOUSING_MONTHLY = """
+    SELECT
+        {key_select}
+        CONCAT(dd.year,'-', LPAD(dd.month,2,'0')) AS period,
+        {avg} AS median_sale_price,
+        {n_obs} AS n_obs
+    FROM {tbl} fh
+    JOIN dim_date dd
+      ON dd.date_id = fh.date_id{join}
+    WHERE fh.median_sale_price IS NOT NULL{delta}
+    GROUP BY {key_group} dd.year, dd.month
+"""
+
+MYSQL_HOUSING_YEARLY = """
+    SELECT
+        {key_select}
+        dd.year,
+        {avg} AS avg_price,
+        {n_obs} AS n_obs
+    FROM {tbl} fh
+    JOIN dim_date dd
+      ON dd.date_id = fh.date_id{join}
+    WHERE fh.median_sale_price IS NOT NULL
+    GROUP BY {key_group} dd.year
+"""
+
+MYSQL_CROSSWALK = "SELECT zip_code AS zip, county_fips AS county, res_ratio FROM zip_county"
+
+MYSQL_CPI = """
+    SELECT
+        CONCAT(dd.year,'-', LPAD(dd.month,2,'0')) AS date,
+        fc.series_id,
+        fc.cpi_value AS value
+    FROM fact_cpi fc
+    JOIN dim_date dd
+      ON dd.date_id = fc.date_id
+"""
+
+MYSQL_COUNTIES = """
+    SELECT
+        dl.county_geo_id AS county_fips,
+        dl.county_name,
+        dl.state_fips    AS state,
+        dl.state_fips    AS state_fips
+    FROM dim_location dl
+    WHERE dl.county_geo_id IS NOT NULL
+"""
+
+# Cheap change detector for the snapshot tier: no row scans, only table metadata.
+MYSQL_STAMP = """
+    SELECT table_name AS table_name, create_time AS create_time, update_time AS update_time
+    FROM information_schema.tables
+    WHERE table_schema = DATABASE()
+      AND table_name IN ('fact_income','fact_housing','fact_housing_v2','fact_cpi','dim_location','dim_date',
+                         'agg_housing_county_month','agg_housing_county_year','agg_price_to_income','zip_county')
+    ORDER BY table_name
+"""
+
+SQLITE_INCOME = "SELECT county_fips, county_name, state, year, income_usd FROM fact_income"
+
+SQLITE_HOUSING_RAW = "SELECT * FROM fact_housing WHERE median_sale_price IS NOT NULL"
+
+SQLITE_HOUSING_MONTHLY = """
+    SELECT
+        county_fips,
+        period,
+        AVG(median_sale_price) AS median_sale_price,
+        COUNT(*)               AS n_obs
+    FROM fact_housing
+    WHERE median_sale_price IS NOT NULL{delta}
+    GROUP BY county_fips, period
+"""
+
+SQLITE_HOUSING_YEARLY = """
+    SELECT
+        county_fips,
+        CAST(substr(period,1,4) AS INTEGER) AS year,
+        AVG(median_sale_price) AS avg_price,
+        COUNT(*)               AS n_obs
+    FROM fact_housing
+    WHERE median_sale_price IS NOT NULL
+    GROUP BY county_fips, CAST(substr(period,1,4) AS INTEGER)
+"""
+
+SQLITE_CPI = "SELECT date, series_id, value FROM fact_cpi"
+
+# Materialized aggregates built by lib/aggregates.py (same SQL for MySQL and SQLite).
+AGG_TABLES = ("agg_housing_county_month", "agg_housing_county_year", "agg_price_to_income")
+AGG_MONTHLY = """
+    SELECT county_fips, period, median_sale_price, n_obs
+    FROM agg_housing_county_month
+    {where}
+    ORDER BY county_fips, period
+"""
+AGG_YEARLY = "SELECT county_fips, year, avg_price, n_obs FROM agg_housing_county_year ORDER BY county_fips, year"
+AGG_RATIO = """
+    SELECT county_fips, year, avg_price, income_usd, price_to_income
+    FROM agg_price_to_income
+    ORDER BY county_fips, year
+"""
+AGG_MONTHLY_DELTA = AGG_MONTHLY.format(where="WHERE period >= :cutoff")
+
+# Incremental refresh: only periods at/after the cutoff (dim_date.date_id is YYYYMMDD).
+MYSQL_HOUSING_DELTA = "\n      AND fh.date_id >= :cutoff_id"
+MYSQL_CPI_DELTA = MYSQL_CPI + "    WHERE fc.date_id >= :cutoff_id\n"
+SQLITE_HOUSING_DELTA = "\n      AND period >= :cutoff"
+SQLITE_CPI_DELTA = SQLITE_CPI + " WHERE date >= :cutoff"
+
+SQLITE_COUNTIES = "SELECT county_fips, county_name, state, state_fips FROM dim_location"
+
+def get_sqlite_engine(db_path: str | None = None):
+    return get_engine(f"sqlite:///{db_path or SQLITE_PATH}")
+
+def _weighted_means(rows: pd.DataFrame, keys: list, value: str) -> pd.DataFrame:
+    """Crosswalk-weighted mean price per key; n_obs is the weight sum (as in the warehouse join)."""
+    rows = rows.dropna(subset=["median_sale_price"])
+    g = (rows.assign(wp=rows["median_sale_price"] * rows["weight"])
+             .groupby(keys, as_index=False, observed=True)[["wp", "weight"]].sum())
+    return pd.DataFrame({**{k: g[k] for k in keys}, value: g["wp"] / g["weight"], "n_obs": g["weight"]})
+
+def _yearly_from_rows(redfin: pd.DataFrame) -> pd.DataFrame:
+    """
+    County x year mean price from row-level (or county-month) housing data; ZIP rows mapped
+    through the crosswalk (ZipCountyIndex.to_county) carry a `weight` and get weighted means.
+    """
+    keys = ["county_fips", "year"] if "county_fips" in redfin.columns else ["year"]
+    rf = redfin.assign(year=period_parts(redfin["period"])[0])
+    if "weight" in rf.columns:
+        return _weighted_means(rf, keys, "avg_price")
+    return (rf.groupby(keys, as_index=False, observed=True)["median_sale_price"]
+              .agg(avg_price="mean", n_obs="count"))
+
+def _monthly_from_rows(redfin: pd.DataFrame) -> pd.DataFrame:
+    """County x month mean price from row-level housing data (weighted, like _yearly_from_rows)."""
+    keys = ["county_fips", "period"] if "county_fips" in redfin.columns else ["period"]
+    if "weight" in redfin.columns:
+        return _weighted_means(redfin, keys, "median_sale_price")
+    return (redfin.dropna(subset=["median_sale_price"])
+                  .groupby(keys, as_index=False, observed=True)["median_sale_price"]
+                  .agg(median_sale_price="mean", n_obs="count"))
+
+def _yearly_from_monthly(monthly: pd.DataFrame) -> pd.DataFrame:
+    """County x year mean from county x month means, exactly (mean x n_obs is the month's sum)."""
+    m = monthly.assign(year=period_parts(monthly["period"])[0],
+                       price_sum=monthly["median_sale_price"] * monthly["n_obs"])
+    g = m.groupby(["county_fips", "year"], as_index=False, observed=True)[["price_sum", "n_obs"]].sum()
+    return pd.DataFrame({"county_fips": g["county_fips"], "year": g["year"],
+                         "avg_price": g["price_sum"] / g["n_obs"], "n_obs": g["n_obs"]})
+
+def data_fingerprint(data: dict) -> str:
+    """
+    Content hash of a load_data result. load_data stores it under data["version"] so derived
+    frames (lib/derived.py) can be cached once per data version.
+    """
+    h = hashlib.sha1()
+    for name in sorted(k for k, v in data.items() if isinstance(v, pd.DataFrame)):
+        df = data[name]
+        h.update(name.encode())
+        h.update(",".join(map(str, df.columns)).encode())
+        h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()[:16]
+
+def _month_keys(s: pd.Series) -> pd.Series:
+    """Trim YYYY-MM-DD style keys to YYYY-MM (per category when already categorical)."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        if s.cat.categories.str.len().max() <= 7:
+            return s
+    return s.astype(str).str.slice(0,7)
+
+def _normalize(out: dict, compact: bool = True) -> dict:
+    for name in ("acs", "counties", "redfin", "redfin_yearly", "price_to_income"):
+        df = out.get(name)
+        # categorical FIPS come out of the streaming fold / snapshots already padded
+        if df is not None and "county_fips" in df.columns and df["county_fips"].dtype != "category":
+            df["county_fips"] = _pad_fips(df["county_fips"])
+    # rows without a month cannot be placed in time (and period_parts rejects them)
+    for name, col in (("redfin", "period"), ("cpi", "date")):
+        if out[name][col].isna().any():
+            out[name] = out[name][out[name][col].notna()].reset_index(drop=True)
+    out["redfin"]["period"] = _month_keys(out["redfin"]["period"])
+    # integer calendar keys so downstream code never re-parses the period strings
+    out["redfin"]["year"], out["redfin"]["month"] = period_parts(out["redfin"]["period"])
+    out["cpi"]["date"] = _month_keys(out["cpi"]["date"])
+    # categorical keys, float32/int32 measures (see lib/normalize.compact_frame); county-month means
+    # (redfin with n_obs) stay float64, so yearly re-derivation matches a full rebuild
+    for name, df in out.items():
+        if compact and isinstance(df, pd.DataFrame):
+            means = name == "redfin" and "n_obs" in df.columns
+            compact_frame(df, FLOAT64_COLUMNS + ("median_sale_price",) if means else FLOAT64_COLUMNS)
+    out["version"] = data_fingerprint(out)
+    return out
+
+def _housing_fmt(tbl: str, geo: str, delta: str = "") -> dict:
+    if geo == "crosswalk":
+        # residential-ratio weighted mean over the counties each ZIP overlaps
+        return dict(tbl=tbl, key_select="zc.county_fips,", key_group="zc.county_fips,", delta=delta,
+                    join="\n    JOIN zip_county zc\n      ON zc.zip_code = fh.zip_code",
+                    avg="SUM(zc.res_ratio * fh.median_sale_price) / SUM(zc.res_ratio)",
+                    n_obs="SUM(zc.res_ratio)")
+    # ZIP-only tables without a crosswalk collapse to national periods.
+    key = "fh.county_fips," if geo == "county" else ""
+    return dict(tbl=tbl, key_select=key, key_group=key, delta=delta, join="",
+                avg="AVG(fh.median_sale_price)", n_obs="COUNT(*)")
+
+def _raw_fmt(tbl: str, geo: str) -> dict:
+    # raw ZIP rows are never joined in the warehouse; the crosswalk is applied in Python if needed
+    return _housing_fmt(tbl, "county" if geo == "county" else "zip")
+
+def _load_warehouse(engine, mode: str, queries: dict, housing, xwalk: ZipCountyIndex | None = None) -> dict:
+    """
+    Pick the housing queries from the schema catalog (lib/catalog.py, no per-load probe), then
+    read acs / housing / cpi / counties in parallel (lib/engines.read_parallel). `queries` holds
+    the income, cpi and counties SQL; `housing(catalog)` returns the monthly / yearly housing SQL
+    when the aggregate tables are missing.
+    With `xwalk`, ZIP-level housing rows are read raw and mapped to counties in Python:
+    weighted rows in raw mode, weighted county x month means (crosswalk.weighted_county_prices)
+    otherwise.
+    """
+    catalog = get_catalog(engine)
+    if mode == "raw" or xwalk is not None:
+        queries["redfin"] = housing(catalog, raw=True)
+    elif catalog.has(*AGG_TABLES):
+        queries.update({"redfin": AGG_MONTHLY.format(where=""), "redfin_yearly": AGG_YEARLY,
+                        "price_to_income": AGG_RATIO})
+    else:
+        queries["redfin"], queries["redfin_yearly"] = housing(catalog)
+    _warn_scans(engine, queries)
+    out = read_parallel(engine, queries)
+    if xwalk is not None and "county_fips" not in out["redfin"].columns:
+        if mode == "raw":
+            out["redfin"] = xwalk.to_county(out["redfin"])
+        else:
+            out["redfin"] = weighted_county_prices(out["redfin"], xwalk)
+            out["redfin_yearly"] = _yearly_from_monthly(out["redfin"])
+    if mode == "raw":
+        out["redfin_yearly"] = _yearly_from_rows(out["redfin"])
+    return out
+
+def _mysql_crosswalk(engine, mode: str) -> ZipCountyIndex | None:
+    """
+    Crosswalk for mapping ZIP-level MySQL housing in Python, or None when no mapping is needed
+    here: county-level housing, or aggregate mode over a zip_county table (joined in the warehouse).
+    The read path never writes to the warehouse: without zip_county the local crosswalk file is
+    applied in memory (publishing it is an admin step, python -m lib.aggregates --publish-crosswalk).
+    """
+    tbl, geo = get_catalog(engine).housing_table()
+    if geo == "county" or (geo == "crosswalk" and mode not in ("raw", "stream")):
+        return None
+    if geo == "zip":
+        xwalk = load_crosswalk()
+        if xwalk is None:
+            logger.warning("%s has no county_fips and no crosswalk file: ZIP rows collapse to national means.", tbl)
+        elif not os.path.exists(CROSSWALK_PATH):
+            logger.warning("%s is mapped with the bundled sample crosswalk: ZIPs outside its metros are "
+                           "dropped. Install the HUD file as %s.", tbl, CROSSWALK_PATH)
+        return xwalk
+    with engine.connect() as conn:
+        return ZipCountyIndex.from_frame(pd.read_sql(text(MYSQL_CROSSWALK), conn))
+
+def _warn_scans(engine, queries: dict):
+    """Log full scans of large fact tables in the loader queries (EXPLAIN runs once per query per process)."""
+    for name, q in queries.items():
+        sql, params = q if isinstance(q, tuple) else (q, None)
+        for w in scan_warnings(engine, sql, params, facts_only=True):
+            logger.warning("load_data %s: %s", name, w)
+
+def _mysql_housing(catalog, raw: bool = False):
+    # ---- Housing: fact_housing_v2 / fact_housing when the aggregates are not built ----
+    tbl, geo = catalog.housing_table()
+    if raw:
+        return MYSQL_HOUSING_RAW.format(**_raw_fmt(tbl, geo))
+    fmt = _housing_fmt(tbl, geo)
+    return MYSQL_HOUSING_MONTHLY.format(**fmt), MYSQL_HOUSING_YEARLY.format(**fmt)
+
+def _sqlite_housing(catalog, raw: bool = False):
+    if raw:
+        return SQLITE_HOUSING_RAW
+    return SQLITE_HOUSING_MONTHLY.format(delta=""), SQLITE_HOUSING_YEARLY
+
+def _load_mysql(mode: str) -> dict:
+    # income by county/year, CPI monthly, county labels (for income/map) + housing
+    engine = get_mysql_engine()
+    queries = {"acs": MYSQL_INCOME, "cpi": MYSQL_CPI, "counties": MYSQL_COUNTIES}
+    return _load_warehouse(engine, mode, queries, _mysql_housing, _mysql_crosswalk(engine, mode))
+
+def _load_sqlite(mode: str) -> dict:
+    queries = {"acs": SQLITE_INCOME, "cpi": SQLITE_CPI, "counties": SQLITE_COUNTIES}
+    return _load_warehouse(get_sqlite_engine(), mode, queries, _sqlite_housing)
+
+def _load_csv(mode: str) -> dict:
+    acs = read_csv(CSV_FILES["acs"])
+    redfin = read_csv(CSV_FILES["redfin"])
+    cpi = read_csv(CSV_FILES["cpi"])
+    counties = read_csv(CSV_FILES["counties"])
+
+    redfin["period"] = redfin["period"].astype(str).str.slice(0,7)
+    redfin_yearly = _yearly_from_rows(redfin)
+    if mode != "raw":
+        redfin = _monthly_from_rows(redfin)
+    return {"acs": acs, "redfin": redfin, "cpi": cpi, "counties": counties,
+            "redfin_yearly": redfin_yearly}
+
+def _load_stream(source: str) -> dict:
+    """
+    Bounded-memory load: the housing fact (and CPI) are read in CHUNK_ROWS chunks and folded
+    into county x month / county x year aggregates as they arrive. See lib/streaming.py for
+    the peak-memory ceiling.
+    """
+    if source == "mysql":
+        engine = get_mysql_engine()
+        # ZIP rows are mapped to counties chunk by chunk (warehouse crosswalk, else the local file)
+        xwalk = _mysql_crosswalk(engine, "stream")
+        with engine.connect() as conn:
+            acs = pd.read_sql(text(MYSQL_INCOME), conn)
+            counties = pd.read_sql(text(MYSQL_COUNTIES), conn)
+            tbl, geo = get_catalog(engine).housing_table()
+            # stream_results switches PyMySQL to an unbuffered server-side cursor
+            sconn = conn.execution_options(stream_results=True, max_row_buffer=CHUNK_ROWS)
+            housing = MYSQL_HOUSING_RAW.format(**_raw_fmt(tbl, geo))
+            redfin, redfin_yearly = fold_housing(
+                pd.read_sql(text(housing), sconn, chunksize=CHUNK_ROWS), _pad_fips, xwalk)
+            cpi = concat_downcast(pd.read_sql(text(MYSQL_CPI), sconn, chunksize=CHUNK_ROWS))
+    elif source == "sqlite":
+        engine = get_sqlite_engine()
+        with engine.connect() as conn:
+            acs = pd.read_sql(text(SQLITE_INCOME), conn)
+            counties = pd.read_sql(text(SQLITE_COUNTIES), conn)
+            redfin, redfin_yearly = fold_housing(
+                pd.read_sql(text(SQLITE_HOUSING_RAW), conn, chunksize=CHUNK_ROWS), _pad_fips)
+            cpi = concat_downcast(pd.read_sql(text(SQLITE_CPI), conn, chunksize=CHUNK_ROWS))
+    else:
+        acs = read_csv(CSV_FILES["acs"])
+        counties = read_csv(CSV_FILES["counties"])
+        usecols = lambda c: c in ("county_fips", "period", "median_sale_price")
+        with pd.read_csv(os.path.join(DATA_DIR, CSV_FILES["redfin"]), usecols=usecols,
+                         dtype={"county_fips": str, "period": str}, chunksize=CHUNK_ROWS) as chunks:
+            redfin, redfin_yearly = fold_housing(chunks, _pad_fips)
+        with pd.read_csv(os.path.join(DATA_DIR, CSV_FILES["cpi"]),
+                         dtype={"date": str, "series_id": str}, chunksize=CHUNK_ROWS) as chunks:
+            cpi = concat_downcast(chunks)
+    return {"acs": acs, "redfin": redfin, "cpi": cpi, "counties": counties,
+            "redfin_yearly": redfin_yearly}
+
+# ---- Incremental refresh ----
+RESTATEMENT_MONTHS = 3  # periods before the watermark that are re-fetched, to pick up revisions
+
+def _load_delta(source: str, cutoff: str) -> dict:
+    """County x month housing aggregates and CPI rows for periods >= cutoff (YYYY-MM), plus the small dims."""
+    if source == "mysql":
+        engine, params = get_mysql_engine(), {"cutoff_id": int(cutoff.replace("-", "") + "01")}
+        queries = {"acs": MYSQL_INCOME, "counties": MYSQL_COUNTIES, "cpi": (MYSQL_CPI_DELTA, params)}
+        catalog = get_catalog(engine)
+        aggs = catalog.has(*AGG_TABLES)
+        # ZIP rows without zip_county are mapped in Python, exactly as the full load does
+        xwalk = None if aggs else _mysql_crosswalk(engine, "aggregate")
+        if xwalk is not None:
+            queries["redfin"] = (MYSQL_HOUSING_RAW.format(**_raw_fmt(*catalog.housing_table()))
+                                 + MYSQL_HOUSING_DELTA, params)
+        elif not aggs:
+            fmt = _housing_fmt(*catalog.housing_table(), delta=MYSQL_HOUSING_DELTA)
+            queries["redfin"] = (MYSQL_HOUSING_MONTHLY.format(**fmt), params)
+    else:
+        engine, params, xwalk = get_sqlite_engine(), {"cutoff": cutoff}, None
+        queries = {"acs": SQLITE_INCOME, "counties": SQLITE_COUNTIES, "cpi": (SQLITE_CPI_DELTA, params)}
+        aggs = get_catalog(engine).has(*AGG_TABLES)
+        if not aggs:
+            queries["redfin"] = (SQLITE_HOUSING_MONTHLY.format(delta=SQLITE_HOUSING_DELTA), params)
+    if aggs:
+        queries["redfin"] = (AGG_MONTHLY_DELTA, {"cutoff": cutoff})
+        queries["price_to_income"] = AGG_RATIO  # a few thousand rows: re-read whole
+    out = read_parallel(engine, queries)
+    if xwalk is not None and "county_fips" not in out["redfin"].columns:
+        out["redfin"] = weighted_county_prices(out["redfin"], xwalk)
+    redfin, cpi = out["redfin"], out["cpi"]
+    if "county_fips" in redfin.columns:
+        redfin["county_fips"] = _pad_fips(redfin["county_fips"])
+    redfin["period"] = redfin["period"].astype(str).str.slice(0,7)
+    cpi["date"] = cpi["date"].astype(str).str.slice(0,7)
+    return out
+
+def _decategorize(df: pd.DataFrame) -> pd.DataFrame:
+    """Plain str keys, so concatenating with a freshly loaded delta keeps one consistent dtype."""
+    cats = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    return df.astype({c: str for c in cats}) if cats else df
+
+def _merge_delta(prev: dict, delta: dict, cutoff: str) -> dict:
+    """
+    Replace every period >= cutoff in the previous frames with the delta, and re-derive the
+    yearly means only for the years the delta touches (exactly, from monthly mean x n_obs).
+    """
+    # compare integer YYYYMM keys: periods may be categorical after _normalize
+    old = prev["redfin"].drop(columns=["year", "month"], errors="ignore")
+    old = old[period_key(old["period"]) < period_key(cutoff)]
+    redfin = pd.concat([_decategorize(old), delta["redfin"]], ignore_index=True)
+    keys = ["county_fips"] if "county_fips" in redfin.columns else []
+    redfin = redfin.sort_values(keys + ["period"], ignore_index=True)
+
+    first_year = int(cutoff[:4])
+    recent = redfin[period_key(redfin["period"]) >= first_year * 100 + 1]
+    recent = recent.assign(year=period_parts(recent["period"])[0],
+                           price_sum=recent["median_sale_price"].to_numpy(np.float64)
+                                     * recent["n_obs"].to_numpy(np.float64))
+    ysum = recent.groupby(keys + ["year"], as_index=False)[["price_sum", "n_obs"]].sum()
+    ysum["avg_price"] = ysum["price_sum"] / ysum["n_obs"]
+    old_yearly = prev["redfin_yearly"]
+    redfin_yearly = pd.concat([_decategorize(old_yearly[old_yearly["year"] < first_year]),
+                               ysum[keys + ["year", "avg_price", "n_obs"]]], ignore_index=True)
+
+    old_cpi = prev["cpi"]
+    old_cpi = old_cpi[period_key(old_cpi["date"]) < period_key(cutoff)]
+    cpi = pd.concat([_decategorize(old_cpi), delta["cpi"]], ignore_index=True)
+    out = {"acs": delta["acs"], "redfin": redfin, "cpi": cpi, "counties": delta["counties"],
+           "redfin_yearly": redfin_yearly}
+    if "price_to_income" in delta:
+        out["price_to_income"] = delta["price_to_income"]
+    return out
+
+def refresh_incremental(source: str, prev: dict, restatement_months: int = RESTATEMENT_MONTHS) -> dict:
+    """
+    Refresh an aggregate-mode load by fetching only periods after the loaded watermark
+    (max period / date already held) minus a restatement window. Cost scales with the delta.
+    """
+    watermark = int(min(period_key(prev["redfin"]["period"]).max(), period_key(prev["cpi"]["date"]).max()))
+    cutoff = str(pd.Period(f"{watermark // 100}-{watermark % 100:02d}", freq="M") - restatement_months)
+    return _normalize(_merge_delta(prev, _load_delta(source, cutoff), cutoff))
+
+def warehouse_stamp(source: str) -> str:
+    """
+    Cheap fingerprint of the source's current state (no data scan): MySQL table create/update
+    times, or file size + mtime for the SQLite warehouse and CSV samples.
+    Note: InnoDB only tracks update_time since the last server restart (NULL before any write).
+    """
+    h = hashlib.sha1(f"schema:{SCHEMA_VERSION}".encode())
+    if source == "mysql":
+        with get_mysql_engine().connect() as conn:
+            h.update(pd.read_sql(text(MYSQL_STAMP), conn).to_csv(index=False).encode())
+    else:
+        paths = [SQLITE_PATH] if source == "sqlite" else [os.path.join(DATA_DIR, f) for f in CSV_FILES.values()]
+        for path in paths:
+            st_ = os.stat(path)
+            h.update(f"{path}:{st_.st_size}:{st_.st_mtime_ns}".encode())
+    return h.hexdigest()[:16]
+
+_LOADERS = {"mysql": _load_mysql, "sqlite": _load_sqlite, "csv": _load_csv}
+
+def _load_source(source: str, mode: str, refresh: str = "incremental") -> dict:
+    """
+    Serve from the local Arrow snapshot when the warehouse stamp is unchanged. Otherwise refresh
+    incrementally from the last snapshot (aggregate mode on a warehouse), or do a full load.
+    """
+    stamp = warehouse_stamp(source)
+    snap = read_snapshot(source, mode, stamp)
+    if snap is not None:
+        return snap
+    prev = None
+    if refresh == "incremental" and mode == "aggregate" and source in ("mysql", "sqlite"):
+        prev = read_snapshot(source, mode)
+    if prev is not None and not prev["redfin"].empty and not prev["cpi"].empty:
+        out = refresh_incremental(source, prev)
+    else:
+        out = _normalize(_load_stream(source) if mode == "stream" else _LOADERS[source](mode))
+    try:
+        write_snapshot(source, mode, out, stamp)
+    except OSError:
+        pass  # read-only deploys just run without the snapshot tier
+    return out
+
+# ---- Session uploads (lib/uploads.py) ----
+UPLOADS_KEY = "uploads"   # st.session_state[UPLOADS_KEY] = {kind: {"id", "frames", ...}}
+
+def with_uploads(data: dict, uploads: dict) -> dict:
+    """
+    Overlay uploaded frames on a load_data result. The overlay is re-normalized and
+    re-fingerprinted, so it is a new data version for lib/derived.py (flagged "uploaded", so
+    its derived frames are cached apart from the shared ones). A warehouse-computed
+    price_to_income no longer matches once income or prices are replaced, so it is dropped.
     """
-    Returns dict: {acs, redfin, cpi, counties}
+    out = {k: v.copy(deep=False) if isinstance(v, pd.DataFrame) else v
+           for k, v in data.items() if k != "version"}
+    for rec in uploads.values():
+        out.update({k: v.copy(deep=False) for k, v in rec["frames"].items()})
+    if {"acs", "redfin"} & set(uploads):
+        out.pop("price_to_income", None)
+    out = _normalize(out)
+    out["uploaded"] = True
+    return out
+
+def _session_uploads(data: dict) -> dict:
+    """load_data result with this session's uploads applied (memoized per base version + uploads)."""
+    try:
+        uploads = st.session_state.get(UPLOADS_KEY)
+    except Exception:
+        return data  # no session (bare scripts, background threads)
+    if not uploads:
+        return data
+    key = (data["version"], tuple(sorted((k, r["id"]) for k, r in uploads.items())))
+    memo = st.session_state.get("_uploads_applied")
+    if memo is None or memo[0] != key:
+        memo = (key, with_uploads(data, uploads))
+        st.session_state["_uploads_applied"] = memo
+    return memo[1]
+
+def load_data(source: str = "auto", mode: str = "aggregate", refresh: str = "incremental",
+              uploads: bool = True):
+    """
+    Returns dict: {acs, redfin, cpi, counties, redfin_yearly, version}
+    (version is the content fingerprint used to key derived frames in lib/derived.py)
+    plus price_to_income when it was read from the materialized agg_price_to_income table.
+
+    mode="aggregate" (default) pushes the monthly->yearly price aggregation into the warehouse:
+      - redfin:        county x month (period=YYYY-MM) mean median_sale_price plus n_obs.
+      - redfin_yearly: county x year avg_price plus n_obs.
+    mode="stream" returns the same aggregates, but folds the raw fact rows chunk by chunk in
+    Python (server-side cursor / chunksize) with a peak memory independent of row count.
+    mode="raw" returns the row-level housing fact (ZIP rows in MySQL); prefer load_raw_housing
+    for drill-down so the full fact table is never pulled on a cold start.
 
     MySQL:
-      - Prices from fact_housing(_v2) at ZIP level, aggregated monthly (period=YYYY-MM).
+      - Prices from fact_housing(_v2), grouped by county when the table has county_fips, or
+        joined through the zip_county crosswalk table (residential-ratio weighted) when it exists.
+        Otherwise ZIP-only tables collapse to national monthly/yearly means, except in
+        mode="stream", which applies the local crosswalk file (lib/crosswalk.py) per chunk.
       - Income from fact_income joined with dim_location (county_geo_id).
       - CPI from fact_cpi joined with dim_date.
       - Counties from dim_location (county_geo_id).  (Used for labels/maps if mappable.)
+    SQLite:
+      - Same contract from the sample warehouse (data/sample_dw.sqlite).
+    Both warehouses prefer the materialized agg_* tables (lib/aggregates.py) when they exist.
+
+    Every source is backed by a local Arrow snapshot (lib/snapshot.py): when the warehouse
+    stamp is unchanged since the last load, frames are read from disk instead.
+    When it has changed, refresh="incremental" (aggregate mode, MySQL/SQLite) only fetches periods
+    after the snapshot's watermark minus RESTATEMENT_MONTHS; refresh="full" always reloads.
+
+    Results are kept per argument set and served immediately; once older than
+    refresher.REFRESH_S a single background reload re-checks the warehouse and swaps the new
+    version in (stale-while-revalidate, lib/refresher.py). Only a cold process waits on a load.
+
+    Files uploaded on the Settings page (lib/uploads.py) replace the matching frames for that
+    session only, as a separate data version (aggregate/stream modes; uploads=False skips them).
     """
+    data = _load_data(source, mode, refresh)
+    return _session_uploads(data) if uploads and mode != "raw" else data
+
+def _load_data(source: str, mode: str, refresh: str) -> dict:
+    """Last good load for these arguments; refreshed in the background once stale (lib/refresher.py)."""
+    key = (source, mode, refresh)
+    with trace("load_data") as span:
+        span.cache = "miss" if refresher.status(key)["version"] is None else "hit"
+        # only a cold load may fall back to the CSV samples: a failed background reload must raise,
+        # so the refresher keeps serving the last good frames and retries after RETRY_S
+        loader = lambda: _fetch(source, mode, refresh, fallback=refresher.status(key)["version"] is None)
+        return span.output(refresher.serve(key, loader))
+
+def data_status(source: str = "auto", mode: str = "aggregate", refresh: str = "incremental") -> dict:
+    """When the load_data result for these arguments was last confirmed current, and whether a reload is running."""
+    return refresher.status((source, mode, refresh))
+
+def _fetch(source: str, mode: str, refresh: str, fallback: bool = True) -> dict:
+    """Load `source`; on failure fall back to the CSV samples, or raise when fallback=False."""
     if source == "auto":
         source = "mysql" if secrets_has_mysql() else "csv"
 
+    if source == "mysql":
+        try:
+            return _load_source("mysql", mode, refresh)
+        except Exception as e:
+            if not fallback:
+                raise
+            st.warning(f"MySQL load failed ({e}). Falling back to CSV samples.")
+    elif source == "sqlite":
+        try:
+            return _load_source("sqlite", mode, refresh)
+        except Exception as e:
+            if not fallback:
+                raise
+            st.warning(f"SQLite load failed ({e}). Falling back to CSV samples.")
+
+    # ---- CSV fallback (shipped with the project) ----
+    return _load_source("csv", mode, refresh)
+
+@st.cache_data(show_spinner=True, ttl=300)
+def load_raw_housing(source: str = "auto", county_fips: str | None = None, year: int | None = None):
+    """
+    Drill-down: row-level housing data, filtered in the warehouse by county and/or year.
+    MySQL ZIP-level tables are filtered by county through zip_county (joined), or through the
+    local crosswalk's ZIP list when the warehouse has no crosswalk table.
+    """
+    if source == "auto":
+        source = "mysql" if secrets_has_mysql() else "csv"
+
+    params = {}
     if source == "mysql":
         try:
             engine = get_mysql_engine()
+            catalog = get_catalog(engine)
             with engine.begin() as conn:
-                # ---- Income by county/year ----
-                acs = pd.read_sql(text("""
-                    SELECT
-                        dl.county_geo_id AS county_fips,
-                        dl.county_name,
-                        dl.state_fips    AS state,
-                        fi.year,
-                        fi.income_usd
-                    FROM fact_income fi
-                    JOIN dim_location dl
-                      ON dl.county_geo_id = fi.county_geo_id
-                """), conn)
-
-                # ---- Housing monthly from fact_housing_v2 if exists, else fact_housing (ZIP level) ----
-                tbl = "fact_housing_v2"
-                exists = pd.read_sql(text("""
-                    SELECT 1
-                    FROM information_schema.tables
-                    WHERE table_schema = DATABASE() AND table_name = 'fact_housing_v2'
-                    LIMIT 1
-                """), conn).shape[0] == 1
-                if not exists:
-                    tbl = "fact_housing"
-
-                redfin = pd.read_sql(text(f"""
+                tbl, geo = catalog.housing_table()
+                join, where, zips = "", ["fh.median_sale_price IS NOT NULL"], None
+                if county_fips is not None and geo == "county":
+                    where.append("fh.county_fips = :county_fips")
+                    params["county_fips"] = county_fips
+                elif county_fips is not None and geo == "crosswalk":
+                    join = ("JOIN (SELECT DISTINCT zip_code FROM zip_county WHERE county_fips = :county_fips) zc"
+                            " ON zc.zip_code = fh.zip_code")
+                    params["county_fips"] = county_fips
+                elif county_fips is not None:
+                    xwalk = load_crosswalk()
+                    zips = xwalk.zips_for(county_fips) if xwalk is not None else []
+                    where.append("fh.zip_code IN :zips" if zips else "1 = 0")
+                    if zips:
+                        params["zips"] = zips
+                if year is not None:
+                    where.append("dd.year = :year")
+                    params["year"] = int(year)
+                # only the key columns this table actually has
+                cols = ", ".join(f"fh.{c}" for c in ("county_fips", "zip_code") if c in catalog.columns(tbl))
+                query = text(f"""
                     SELECT
-                        fh.zip_code,
+                        {cols},
                         CONCAT(dd.year,'-', LPAD(dd.month,2,'0')) AS period,
                         fh.median_sale_price
                     FROM {tbl} fh
                     JOIN dim_date dd
                       ON dd.date_id = fh.date_id
-                    WHERE fh.median_sale_price IS NOT NULL
-                """), conn)
-
-                # ---- CPI monthly ----
-                cpi = pd.read_sql(text("""
-                    SELECT
-                        CONCAT(dd.year,'-', LPAD(dd.month,2,'0')) AS date,
-                        fc.series_id,
-                        fc.cpi_value AS value
-                    FROM fact_cpi fc
-                    JOIN dim_date dd
-                      ON dd.date_id = fc.date_id
-                """), conn)
-
-                # ---- County labels (for income/map) ----
-                counties = pd.read_sql(text("""
-                    SELECT
-                        dl.county_geo_id AS county_fips,
-                        dl.county_name,
-                        dl.state_fips    AS state,
-                        dl.state_fips    AS state_fips
-                    FROM dim_location dl
-                    WHERE dl.county_geo_id IS NOT NULL
-                """), conn)
-
-            # normalize
-            if "county_fips" in acs.columns:
-                acs["county_fips"] = _pad_fips(acs["county_fips"])
-            if "county_fips" in counties.columns:
-                counties["county_fips"] = _pad_fips(counties["county_fips"])
-            redfin["period"] = redfin["period"].astype(str).str.slice(0,7)
-            cpi["date"] = cpi["date"].astype(str).str.slice(0,7)
-
-            return {"acs": acs, "redfin": redfin, "cpi": cpi, "counties": counties}
+                    {join}
+                    WHERE {" AND ".join(where)}
+                """)
+                if zips:
+                    query = query.bindparams(bindparam("zips", expanding=True))
+                out = pd.read_sql(query, conn, params=params)
+            if "county_fips" in out.columns:
+                out["county_fips"] = _pad_fips(out["county_fips"])
+            return out
         except Exception as e:
-            st.warning(f"MySQL load failed ({e}). Falling back to CSV samples.")
-
-    # ---- CSV fallback (shipped with the project) ----
-    acs = read_csv("acs_income_sample.csv")
-    redfin = read_csv("redfin_housing_sample.csv")
-    cpi = read_csv("bls_cpi_sample.csv")
-    counties = read_csv("county_fips_sample.csv")
+            st.warning(f"MySQL drill-down failed ({e}). Falling back to CSV samples.")
 
-    for df in (acs, counties):
-        if "county_fips" in df.columns:
-            df["county_fips"] = _pad_fips(df["county_fips"])
-    redfin["period"] = redfin["period"].astype(str).str.slice(0,7)
-    cpi["date"] = cpi["date"].astype(str).str.slice(0,7)
+    if source == "sqlite":
+        where = ["median_sale_price IS NOT NULL"]
+        if county_fips is not None:
+            where.append("county_fips = :county_fips")
+            # zero-padded TEXT, as lib/warehouse stores it (an INTEGER column converts it on compare)
+            params["county_fips"] = str(county_fips).zfill(5) if str(county_fips).isdigit() else county_fips
+        if year is not None:
+            where.append("substr(period,1,4) = :year")
+            params["year"] = str(int(year))
+        with get_sqlite_engine().connect() as conn:
+            out = pd.read_sql(text(f"SELECT * FROM fact_housing WHERE {' AND '.join(where)}"), conn, params=params)
+        out["county_fips"] = _pad_fips(out["county_fips"])
+    else:
+        out = read_csv(CSV_FILES["redfin"])
+        out["county_fips"] = _pad_fips(out["county_fips"])
+        if county_fips is not None:
+            out = out[out["county_fips"] == county_fips]
+        if year is not None:
+            out = out[out["period"].astype(str).str.startswith(str(int(year)))]
+    return out.reset_index(drop=True)
 
-    return {"acs": acs, "redfin": redfin, "cpi": cpi, "counties": counties}
+def _county_year_means(fips: pd.Series, year: np.ndarray, price: np.ndarray):
+    """
+    Mean price per (county, year) with a single bincount pass over integer keys.
+    Returns (uniques, y0, n_years, flat_idx, means); flat_idx = county_code * n_years + (year - y0).
+    """
+    codes, uniques = pd.factorize(fips, sort=True)
+    uniques = pd.Index(uniques)
+    y0 = int(year.min())
+    n_years = int(year.max()) - y0 + 1
+    ok = (codes >= 0) & ~np.isnan(price)
+    key = codes[ok].astype(np.int64) * n_years + (year[ok].astype(np.int64) - y0)
+    size = len(uniques) * n_years
+    counts = np.bincount(key, minlength=size)
+    sums = np.bincount(key, weights=price[ok], minlength=size)
+    idx = np.flatnonzero(counts)
+    return uniques, y0, n_years, idx, sums[idx] / counts[idx]
 
-def compute_price_to_income(acs: pd.DataFrame, redfin: pd.DataFrame) -> pd.DataFrame:
+@traced("compute_price_to_income")
+def compute_price_to_income(acs: pd.DataFrame, redfin: pd.DataFrame, redfin_yearly: pd.DataFrame | None = None) -> pd.DataFrame:
     """
-    County-level: requires redfin to have county_fips.
-    Since your housing is ZIP-level (no county mapping yet), we return an EMPTY df with expected columns.
+    County-level: requires redfin to have county_fips (the loaders map ZIP-level housing to
+    counties through the crosswalk before this is called); without it we return an EMPTY df
+    with expected columns.
     The app/pages will detect this and fall back gracefully.
+    Pass load_data()["redfin_yearly"] to reuse the warehouse-side yearly aggregate.
+
+    Vectorized: county/year pairs become flat integer keys, yearly means are one np.bincount, and the
+    ACS income join is a dense array lookup, so the input frame is never copied or merged.
+    Rows with a missing price are ignored.
     """
     expected_cols = ["county_fips","year","avg_price","income_usd","price_to_income"]
     if "county_fips" not in redfin.columns:
         return pd.DataFrame(columns=expected_cols)
 
-    rf = redfin.copy()
-    rf["year"] = rf["period"].str.slice(0,4).astype(int)
-    yearly = (rf.groupby(["county_fips","year"], as_index=False)["median_sale_price"]
-                .mean().rename(columns={"median_sale_price":"avg_price"}))
-    out = yearly.merge(acs[["county_fips","year","income_usd"]], on=["county_fips","year"], how="left")
-    out["price_to_income"] = (out["avg_price"] / out["income_usd"]).round(2)
-    return out[expected_cols]
+    if redfin_yearly is not None and "county_fips" in redfin_yearly.columns:
+        fips = redfin_yearly["county_fips"]
+        year = redfin_yearly["year"].to_numpy()
+        price = redfin_yearly["avg_price"].to_numpy(np.float64)
+    else:
+        fips = redfin["county_fips"]
+        year = redfin["year"].to_numpy() if "year" in redfin.columns else period_parts(redfin["period"])[0]
+        price = redfin["median_sale_price"].to_numpy(np.float64)
+    if len(fips) == 0:
+        return pd.DataFrame(columns=expected_cols)
+
+    uniques, y0, n_years, idx, avg = _county_year_means(fips, year, price)
+
+    # ACS income scattered into the same (county, year) grid, then gathered at the price keys
+    income = np.full(len(uniques) * n_years, np.nan)
+    acs_code = uniques.get_indexer(acs["county_fips"])
+    acs_year = acs["year"].to_numpy(np.int64) - y0
+    m = (acs_code >= 0) & (acs_year >= 0) & (acs_year < n_years)
+    income[acs_code[m] * n_years + acs_year[m]] = acs["income_usd"].to_numpy(np.float64)[m]
+    income = income[idx]
+
+    return pd.DataFrame({
+        "county_fips": uniques.take(idx // n_years),
+        "year": (idx % n_years + y0).astype(np.int64),
+        "avg_price": avg,
+        "income_usd": income,
+        "price_to_income": np.round(avg / income, 2),
+    })
 
+@traced("cpi_pivot")
 def cpi_pivot(cpi: pd.DataFrame) -> pd.DataFrame:
+    # plain str labels: categorical keys would give a CategoricalIndex header and a categorical date
+    cpi = cpi.assign(date=cpi["date"].astype(str), series_id=cpi["series_id"].astype(str))
     return cpi.pivot_table(index="date", columns="series_id", values="value").reset_index()
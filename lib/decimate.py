@@ -0,0 +1,77 @@
+"""
+Line-chart decimation: keep at most a fixed number of points per series before anything is
+handed to Plotly.
+
+    lttb     largest-triangle-three-buckets; keeps the visual shape (peaks, turns) of a series
+    minmax   min and max of each x bucket; cheaper, fully vectorized, never hides an extreme
+
+Both return indices into the (x-sorted) input, so the original values are plotted unchanged.
+Decimation runs on the visible x range only: narrowing the range re-selects points from the
+full-resolution series, and once the range holds fewer points than the budget nothing is dropped.
+"""
+import numpy as np
+import pandas as pd
+
+POINTS_PER_SERIES = 500
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    csx = np.concatenate([[0.0], np.cumsum(x)])
+    csy = np.concatenate([[0.0], np.cumsum(y)])
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        if nhi <= nlo:
+            nlo, nhi = n - 1, n
+        # average of the next bucket, from prefix sums
+        cx = (csx[nhi] - csx[nlo]) / (nhi - nlo)
+        cy = (csy[nhi] - csy[nlo]) / (nhi - nlo)
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+def minmax(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    n = len(x)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    n_buckets = (n_out - 2) // 2            # +2 for the pinned endpoints
+    span = x[-1] - x[0]
+    bucket = np.minimum(((x - x[0]) / span * n_buckets).astype(np.int64), n_buckets - 1) if span else np.zeros(n, np.int64)
+    order = np.lexsort((y, bucket))          # by bucket, then value
+    b = bucket[order]
+    first = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    last = np.r_[first[1:] - 1, n - 1]
+    return np.unique(np.concatenate([order[first], order[last], [0, n - 1]]))
+
+METHODS = {"lttb": lttb, "minmax": minmax}
+
+def decimate_wide(wide: pd.DataFrame, x: str, series: list, budget: int = POINTS_PER_SERIES,
+                  x_range: tuple | None = None, method: str = "lttb") -> pd.DataFrame:
+    """
+    Long (x, series_id, value) frame with at most `budget` points per series, taken from rows
+    with x_range[0] <= x <= x_range[1] (all rows when None). `x` must sort chronologically
+    (e.g. YYYY-MM strings); decimation uses row position within the range as the x axis.
+    """
+    wide = wide.sort_values(x)
+    if x_range is not None:
+        wide = wide[(wide[x] >= x_range[0]) & (wide[x] <= x_range[1])]
+    pick = METHODS[method]
+    xs = wide[x].to_numpy()
+    parts = []
+    for s in series:
+        y = wide[s].to_numpy(np.float64)
+        ok = np.flatnonzero(~np.isnan(y))
+        idx = ok[pick(ok.astype(np.float64), y[ok], budget)]
+        parts.append(pd.DataFrame({x: xs[idx], "series_id": s, "value": y[idx]}))
+    if not parts:
+        return pd.DataFrame(columns=[x, "series_id", "value"])
+    return pd.concat(parts, ignore_index=True)
@@ -0,0 +1,196 @@
+"""
+CPI deflation: nominal prices and incomes -> constant ("real") dollars of a chosen base period.
+
+A CpiDeflator holds every CPI series as one dense float64 matrix, levels[series, month], with months
+counted from January of the first CPI year (built with a single scatter, no per-series loop).
+Deflating to base period b with series s multiplies a nominal value at month t by
+
+    factor[s, t] = CPI[s, b] / CPI[s, t]
+
+so real values are in "base-period dollars". The base is a month ("2024-12") or a year ("2024",
+the average of its months); by default the latest month every series has. factors(base) rebases all
+series in one broadcasted division and is cached per (series, base); annual factors divide by the
+year's average CPI and are used for yearly values such as ACS income.
+
+real_price_to_income() applies the factors to every county-month price row (one gather + multiply),
+folds real and nominal prices to county-year means with np.bincount over the same flat keys, and deflates the
+matching ACS incomes with the annual factor of their year. Prices and incomes can use different
+series: with the same series the real ratio differs from the nominal one only through the timing of
+prices within the year; deflating prices by shelter CPI (CUUR0000SAH) and incomes by all items
+(CUUR0000SA0) gives the ratio net of housing-specific inflation.
+
+Deflators are built once per data version by lib/derived.get_deflator.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from lib.normalize import period_parts
+from lib.tracing import traced
+
+ALL_ITEMS = "CUUR0000SA0"
+SHELTER = "CUUR0000SAH"
+
+class CpiDeflator:
+    def __init__(self, series: pd.Index, y0: int, levels: np.ndarray):
+        self.series = series        # series_id per row of levels
+        self.y0 = y0                # levels[:, 0] is January of y0
+        self.levels = levels        # (n_series, 12 * n_years) CPI, NaN where a series has no value
+        self._cache: dict = {}      # (series or None, base, annual) -> factors
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, cpi: pd.DataFrame) -> "CpiDeflator":
+        """cpi: long ['date' (YYYY-MM), 'series_id', 'value'] as returned by load_data."""
+        codes, series = pd.factorize(cpi["series_id"].astype(str), sort=True)
+        if len(cpi) == 0:
+            return cls(pd.Index(series), 0, np.empty((0, 0)))
+        year, month = period_parts(cpi["date"])
+        y0 = int(year.min())
+        n_years = int(year.max()) - y0 + 1
+        levels = np.full((len(series), 12 * n_years), np.nan)
+        levels[codes, (year.astype(np.int64) - y0) * 12 + month - 1] = cpi["value"].to_numpy(np.float64)
+        return cls(pd.Index(series), y0, levels)
+
+    # ---- periods ----
+    @property
+    def months(self) -> list[str]:
+        """YYYY-MM of every month with at least one CPI value (candidate base months)."""
+        m = np.flatnonzero(~np.isnan(self.levels).all(axis=0)) if self.levels.size else np.array([], int)
+        return [f"{self.y0 + i // 12}-{i % 12 + 1:02d}" for i in m]
+
+    def default_base(self) -> str | None:
+        """Latest month every series has a value for (else the latest month any series has)."""
+        if not self.levels.size:
+            return None
+        full = np.flatnonzero(~np.isnan(self.levels).any(axis=0))
+        i = int(full[-1]) if len(full) else int(np.flatnonzero(~np.isnan(self.levels).all(axis=0))[-1])
+        return f"{self.y0 + i // 12}-{i % 12 + 1:02d}"
+
+    def _month_index(self, year: np.ndarray, month: np.ndarray) -> np.ndarray:
+        """Column of levels for each (year, month); -1 outside the CPI range."""
+        idx = (year.astype(np.int64) - self.y0) * 12 + month.astype(np.int64) - 1
+        return np.where((idx >= 0) & (idx < self.levels.shape[1]), idx, -1)
+
+    def _annual(self) -> np.ndarray:
+        """(n_series, n_years) mean CPI over the months present in each year."""
+        by_year = self.levels.reshape(len(self.series), -1, 12)
+        present = ~np.isnan(by_year)
+        counts = present.sum(axis=2)
+        sums = np.where(present, by_year, 0.0).sum(axis=2)
+        return np.divide(sums, counts, out=np.full(counts.shape, np.nan), where=counts > 0)
+
+    def _base_levels(self, base: str) -> np.ndarray:
+        """CPI of every series at the base month ("YYYY-MM") or year average ("YYYY")."""
+        year = int(base[:4])
+        if len(base) == 4:
+            col, table = year - self.y0, self._annual()
+        else:
+            col, table = (year - self.y0) * 12 + int(base[5:7]) - 1, self.levels
+        if not 0 <= col < table.shape[1]:
+            raise ValueError(f"Base period {base} is outside the CPI range.")
+        return table[:, col]
+
+    # ---- factors ----
+    def _row(self, series: str) -> int:
+        i = self.series.get_indexer([series])[0]
+        if i < 0:
+            raise KeyError(f"Unknown CPI series {series!r}.")
+        return i
+
+    def factors(self, base: str | None = None, series: str | None = None, annual: bool = False) -> np.ndarray:
+        """
+        Monthly (or annual) deflation factors CPI[base] / CPI[t]: one row per series, or a single
+        row for `series`. Cached per (series, base, annual).
+        """
+        base = base or self.default_base()
+        key = (series, base, annual)
+        hit = self._cache.get(key)
+        if hit is not None:
+            return hit
+        if series is not None:
+            out = self.factors(base, annual=annual)[self._row(series)]
+        else:
+            table = self._annual() if annual else self.levels
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out = self._base_levels(base)[:, None] / table
+        with self._lock:
+            self._cache[key] = out
+        return out
+
+    def deflate_monthly(self, values: np.ndarray, year: np.ndarray, month: np.ndarray,
+                        series: str = ALL_ITEMS, base: str | None = None) -> np.ndarray:
+        """Real values of monthly observations; NaN for months without CPI."""
+        f = np.append(self.factors(base, series), np.nan)     # index -1 -> NaN
+        return np.asarray(values, np.float64) * f[self._month_index(year, month)]
+
+    def deflate_yearly(self, values: np.ndarray, year: np.ndarray,
+                       series: str = ALL_ITEMS, base: str | None = None) -> np.ndarray:
+        """Real values of yearly observations, deflated by the year's average CPI."""
+        f = np.append(self.factors(base, series, annual=True), np.nan)
+        idx = np.asarray(year, np.int64) - self.y0
+        idx = np.where((idx >= 0) & (idx < len(f) - 1), idx, -1)
+        return np.asarray(values, np.float64) * f[idx]
+
+@traced("real_price_to_income")
+def real_price_to_income(redfin: pd.DataFrame, acs: pd.DataFrame, deflator: CpiDeflator,
+                         price_series: str = ALL_ITEMS, income_series: str | None = None,
+                         base: str | None = None) -> pd.DataFrame:
+    """
+    County x year nominal and real prices, incomes and price-to-income ratios.
+    redfin: county-month rows ['county_fips', 'period' | 'year'+'month', 'median_sale_price'
+    (, 'n_obs' weights)]; acs: ['county_fips','year','income_usd']. Incomes use income_series
+    (default: price_series). Returns an empty frame with the expected columns without county data.
+    """
+    cols = ["county_fips", "year", "avg_price", "real_price", "income_usd", "real_income",
+            "price_to_income", "real_price_to_income"]
+    if "county_fips" not in redfin.columns or redfin.empty or not deflator.levels.size:
+        return pd.DataFrame(columns=cols)
+    base = base or deflator.default_base()
+    income_series = income_series or price_series
+
+    if "month" in redfin.columns:
+        year, month = redfin["year"].to_numpy(), redfin["month"].to_numpy()
+    else:
+        year, month = period_parts(redfin["period"])
+    price = redfin["median_sale_price"].to_numpy(np.float64)
+    real = deflator.deflate_monthly(price, year, month, price_series, base)
+    weight = redfin["n_obs"].to_numpy(np.float64) if "n_obs" in redfin.columns else np.ones(len(price))
+
+    # county-year means of nominal and real prices: one bincount each over flat integer keys
+    codes, uniques = pd.factorize(redfin["county_fips"], sort=True)
+    uniques = pd.Index(uniques)
+    y0 = int(year.min())
+    n_years = int(year.max()) - y0 + 1
+    size = len(uniques) * n_years
+    key = codes.astype(np.int64) * n_years + (year.astype(np.int64) - y0)
+    ok = (codes >= 0) & ~np.isnan(price)
+    has_cpi = ok & ~np.isnan(real)                        # months outside the CPI range have no real price
+    counts = np.bincount(key[ok], weights=weight[ok], minlength=size)
+    real_counts = np.bincount(key[has_cpi], weights=weight[has_cpi], minlength=size)
+    idx = np.flatnonzero(counts)
+    avg = np.bincount(key[ok], weights=(price * weight)[ok], minlength=size)[idx] / counts[idx]
+    real_sums = np.bincount(key[has_cpi], weights=(real * weight)[has_cpi], minlength=size)[idx]
+    real_avg = np.divide(real_sums, real_counts[idx], out=np.full(len(idx), np.nan), where=real_counts[idx] > 0)
+
+    # ACS income scattered into the same (county, year) grid, then gathered at the price keys
+    income = np.full(size, np.nan)
+    acs_code = uniques.get_indexer(acs["county_fips"])
+    acs_year = acs["year"].to_numpy(np.int64) - y0
+    m = (acs_code >= 0) & (acs_year >= 0) & (acs_year < n_years)
+    income[acs_code[m] * n_years + acs_year[m]] = acs["income_usd"].to_numpy(np.float64)[m]
+    income = income[idx]
+    out_year = (idx % n_years + y0).astype(np.int64)
+    real_income = deflator.deflate_yearly(income, out_year, income_series, base)
+
+    return pd.DataFrame({
+        "county_fips": uniques.take(idx // n_years),
+        "year": out_year,
+        "avg_price": avg,
+        "real_price": real_avg,
+        "income_usd": income,
+        "real_income": real_income,
+        "price_to_income": np.round(avg / income, 2),
+        "real_price_to_income": np.round(real_avg / real_income, 2),
+    })
@@ -0,0 +1,148 @@
+"""
+Derived frames and figures of a load_data() result, built (or opened from precompute.py's
+artefacts) once per data version and shared by every session; treat them as read-only.
+"""
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from lib.artefacts import read_artefact
+from lib.county_index import CountyIndex
+from lib.data_loader import compute_price_to_income, cpi_pivot, data_fingerprint
+from lib.deflate import ALL_ITEMS, CpiDeflator, real_price_to_income
+from lib.tracing import trace
+from lib.viz import choropleth_income_years, choropleth_ratio_years
+
+MAX_VERSIONS = 4                    # data versions kept (least recently used dropped)
+MAX_UPLOAD_VERSIONS = 4             # session-upload versions, kept in their own store
+MAX_VARIANTS = {"real_index": 8}    # name prefix -> entries kept per version (least recently used dropped)
+
+_lock = threading.Lock()
+_store: "OrderedDict[str, OrderedDict]" = OrderedDict()   # version -> {name: frame}, LRU order
+_upload_store: "OrderedDict[str, OrderedDict]" = OrderedDict()   # same, for with_uploads versions
+_stats: dict = {}                                    # name -> {"hits": int, "misses": int}
+
+def _version(data: dict) -> str:
+    return data.get("version") or data_fingerprint(data)
+
+def _get(data: dict, name: str, build):
+    with trace(f"derived.{name.split(':')[0]}") as span:
+        return span.output(_lookup(data, name, build, span))
+
+def _store_for(data: dict) -> tuple:
+    # uploads are per session: their versions must not evict the base data shared by every session
+    return (_upload_store, MAX_UPLOAD_VERSIONS) if data.get("uploaded") else (_store, MAX_VERSIONS)
+
+def _lookup(data: dict, name: str, build, span):
+    version = _version(data)
+    store, max_versions = _store_for(data)
+    with _lock:
+        counters = _stats.setdefault(name, {"hits": 0, "misses": 0})
+        frames = store.get(version)
+        if frames is not None and name in frames:
+            counters["hits"] += 1
+            span.cache = "hit"
+            store.move_to_end(version)
+            frames.move_to_end(name)
+            return frames[name]
+        counters["misses"] += 1
+
+    # open the offline build of this version (precompute.py) if there is one, else build;
+    # both outside the lock: a concurrent duplicate build is harmless (same inputs, same output)
+    frame = read_artefact(version, name)
+    span.cache = "miss" if frame is None else "artefact"
+    if frame is None:
+        frame = build(data)
+    with _lock:
+        frames = store.setdefault(version, OrderedDict())
+        frame = frames.setdefault(name, frame)
+        store.move_to_end(version)
+        while len(store) > max_versions:
+            store.popitem(last=False)
+        _evict_variants(frames, name.split(":")[0])
+        return frame
+
+def _evict_variants(frames: OrderedDict, prefix: str):
+    """Drop the least recently used entries of a parameterised kind beyond MAX_VARIANTS[prefix]."""
+    limit = MAX_VARIANTS.get(prefix)
+    if limit is None:
+        return
+    names = [n for n in frames if n.split(":")[0] == prefix]
+    for n in names[:max(len(names) - limit, 0)]:
+        del frames[n]
+
+# ---------- artefacts ----------
+def _build_redfin_yearly(data: dict) -> pd.DataFrame:
+    yearly = data.get("redfin_yearly")
+    if yearly is not None:
+        return yearly
+    redfin = data["redfin"]
+    return (redfin.groupby(["county_fips","year"], as_index=False, observed=True)["median_sale_price"].mean()
+                  .rename(columns={"median_sale_price":"avg_price"}))
+
+def _build_ratio(data: dict) -> pd.DataFrame:
+    ratio = data.get("price_to_income")  # read from the materialized agg_price_to_income table
+    if ratio is not None:
+        return ratio
+    return compute_price_to_income(data["acs"], data["redfin"], get_redfin_yearly(data))
+
+def _build_cpi_wide(data: dict) -> pd.DataFrame:
+    return cpi_pivot(data["cpi"])
+
+def get_redfin_yearly(data: dict) -> pd.DataFrame:
+    return _get(data, "redfin_yearly", _build_redfin_yearly)
+
+def get_ratio_df(data: dict) -> pd.DataFrame:
+    return _get(data, "ratio_df", _build_ratio)
+
+def get_cpi_wide(data: dict) -> pd.DataFrame:
+    return _get(data, "cpi_wide", _build_cpi_wide)
+
+def get_deflator(data: dict) -> CpiDeflator:
+    """Every CPI series as one dense levels matrix, with factors cached per (series, base)."""
+    return _get(data, "deflator", lambda d: CpiDeflator.build(d["cpi"]))
+
+def get_real_index(data: dict, price_series: str = ALL_ITEMS, income_series: str | None = None,
+                   base: str | None = None) -> CountyIndex:
+    """Real-dollar ratio (frame "real") with per-county row spans; MAX_VARIANTS bounds the variants kept."""
+    deflator = get_deflator(data)
+    base = base or deflator.default_base()
+    income_series = income_series or price_series
+    return _get(data, f"real_index:{price_series}:{income_series}:{base}", lambda d: CountyIndex.build(
+        d["counties"], real=real_price_to_income(d["redfin"], d["acs"], deflator, price_series, income_series, base)))
+
+def get_real_ratio(data: dict, price_series: str = ALL_ITEMS, income_series: str | None = None,
+                   base: str | None = None) -> pd.DataFrame:
+    """County x year prices, incomes and price-to-income in nominal and base-period dollars."""
+    return get_real_index(data, price_series, income_series, base).frames["real"]
+
+def get_county_index(data: dict) -> CountyIndex:
+    """FIPS -> label/name plus per-county row spans of redfin_yearly and ratio_df."""
+    return _get(data, "county_index", lambda d: CountyIndex.build(
+        d["counties"], redfin_yearly=get_redfin_yearly(d), ratio=get_ratio_df(d)))
+
+def get_ratio_maps(data: dict, zoom: str = "auto") -> dict:
+    """year -> price-to-income choropleth, every year built at once with a shared color scale."""
+    return _get(data, f"ratio_maps:{zoom}",
+                lambda d: choropleth_ratio_years(get_ratio_df(d), d["counties"], zoom))
+
+def get_income_maps(data: dict, zoom: str = "auto") -> dict:
+    """year -> income choropleth (fallback while the ratio is unavailable)."""
+    return _get(data, f"income_maps:{zoom}", lambda d: choropleth_income_years(d["acs"], zoom))
+
+# ---------- stats ----------
+def derived_stats() -> pd.DataFrame:
+    """Hit/miss counters per artefact, for the Settings page."""
+    with _lock:
+        rows = [{"artefact": name, **c} for name, c in sorted(_stats.items())]
+        versions = [*_store, *_upload_store]
+    df = pd.DataFrame(rows, columns=["artefact", "hits", "misses"])
+    df["cached_versions"] = len(versions)
+    return df
+
+def clear_derived():
+    with _lock:
+        _store.clear()
+        _upload_store.clear()
+        _stats.clear()
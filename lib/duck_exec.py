@@ -0,0 +1,90 @@
+"""
+DuckDB backend for the SQL Workbench.
+
+A DuckQueryJob is a QueryJob (lib/query_exec.py) whose statement runs on an in-memory DuckDB
+connection instead of the SQLite sample warehouse:
+  - every DataFrame returned by load_data is registered as a view of the same name (acs, redfin,
+    cpi, ...). DuckDB scans the pandas/Arrow buffers in place, so nothing is copied or re-loaded;
+  - every *.parquet file under PARQUET_DIR becomes a view named after the file, read lazily by
+    read_parquet (column pruning and filter pushdown happen in DuckDB);
+  - queries run vectorized on THREADS threads; paging, the row limit and cancel are inherited,
+    and the timeout is a watchdog timer that interrupts the connection (DuckDB has no progress
+    handler, so no VM-step count is reported).
+
+duckdb is optional: without it duckdb_available() is False and the Workbench offers SQLite only.
+"""
+import glob
+import os
+import re
+import threading
+
+import pandas as pd
+
+from lib.query_exec import MAX_ROWS, PAGE_ROWS, TIMEOUT_S, QueryJob
+
+try:
+    import duckdb
+except ImportError:  # the Workbench falls back to the SQLite backend
+    duckdb = None
+
+PARQUET_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "parquet")
+THREADS = os.cpu_count() or 1
+
+_NAME = re.compile(r"^[A-Za-z_]\w*$")
+
+def duckdb_available() -> bool:
+    return duckdb is not None
+
+def parquet_views(parquet_dir: str = PARQUET_DIR) -> dict:
+    """view name -> path for every Parquet file under parquet_dir (file stem, if a valid identifier)."""
+    out = {}
+    for path in sorted(glob.glob(os.path.join(parquet_dir, "*.parquet"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if _NAME.match(name):
+            out[name] = os.path.abspath(path)
+    return out
+
+def frame_views(data: dict) -> dict:
+    """The DataFrames of a load_data result, by key."""
+    return {k: v for k, v in data.items() if isinstance(v, pd.DataFrame) and _NAME.match(k)}
+
+class DuckQueryJob(QueryJob):
+    if duckdb is not None:
+        errors = (duckdb.Error,)
+
+    def __init__(self, frames: dict, sql: str, page_rows: int = PAGE_ROWS, max_rows: int = MAX_ROWS,
+                 timeout_s: float = TIMEOUT_S, parquet_dir: str = PARQUET_DIR):
+        if duckdb is None:
+            raise RuntimeError("duckdb is not installed (pip install duckdb).")
+        super().__init__(None, sql, page_rows=page_rows, max_rows=max_rows, timeout_s=timeout_s)
+        self.frames = frames
+        self.parquet = parquet_views(parquet_dir)
+
+    @property
+    def views(self) -> list[str]:
+        return sorted({*self.frames, *self.parquet})
+
+    # ---- worker ----
+    def _open(self):
+        conn = duckdb.connect(":memory:")
+        conn.execute(f"SET threads TO {THREADS}")
+        for name, df in self.frames.items():
+            conn.register(name, df)
+        for name, path in self.parquet.items():
+            if name not in self.frames:
+                quoted = path.replace("'", "''")
+                conn.execute(f'CREATE VIEW "{name}" AS SELECT * FROM read_parquet(\'{quoted}\')')
+        return conn, conn.execute
+
+    def _watchdog(self):
+        # same budget as the SQLite progress handler: timeout_s per page
+        timer = threading.Timer(self.timeout_s, self._on_timeout)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def _on_timeout(self):
+        self._timed_out = True
+        conn = self._conn
+        if conn is not None:
+            conn.interrupt()
@@ -0,0 +1,91 @@
+"""
+Process-wide SQLAlchemy engine registry and parallel reads.
+
+get_engine() hands out one engine per URL for the life of the process, so load_data misses,
+incremental refreshes and warehouse stamps all draw from the same connection pool instead of
+paying the connect + auth handshake on every call. Pools are sized for read_parallel(): up to
+POOL_SIZE queries run at once, each on its own pooled connection, so a cold load costs roughly
+the slowest query rather than the sum of them.
+
+The queries of one read_parallel() call run on separate connections and therefore do not share
+a transaction; the loaders only batch reads that are independent of each other.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+POOL_SIZE = 6            # concurrent loader queries (acs, housing x3, cpi, counties)
+MAX_OVERFLOW = 4         # extra connections for concurrent sessions, closed when returned
+POOL_TIMEOUT_S = 30      # wait for a free connection before raising
+POOL_RECYCLE_S = 1800    # reconnect before MySQL's wait_timeout drops idle connections
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_engines: dict = {}      # url -> Engine
+_pool = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="sql-loader")
+
+def get_engine(url: str):
+    """Shared engine for `url` (created on first use)."""
+    with _lock:
+        engine = _engines.get(url)
+        if engine is None:
+            if url.startswith("sqlite"):
+                # file databases get a QueuePool with check_same_thread off (SQLAlchemy 2.x default)
+                engine = create_engine(url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW)
+            else:
+                engine = create_engine(url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+                                       pool_timeout=POOL_TIMEOUT_S, pool_recycle=POOL_RECYCLE_S,
+                                       pool_pre_ping=True)
+            _engines[url] = engine
+        return engine
+
+def dispose_engine(engine):
+    """Close the pool of `engine` and drop it from the registry (e.g. for temp build files)."""
+    with _lock:
+        for url, e in list(_engines.items()):
+            if e is engine:
+                del _engines[url]
+    engine.dispose()
+
+def dispose_all():
+    with _lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        engine.dispose()
+
+def engine_stats() -> pd.DataFrame:
+    """Pool state per registered engine, for diagnostics."""
+    with _lock:
+        items = list(_engines.items())
+    rows = [{"engine": e.url.render_as_string(hide_password=True), "pool": type(e.pool).__name__,
+             "status": e.pool.status()} for _, e in items]
+    return pd.DataFrame(rows, columns=["engine", "pool", "status"])
+
+def _read(engine, sql: str, params: dict | None):
+    t0 = time.perf_counter()
+    with engine.connect() as conn:
+        df = pd.read_sql(text(sql), conn, params=params)
+    return df, time.perf_counter() - t0
+
+def read_parallel(engine, queries: dict) -> dict:
+    """
+    Run independent SELECTs concurrently, one pooled connection each.
+    queries: name -> sql or (sql, params). Returns name -> DataFrame; the first failure is raised.
+    """
+    t0 = time.perf_counter()
+    futures = {}
+    for name, q in queries.items():
+        sql, params = q if isinstance(q, tuple) else (q, None)
+        futures[name] = _pool.submit(_read, engine, sql, params)
+    out, timings = {}, {}
+    for name, fut in futures.items():
+        out[name], timings[name] = fut.result()
+    logger.info("read_parallel %s: %.3fs wall, %s", engine.url.render_as_string(hide_password=True),
+                time.perf_counter() - t0, ", ".join(f"{n} {s:.3f}s" for n, s in timings.items()))
+    return out
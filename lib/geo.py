@@ -0,0 +1,212 @@
+"""
+County geometry store for the choropleths.
+
+Shapes are read once from a local GeoJSON (no network): data/geo/us_counties.geojson (e.g.
+Plotly's geojson-counties-fips.json or a Census cartographic-boundary export with GEOID), installed
+once with
+
+    python -m lib.geo                         # download COUNTIES_URL
+    python -m lib.geo --from counties.json    # air-gapped: copy a local export
+
+Without it has_geometry() is False and lib/viz maps with the remote COUNTIES_URL instead (so maps
+need network access). The bundled us_counties_sample.geojson only has bounding-box outlines for
+three sample counties; it is never picked up implicitly (pass it to load_counties for benchmarks).
+
+Each county is pre-simplified per zoom level by snapping vertices to a grid and dropping repeats:
+    national   whole-US view,          0.05 deg grid,   2 decimals
+    regional   a state or a few,       0.01 deg grid,   3 decimals
+    county     a handful of counties,  0.001 deg grid,  4 decimals
+(about one screen pixel at each view's usual extent, so the simplification is not visible)
+and county_geojson() returns a FeatureCollection holding only the requested FIPS, cached per
+(FIPS set, zoom). The map payload therefore scales with the counties on screen, not all ~3,200.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import urllib.request
+from functools import lru_cache
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+COUNTIES_PATH = os.path.join(DATA_DIR, "geo", "us_counties.geojson")
+COUNTIES_SAMPLE_PATH = os.path.join(DATA_DIR, "geo", "us_counties_sample.geojson")
+COUNTIES_URL = "https://raw.githubusercontent.com/plotly/datasets/master/geojson-counties-fips.json"
+
+ZOOM_LEVELS = {            # zoom -> (tolerance in degrees, decimals kept)
+    "national": (0.05, 2),
+    "regional": (0.01, 3),
+    "county": (0.001, 4),
+}
+
+_lock = threading.Lock()
+_shapes: dict | None = None          # fips -> list of polygons, each a list of (n, 2) rings
+_levels: dict = {}                   # zoom -> {fips: simplified geometry dict}
+
+# ---------- loading ----------
+def _feature_fips(feature: dict) -> str | None:
+    props = feature.get("properties") or {}
+    fips = feature.get("id") or props.get("GEOID")
+    if fips is None and "STATE" in props and "COUNTY" in props:
+        fips = f"{props['STATE']}{props['COUNTY']}"
+    return str(fips).zfill(5) if fips is not None else None
+
+def _polygons(geometry: dict) -> list:
+    if geometry["type"] == "Polygon":
+        parts = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        parts = geometry["coordinates"]
+    else:
+        return []
+    return [[np.asarray(ring, dtype=np.float64)[:, :2] for ring in poly] for poly in parts]
+
+def load_counties(path: str | None = None) -> dict:
+    """fips -> polygons, from `path`, else the full local file; {} when neither exists."""
+    path = path or COUNTIES_PATH
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        features = json.load(f)["features"]
+    shapes = {}
+    for feat in features:
+        fips = _feature_fips(feat)
+        if fips and feat.get("geometry"):
+            shapes[fips] = _polygons(feat["geometry"])
+    return shapes
+
+def _get_shapes() -> dict:
+    global _shapes
+    with _lock:
+        if _shapes is None:
+            _shapes = load_counties()
+        return _shapes
+
+# ---------- simplification ----------
+def _simplify_level(shapes: dict, tol: float, decimals: int) -> dict:
+    """
+    Simplify every ring of every county in one vectorized pass: snap vertices to a `tol`-degree
+    grid and drop consecutive duplicates within a ring (topology-style quantization). Rings that
+    would fall below 4 points keep 4 evenly spaced original vertices, so tiny counties still show.
+    """
+    rings = [ring for polys in shapes.values() for poly in polys for ring in poly]
+    if not rings:
+        return {}
+    sizes = np.fromiter((len(r) for r in rings), dtype=np.int64, count=len(rings))
+    coords = np.concatenate(rings)
+    ring_id = np.repeat(np.arange(len(rings)), sizes)
+    snapped = np.round(np.round(coords / tol) * tol, decimals)
+
+    keep = np.ones(len(coords), dtype=bool)
+    keep[1:] = (snapped[1:] != snapped[:-1]).any(axis=1) | (ring_id[1:] != ring_id[:-1])
+    ends = np.cumsum(sizes) - 1
+    keep[ends] = True                                   # ring stays closed
+    kept = np.bincount(ring_id[keep], minlength=len(rings))
+    out = np.split(snapped[keep], np.cumsum(kept)[:-1])
+
+    it = iter(range(len(rings)))
+    level = {}
+    for fips, polys in shapes.items():
+        geom = []
+        for poly in polys:
+            new = []
+            for ring in poly:
+                i = next(it)
+                if kept[i] < 4:
+                    r = np.round(ring[np.linspace(0, len(ring) - 1, min(4, len(ring))).astype(int)], decimals)
+                else:
+                    r = out[i]
+                new.append(r.tolist())
+            geom.append(new)
+        level[fips] = ({"type": "Polygon", "coordinates": geom[0]} if len(geom) == 1
+                       else {"type": "MultiPolygon", "coordinates": geom})
+    return level
+
+def _level(zoom: str) -> dict:
+    """All counties simplified for one zoom level (built once per process)."""
+    if zoom not in _levels:
+        built = _simplify_level(_get_shapes(), *ZOOM_LEVELS[zoom])
+        with _lock:
+            _levels.setdefault(zoom, built)
+    return _levels[zoom]
+
+# ---------- payloads ----------
+def zoom_for(fips) -> str:
+    """Pick a zoom level from the extent of the counties being mapped."""
+    fips = list(fips)
+    states = {f[:2] for f in fips}
+    if len(states) > 3:
+        return "national"
+    if len(fips) > 12:
+        return "regional"
+    return "county"
+
+@lru_cache(maxsize=64)
+def county_geojson(fips: tuple, zoom: str) -> dict:
+    """Plotly-ready FeatureCollection (feature id = FIPS) for exactly these counties at `zoom`."""
+    level = _level(zoom)
+    missing = [f for f in fips if f not in level]
+    if missing:
+        logger.warning("No county geometry for %d of %d mapped FIPS (e.g. %s); they are left blank.",
+                       len(missing), len(fips), ", ".join(missing[:5]))
+    return {
+        "type": "FeatureCollection",
+        "features": [{"type": "Feature", "id": f, "properties": {}, "geometry": level[f]}
+                     for f in fips if f in level],
+    }
+
+def has_geometry() -> bool:
+    """True when the full local county file is installed (the sample does not count)."""
+    return bool(_get_shapes())
+
+def geometry_info() -> dict:
+    """Source file, county count and cached payload stats, for diagnostics."""
+    path = COUNTIES_PATH if os.path.exists(COUNTIES_PATH) else None
+    info = county_geojson.cache_info()
+    return {"source": os.path.basename(path) if path else None, "counties": len(_get_shapes()),
+            "levels_built": sorted(_levels), "payload_hits": info.hits, "payload_misses": info.misses}
+
+# ---------- install ----------
+def install_counties(src: str = COUNTIES_URL, dest: str = COUNTIES_PATH) -> int:
+    """
+    Copy or download a county GeoJSON to `dest` (temp file + rename) after checking it parses to
+    county shapes; resets the in-process shape cache. Returns the number of counties.
+    """
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), suffix=".geojson")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if os.path.exists(src):
+                with open(src, "rb") as f:
+                    shutil.copyfileobj(f, out)
+            else:
+                with urllib.request.urlopen(src, timeout=60) as resp:
+                    shutil.copyfileobj(resp, out)
+        n = len(load_counties(tmp))
+        if not n:
+            raise ValueError(f"{src} has no county features with FIPS ids.")
+        os.replace(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    global _shapes
+    with _lock:
+        _shapes = None
+        _levels.clear()
+    county_geojson.cache_clear()
+    return n
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Install the local county geometry used by the maps.")
+    parser.add_argument("--from", dest="src", default=COUNTIES_URL, help="URL or local GeoJSON (default: Plotly's county file)")
+    args = parser.parse_args(argv)
+    n = install_counties(args.src)
+    print(f"{COUNTIES_PATH}: {n:,} counties")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Key and dtype normalization shared by the loaders and the compute engine.
+
+compact_frame() is the last step of every load (lib/data_loader._normalize):
+    geography / series / period keys   -> categorical (int8/int16 codes + one copy of each label)
+    year, month                         -> int16 / int8 from period_parts, else int32
+    float measures                      -> float32, except derived values (FLOAT64_COLUMNS and the
+                                           county-month means): float64, also from MySQL DECIMALs
+    int64 measures and counts           -> int32 when the values fit
+Row-level housing frames shrink ~5-10x against object strings + int64/float64.
+"""
+import numpy as np
+import pandas as pd
+
+def period_parts(period: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized YYYY-MM -> (int16 year, int8 month).
+    Reads the digits straight out of a fixed-width numpy unicode buffer, so there is no per-row
+    Python string work. Categorical periods are parsed once per category.
+    Missing periods raise ValueError (integer parts have no NA; _normalize drops such rows first).
+    """
+    if isinstance(period.dtype, pd.CategoricalDtype):
+        codes = period.cat.codes.to_numpy()
+        if (codes < 0).any():       # code -1 would silently index the last category
+            raise ValueError(f"{int((codes < 0).sum())} missing period(s) in {period.name!r}.")
+        year, month = period_parts(pd.Series(period.cat.categories))
+        return year[codes], month[codes]
+    if period.isna().any():
+        raise ValueError(f"{int(period.isna().sum())} missing period(s) in {period.name!r}.")
+    chars = np.asarray(period, dtype="U7").view(np.uint32).reshape(-1, 7).astype(np.int16) - ord("0")
+    year = chars[:, 0] * 1000 + chars[:, 1] * 100 + chars[:, 2] * 10 + chars[:, 3]
+    month = chars[:, 5] * 10 + chars[:, 6]
+    return year.astype(np.int16), month.astype(np.int8)
+
+def period_key(period) -> np.ndarray:
+    """YYYY-MM (str, categorical or a single string) -> int32 YYYYMM, for range filters and max()."""
+    if isinstance(period, str):
+        return np.int32(int(period[:4]) * 100 + int(period[5:7]))
+    year, month = period_parts(pd.Series(period) if not isinstance(period, pd.Series) else period)
+    return year.astype(np.int32) * 100 + month
+
+CATEGORY_COLUMNS = ("county_fips", "county_name", "state", "period", "date", "series_id", "zip_code")
+# derived values that get re-aggregated (mean x n_obs) or compared across sources keep full precision
+FLOAT64_COLUMNS = ("avg_price", "n_obs", "price_to_income")
+
+def _fits_int32(s: pd.Series) -> bool:
+    info = np.iinfo(np.int32)
+    return s.empty or (info.min <= s.min() and s.max() <= info.max)
+
+def compact_frame(df: pd.DataFrame, float64: tuple = FLOAT64_COLUMNS) -> pd.DataFrame:
+    """Cast a loaded frame to compact dtypes in place (see module docstring) and return it."""
+    for col in df.columns:
+        s = df[col]
+        if col in CATEGORY_COLUMNS:
+            if not isinstance(s.dtype, pd.CategoricalDtype):
+                df[col] = s.astype("category")
+        elif col in float64 and s.dtype.kind in "fO":
+            # float32 or DECIMAL objects -> float64; integer counts fall through to the int32 rule
+            df[col] = pd.to_numeric(s).astype(np.float64)
+        elif s.dtype.kind == "f":
+            df[col] = s.astype(np.float32)
+        elif s.dtype.kind in "iu" and s.dtype.itemsize > 4 and _fits_int32(s):
+            # int32 floor (not the narrowest type): counts get summed and int8/int16 would wrap
+            df[col] = s.astype(np.int32)
+    return df
+
+def memory_report(data: dict) -> pd.DataFrame:
+    """Rows, deep memory and bytes/row for every frame of a load_data result."""
+    rows = []
+    for name, df in data.items():
+        if isinstance(df, pd.DataFrame):
+            nbytes = int(df.memory_usage(deep=True, index=False).sum())
+            rows.append({"frame": name, "rows": len(df), "MB": round(nbytes / 1e6, 3),
+                         "bytes_per_row": round(nbytes / max(len(df), 1), 1),
+                         "dtypes": ", ".join(f"{c}:{t}" for c, t in df.dtypes.astype(str).items())})
+    return pd.DataFrame(rows, columns=["frame", "rows", "MB", "bytes_per_row", "dtypes"])
@@ -0,0 +1,155 @@
+"""
+Bounded, cancellable query execution for the SQL Workbench.
+
+A QueryJob runs its SQL on a small shared worker pool, never on the Streamlit script thread:
+  - a SQLite progress handler aborts the statement once it exceeds timeout_s or is cancelled;
+  - rows are pulled page_rows at a time with fetchmany(), up to max_rows in total, and the
+    cursor stays open between pages so "load more" continues where the last page stopped;
+  - elapsed time and VM steps (SQLite's unit of work, counted by the progress handler) are
+    reported per job, so an expensive scan is visible even when it returns few rows.
+
+The connection is read-only: the warehouse file is a shared build artefact (lib/warehouse.py).
+Subclasses swap the backend through _open / _watchdog / errors (lib/duck_exec.DuckQueryJob).
+"""
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import pandas as pd
+
+PAGE_ROWS = 1_000
+MAX_ROWS = 50_000
+TIMEOUT_S = 10.0
+PROGRESS_STEPS = 1_000       # VM instructions between progress-handler callbacks
+MAX_WORKERS = 4              # concurrent Workbench queries per process
+
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="sql-workbench")
+
+class QueryJob:
+    def __init__(self, db_path: str, sql: str, page_rows: int = PAGE_ROWS,
+                 max_rows: int = MAX_ROWS, timeout_s: float = TIMEOUT_S):
+        self.db_path = db_path
+        self.sql = sql
+        self.page_rows = page_rows
+        self.max_rows = max_rows
+        self.timeout_s = timeout_s
+
+        self.columns: list[str] = []
+        self.elapsed = 0.0           # seconds spent executing/fetching, over all pages
+        self.steps = 0               # approx. SQLite VM steps
+        self.exhausted = False       # no more rows (or the job failed)
+        self.truncated = False       # stopped at max_rows
+        self.error: str | None = None
+
+        self._rows: list[tuple] = []
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._deadline = 0.0
+        self._timed_out = False
+        self._conn = None
+        self._cursor = None
+        self._future = None
+
+    # ---- control (script thread) ----
+    def start(self) -> "QueryJob":
+        return self.load_more()
+
+    def load_more(self) -> "QueryJob":
+        if not self.running and not self.exhausted:
+            self._future = _pool.submit(self._fetch_page)
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+        conn = self._conn
+        if conn is not None:
+            conn.interrupt()
+
+    def close(self):
+        self.cancel()
+        if not self.running:
+            self._close_conn()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block up to `timeout` seconds for the current page; True when it has finished."""
+        if self._future is None:
+            return True
+        try:
+            self._future.result(timeout=timeout)
+        except FutureTimeout:   # builtin TimeoutError only aliases it from Python 3.11
+            return False
+        return True
+
+    @property
+    def running(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        with self._lock:
+            rows = list(self._rows)
+        return pd.DataFrame.from_records(rows, columns=self.columns or None)
+
+    # ---- worker ----
+    def _progress(self) -> int:
+        self.steps += PROGRESS_STEPS
+        if self._cancel.is_set():
+            return 1
+        if time.perf_counter() > self._deadline:
+            self._timed_out = True
+            return 1
+        return 0
+
+    # backend hooks (lib/duck_exec.DuckQueryJob runs the same paging on DuckDB)
+    errors = (sqlite3.Error,)
+
+    def _open(self):
+        """Connection + cursor for self.sql; the progress handler enforces cancel and timeout."""
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        conn.set_progress_handler(self._progress, PROGRESS_STEPS)
+        return conn, conn.execute
+
+    def _watchdog(self):
+        return None
+
+    def _fetch_page(self):
+        t0 = time.perf_counter()
+        self._deadline = t0 + self.timeout_s
+        watchdog = self._watchdog()
+        try:
+            if self._cursor is None:
+                self._conn, execute = self._open()
+                self._cursor = execute(self.sql)
+                self.columns = [d[0] for d in self._cursor.description or []]
+            if not self.columns:
+                # statement without a result set
+                self.exhausted = True
+            else:
+                want = min(self.page_rows, self.max_rows - len(self._rows))
+                batch = self._cursor.fetchmany(want)
+                with self._lock:
+                    self._rows.extend(batch)
+                if len(batch) < want:
+                    self.exhausted = True
+                elif len(self._rows) >= self.max_rows:
+                    self.exhausted = self.truncated = True
+        except self.errors as e:
+            if self._cancel.is_set():
+                self.error = "Query cancelled."
+            elif self._timed_out:
+                self.error = f"Query stopped after the {self.timeout_s:g}s timeout."
+            else:
+                self.error = str(e)
+            self.exhausted = True
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+            self.elapsed += time.perf_counter() - t0
+            if self.exhausted:
+                self._close_conn()
+
+    def _close_conn(self):
+        conn, self._conn, self._cursor = self._conn, None, None
+        if conn is not None:
+            conn.close()
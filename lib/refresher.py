@@ -0,0 +1,98 @@
+"""
+Stale-while-revalidate store for load_data results.
+
+Each key (source, mode, refresh) holds the last good load. A page run never waits on a refresh:
+  - fresh (younger than REFRESH_S): served as is;
+  - stale: served as is, and one background reload is started on a small worker pool;
+  - missing (cold process): the first caller loads inline, concurrent callers wait on that same
+    load instead of starting their own.
+Concurrent requests for the same key always coalesce into a single in-flight load. A finished
+reload is swapped in with one reference assignment, so readers see either the old or the new
+dict, never a mix; if the reload returns the same data version the old dict is kept (derived
+caches stay warm) and only the "as of" time moves. A failed background reload keeps serving the
+last good data, records the error and is retried after RETRY_S.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+REFRESH_S = 300          # age after which a served result triggers a background reload
+RETRY_S = 30             # after a failed reload, wait this long before trying again
+MAX_WORKERS = 2          # background reloads in flight across all keys
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_entries: dict = {}      # key -> _Entry
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="data-refresh")
+
+class _Entry:
+    def __init__(self):
+        self.data = None             # last good result
+        self.as_of = None            # wall-clock time the data was last confirmed current
+        self.checked = 0.0           # monotonic time of that confirmation
+        self.inflight = None         # Future of the running load, if any
+        self.error = None            # message of the last failed reload
+        self.failed = 0.0            # monotonic time of that failure
+
+def _finish(entry: _Entry, fut: Future, loader):
+    try:
+        new = loader()
+    except BaseException as e:
+        with _lock:
+            entry.inflight = None
+            entry.error, entry.failed = f"{type(e).__name__}: {e}", time.monotonic()
+        fut.set_exception(e)
+        logger.warning("data refresh failed, serving last good data: %s", entry.error)
+        return
+    with _lock:
+        if entry.data is None or entry.data.get("version") != new.get("version"):
+            entry.data = new
+        entry.as_of, entry.checked = datetime.now(), time.monotonic()
+        entry.inflight, entry.error = None, None
+        data = entry.data
+    fut.set_result(data)
+
+def serve(key, loader, max_age: float = REFRESH_S) -> dict:
+    """Last good loader() result for `key`; stale results trigger one background reload."""
+    with _lock:
+        entry = _entries.setdefault(key, _Entry())
+        data, fut = entry.data, entry.inflight
+        now = time.monotonic()
+        stale = now - entry.checked > max_age and now - entry.failed > RETRY_S
+        start = fut is None and (data is None or stale)
+        if start:
+            fut = entry.inflight = Future()
+    if data is not None:
+        if start:
+            _pool.submit(_finish, entry, fut, loader)
+        return data
+    if start:
+        _finish(entry, fut, loader)       # cold: load on this thread (so st.* messages reach the page)
+    return fut.result()
+
+def refresh(key, loader) -> Future:
+    """Start a background reload of `key` now (or join the one in flight)."""
+    with _lock:
+        entry = _entries.setdefault(key, _Entry())
+        if entry.inflight is not None:
+            return entry.inflight
+        fut = entry.inflight = Future()
+    _pool.submit(_finish, entry, fut, loader)
+    return fut
+
+def status(key) -> dict:
+    """as_of (datetime or None), refreshing, error and version for `key`."""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return {"as_of": None, "refreshing": False, "error": None, "version": None}
+        return {"as_of": entry.as_of, "refreshing": entry.inflight is not None, "error": entry.error,
+                "version": entry.data.get("version") if entry.data else None}
+
+def clear():
+    """Drop all stored results (the next call loads cold). In-flight reloads finish unobserved."""
+    with _lock:
+        _entries.clear()
@@ -0,0 +1,108 @@
+"""
+Local columnar snapshot tier for load_data results.
+
+After a warehouse load every frame is written as an uncompressed Arrow IPC (Feather v2) file under
+data/snapshots/<source>-<mode>/<version>/, next to a current.json manifest holding the data version and the
+warehouse stamp it was built from. On a cold start or TTL expiry load_data asks the warehouse for a
+cheap stamp (table timestamps / file mtimes); if it matches, the frames are read back from disk
+(one sequential read per file, converted to pandas) instead of re-querying the warehouse.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:  # snapshots are an optimization; without pyarrow we always hit the warehouse
+    pa = None
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "snapshots")
+KEEP_VERSIONS = 2
+
+def snapshots_enabled() -> bool:
+    return pa is not None
+
+def _root(source: str, mode: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{source}-{mode}")
+
+def _read_current(root: str):
+    try:
+        with open(os.path.join(root, "current.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def read_snapshot(source: str, mode: str, stamp: str | None = None):
+    """
+    Return the snapshotted data dict if it was built from `stamp`, else None.
+    stamp=None returns the latest snapshot whatever it was built from (base for incremental refresh).
+    """
+    if pa is None:
+        return None
+    root = _root(source, mode)
+    manifest = _read_current(root)
+    if not manifest or (stamp is not None and manifest.get("stamp") != stamp):
+        return None
+    folder = os.path.join(root, manifest["version"])
+    try:
+        out = {name: feather.read_feather(os.path.join(folder, f"{name}.arrow"))
+               for name in manifest["frames"]}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    out["version"] = manifest["version"]
+    return out
+
+def write_snapshot(source: str, mode: str, data: dict, stamp: str):
+    """Write all frames of `data` atomically (temp dir + rename) and point current.json at them."""
+    if pa is None:
+        return
+    root = _root(source, mode)
+    os.makedirs(root, exist_ok=True)
+    version = data["version"]
+    folder = os.path.join(root, version)
+    frames = [k for k, v in data.items() if isinstance(v, pd.DataFrame)]
+
+    if not os.path.isdir(folder):
+        tmp = tempfile.mkdtemp(dir=root, prefix=".tmp-")
+        try:
+            for name in frames:
+                feather.write_feather(data[name].reset_index(drop=True), os.path.join(tmp, f"{name}.arrow"),
+                                      compression="uncompressed")
+            os.replace(tmp, folder)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.isdir(folder):
+                raise
+
+    manifest = {"version": version, "stamp": stamp, "frames": frames, "written_at": time.time()}
+    fd, tmp_manifest = tempfile.mkstemp(dir=root, prefix=".current-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_manifest, os.path.join(root, "current.json"))
+    _prune(root, keep=version)
+
+def _prune(root: str, keep: str):
+    dirs = [d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)) and not d.startswith(".")]
+    dirs.sort(key=lambda d: os.path.getmtime(os.path.join(root, d)), reverse=True)
+    for d in [d for d in dirs if d != keep][KEEP_VERSIONS - 1:]:
+        shutil.rmtree(os.path.join(root, d), ignore_errors=True)
+
+def snapshot_info() -> pd.DataFrame:
+    """One row per snapshot tier (source-mode) for the Settings page."""
+    rows = []
+    if os.path.isdir(SNAPSHOT_DIR):
+        for tier in sorted(os.listdir(SNAPSHOT_DIR)):
+            manifest = _read_current(os.path.join(SNAPSHOT_DIR, tier))
+            if manifest:
+                rows.append({"tier": tier, "version": manifest["version"],
+                             "written_at": pd.Timestamp(manifest["written_at"], unit="s"),
+                             "frames": ", ".join(manifest["frames"])})
+    return pd.DataFrame(rows, columns=["tier", "version", "written_at", "frames"])
+
+def clear_snapshots():
+    shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
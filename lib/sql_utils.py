@@ -1,6 +1,16 @@
 import sqlite3
 import pandas as pd
 
+# Same access paths as the MYSQL_DDL keys below
+SQLITE_INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_dim_date_id ON dim_date(date_id);",
+    "CREATE INDEX IF NOT EXISTS idx_dim_location_fips ON dim_location(county_fips);",
+    "CREATE INDEX IF NOT EXISTS idx_fact_housing ON fact_housing(county_fips, period);",
+    "CREATE INDEX IF NOT EXISTS idx_fact_housing_period ON fact_housing(period);",
+    "CREATE INDEX IF NOT EXISTS idx_fact_income ON fact_income(county_fips, year);",
+    "CREATE INDEX IF NOT EXISTS idx_fact_cpi ON fact_cpi(date, series_id);",
+]
+
 def load_sample_into_sqlite(db_path: str, acs: pd.DataFrame, redfin: pd.DataFrame, cpi: pd.DataFrame, counties: pd.DataFrame):
     conn = sqlite3.connect(db_path)
     acs.to_sql("fact_income", conn, if_exists="replace", index=False)
@@ -8,7 +18,7 @@ def load_sample_into_sqlite(db_path: str, acs: pd.DataFrame, redfin: pd.DataFram
     cpi.to_sql("fact_cpi", conn, if_exists="replace", index=False)
     counties.to_sql("dim_location", conn, if_exists="replace", index=False)
     # simple dim_date (YYYY-MM to first of month)
-    dates = pd.DataFrame({"full_date": pd.to_datetime(cpi["date"]+"-01").drop_duplicates()})
+    dates = pd.DataFrame({"full_date": pd.to_datetime(cpi["date"].astype(str)+"-01").drop_duplicates()})
     dates["date_id"] = dates["full_date"].dt.strftime("%Y%m%d").astype(int)
     dates["year"] = dates["full_date"].dt.year
     dates["month"] = dates["full_date"].dt.month
@@ -17,6 +27,8 @@ def load_sample_into_sqlite(db_path: str, acs: pd.DataFrame, redfin: pd.DataFram
     dates["day_of_week"] = dates["full_date"].dt.dayofweek
     dates["is_weekend"] = dates["day_of_week"].isin([5,6])
     dates.to_sql("dim_date", conn, if_exists="replace", index=False)
+    for ddl in SQLITE_INDEXES:
+        conn.execute(ddl)
     conn.commit()
     conn.close()
 
@@ -54,6 +66,15 @@ CREATE TABLE IF NOT EXISTS fact_housing(
   KEY idx1 (county_fips, period)
 );
 """,
+"zip_county": """
+CREATE TABLE IF NOT EXISTS zip_county(
+  zip_code     CHAR(5) NOT NULL,
+  county_fips  CHAR(5) NOT NULL,
+  res_ratio    DECIMAL(9,8) NOT NULL,   -- HUD residential share of the ZIP in this county
+  PRIMARY KEY (zip_code, county_fips),
+  KEY idx_county (county_fips)
+);
+""",
 "fact_income": """
 CREATE TABLE IF NOT EXISTS fact_income(
   county_fips  CHAR(5),
@@ -71,5 +92,36 @@ CREATE TABLE IF NOT EXISTS fact_cpi(
   value       DECIMAL(10,1),
   KEY idx1 (date_key, series_id)
 );
+""",
+"agg_housing_county_month": """
+CREATE TABLE IF NOT EXISTS agg_housing_county_month(
+  county_fips        CHAR(5) NOT NULL,
+  period             CHAR(7) NOT NULL,  -- YYYY-MM
+  median_sale_price  DOUBLE,
+  n_obs              DOUBLE,
+  PRIMARY KEY (county_fips, period),
+  KEY idx_period (period)
+);
+""",
+"agg_housing_county_year": """
+CREATE TABLE IF NOT EXISTS agg_housing_county_year(
+  county_fips  CHAR(5) NOT NULL,
+  year         SMALLINT NOT NULL,
+  avg_price    DOUBLE,
+  n_obs        DOUBLE,
+  PRIMARY KEY (county_fips, year),
+  KEY idx_year (year)
+);
+""",
+"agg_price_to_income": """
+CREATE TABLE IF NOT EXISTS agg_price_to_income(
+  county_fips      CHAR(5) NOT NULL,
+  year             SMALLINT NOT NULL,
+  avg_price        DOUBLE,
+  income_usd       DOUBLE,
+  price_to_income  DECIMAL(8,2),
+  PRIMARY KEY (county_fips, year),
+  KEY idx_year (year)
+);
 """
 }
@@ -0,0 +1,107 @@
+"""
+Chunked ingestion for the housing fact table.
+
+Rows are read CHUNK_ROWS at a time (server-side cursor for MySQL, `chunksize` for SQLite/CSV)
+and folded into running (weighted sum, weight, count) accumulators per county x month, so the
+full fact table is never held in memory. Per-chunk partial sums are buffered and merged into
+the accumulator every COMPACT_ROWS partial groups.
+
+Peak memory ceiling (independent of the fact table's row count):
+    one raw chunk        ~ CHUNK_ROWS x ~200 B   (object strings before downcast)  ~ 20 MB
+  + buffered partials    ~ COMPACT_ROWS x ~100 B                                    ~ 40 MB
+  + the accumulator      ~ n_groups   x ~100 B   (county x month keys, weighted sum, weight, count)
+With ~3,100 counties x 12 months x 30 years that is ~1.1M groups, so the ceiling is ~130 MB
+whether the table holds 9M or 90M rows. Lower CHUNK_ROWS to trade throughput for memory.
+"""
+import numpy as np
+import pandas as pd
+
+from lib.normalize import period_parts
+
+CHUNK_ROWS = 100_000
+COMPACT_ROWS = 4 * CHUNK_ROWS   # per-chunk partial groups buffered before they are merged
+
+def downcast(df: pd.DataFrame) -> pd.DataFrame:
+    """Shrink numeric columns to the narrowest float32/int32 (or smaller) dtype that fits."""
+    for col in df.columns:
+        kind = df[col].dtype.kind
+        if kind == "f":
+            df[col] = pd.to_numeric(df[col], downcast="float")
+        elif kind in "iu":
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+def _prepare(chunk: pd.DataFrame, pad_fips, xwalk=None) -> pd.DataFrame:
+    chunk = chunk.dropna(subset=["median_sale_price"])
+    chunk["period"] = chunk["period"].astype(str).str.slice(0,7)
+    chunk["median_sale_price"] = chunk["median_sale_price"].astype(np.float64)
+    if "county_fips" in chunk.columns:
+        chunk["county_fips"] = pad_fips(chunk["county_fips"])
+    elif xwalk is not None and "zip_code" in chunk.columns:
+        chunk = xwalk.to_county(chunk[["zip_code", "period", "median_sale_price"]])
+    if "weight" not in chunk.columns:
+        chunk["weight"] = 1.0
+    chunk["wp"] = chunk["median_sale_price"] * chunk["weight"]
+    return chunk
+
+def _compact(parts: list, keys: list) -> pd.DataFrame:
+    if len(parts) == 1:
+        return parts[0]
+    return pd.concat(parts).groupby(level=list(range(len(keys))), sort=False, observed=True).sum()
+
+def fold_housing(chunks, pad_fips, xwalk=None):
+    """
+    Fold an iterable of raw housing chunks (period, median_sale_price[, county_fips | zip_code]) into
+    (monthly, yearly) aggregates with the same columns load_data(mode="aggregate") returns.
+    ZIP-only chunks are mapped through `xwalk` (lib/crosswalk.ZipCountyIndex) when given; county
+    means are then weighted by the crosswalk's residential ratios and n_obs is the weighted count.
+    """
+    parts, pending = [], 0
+    keys = None
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        chunk = _prepare(chunk, pad_fips, xwalk)
+        if keys is None:
+            keys = ["county_fips", "period"] if "county_fips" in chunk.columns else ["period"]
+        g = chunk.groupby(keys, sort=False, observed=True)[["wp", "weight"]].sum()
+        parts.append(g)
+        pending += len(g)
+        del chunk, g
+        if pending > COMPACT_ROWS and len(parts) > 1:
+            # one concat + group-by per COMPACT_ROWS partial groups, instead of an index join per chunk
+            parts = [_compact(parts, keys)]
+            pending = 0
+
+    acc = _compact(parts, keys) if parts else None
+    if acc is None:
+        monthly = pd.DataFrame(columns=["county_fips", "period", "median_sale_price", "n_obs"])
+        yearly = pd.DataFrame(columns=["county_fips", "year", "avg_price", "n_obs"])
+        return monthly, yearly
+
+    acc = acc.reset_index()
+    if "county_fips" in acc.columns:
+        acc["county_fips"] = acc["county_fips"].astype(str)
+    monthly = acc[keys].copy()
+    monthly["median_sale_price"] = acc["wp"] / acc["weight"]
+    monthly["n_obs"] = acc["weight"] if xwalk is not None else acc["weight"].astype(np.int64)
+
+    acc["year"] = period_parts(acc["period"])[0]
+    ykeys = [k for k in keys if k != "period"] + ["year"]
+    ysum = acc.groupby(ykeys, as_index=False, observed=True)[["wp", "weight"]].sum()
+    yearly = ysum[ykeys].copy()
+    yearly["avg_price"] = ysum["wp"] / ysum["weight"]
+    yearly["n_obs"] = ysum["weight"] if xwalk is not None else ysum["weight"].astype(np.int64)
+
+    # means stay float64 and counts int64 (as in aggregate mode); _normalize compacts counts to int32
+    monthly = monthly.sort_values(keys, ignore_index=True)
+    yearly = yearly.sort_values(ykeys, ignore_index=True)
+    if "county_fips" in monthly.columns:
+        monthly["county_fips"] = monthly["county_fips"].astype("category")
+        yearly["county_fips"] = yearly["county_fips"].astype("category")
+    return monthly, yearly
+
+def concat_downcast(chunks) -> pd.DataFrame:
+    """Concatenate small-table chunks, downcasting each before it is kept."""
+    parts = [downcast(c) for c in chunks]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
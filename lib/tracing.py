@@ -0,0 +1,163 @@
+"""
+Lightweight stage tracing.
+
+    @traced("cpi_pivot")                      # decorator: times the call, rows in/out, frame memory
+    with trace("load_data") as span:          # context manager: fill span fields yourself
+        span.cache = "hit"
+
+Every finished span becomes a record {ts, run, stage, ms, rows_in, rows_out, mem_mb, cache,
+error} appended to a process-wide ring buffer (RING_SIZE records) and, when TRACE_FILE is set,
+to a JSON-lines file. `run` identifies one Streamlit script run (session id + run), so a rerun
+can be broken down stage by stage; it is None outside Streamlit.
+
+Tracing is on unless HOUSING_TRACE=0; HOUSING_TRACE_FILE=path.jsonl also writes JSON lines.
+When disabled, traced() costs one flag check per call and trace() yields a shared no-op span.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+RING_SIZE = 5_000
+
+ENABLED = os.environ.get("HOUSING_TRACE", "1") != "0"
+TRACE_FILE = os.environ.get("HOUSING_TRACE_FILE") or None
+
+_lock = threading.Lock()
+_ring: deque = deque(maxlen=RING_SIZE)
+
+def set_enabled(on: bool, trace_file: str | None = None):
+    global ENABLED, TRACE_FILE
+    ENABLED, TRACE_FILE = on, trace_file
+
+def run_id() -> str | None:
+    """Current Streamlit script run: the run context's cursor map is replaced on every rerun."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        return None
+    return f"{ctx.session_id[:8]}-{id(ctx.cursors):x}" if ctx is not None else None
+
+def _rows(obj) -> int | None:
+    if isinstance(obj, pd.DataFrame):
+        return len(obj)
+    if isinstance(obj, dict):
+        frames = [v for v in obj.values() if isinstance(v, pd.DataFrame)]
+        return sum(len(f) for f in frames) if frames else None
+    return None
+
+def _mem_mb(obj) -> float | None:
+    # shallow memory_usage: no per-string walk, so it stays cheap on large frames
+    if isinstance(obj, pd.DataFrame):
+        return obj.memory_usage(index=False).sum() / 1e6
+    if isinstance(obj, dict):
+        frames = [v for v in obj.values() if isinstance(v, pd.DataFrame)]
+        return sum(f.memory_usage(index=False).sum() for f in frames) / 1e6 if frames else None
+    return None
+
+class Span:
+    __slots__ = ("stage", "rows_in", "rows_out", "mem_mb", "cache", "error")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.rows_in = self.rows_out = self.mem_mb = self.cache = self.error = None
+
+    def output(self, obj):
+        """Take rows_out / mem_mb from a returned frame (or dict of frames)."""
+        self.rows_out, self.mem_mb = _rows(obj), _mem_mb(obj)
+        return obj
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        pass
+
+    def output(self, obj):
+        return obj
+
+_NO_SPAN = _NoSpan()
+
+def _record(span: Span, ms: float):
+    rec = {"ts": time.time(), "run": run_id(), "stage": span.stage, "ms": round(ms, 3),
+           "rows_in": span.rows_in, "rows_out": span.rows_out,
+           "mem_mb": round(span.mem_mb, 3) if span.mem_mb is not None else None,
+           "cache": span.cache, "error": span.error}
+    with _lock:
+        _ring.append(rec)
+        if TRACE_FILE:
+            try:
+                with open(TRACE_FILE, "a") as f:
+                    f.write(json.dumps(rec) + "\n")
+            except OSError:
+                pass
+
+@contextmanager
+def trace(stage: str):
+    if not ENABLED:
+        yield _NO_SPAN
+        return
+    span = Span(stage)
+    t0 = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        span.error = type(e).__name__
+        raise
+    finally:
+        _record(span, (time.perf_counter() - t0) * 1000)
+
+def traced(stage: str):
+    """Decorator form of trace(): rows_in from DataFrame arguments, rows_out/mem_mb from the result."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with trace(stage) as span:
+                frames = [a for a in (*args, *kwargs.values()) if isinstance(a, pd.DataFrame)]
+                span.rows_in = sum(len(f) for f in frames) if frames else None
+                return span.output(fn(*args, **kwargs))
+        return wrapper
+    return wrap
+
+# ---------- reading ----------
+def recent(limit: int | None = None) -> pd.DataFrame:
+    with _lock:
+        recs = list(_ring)
+    if limit:
+        recs = recs[-limit:]
+    cols = ["ts", "run", "stage", "ms", "rows_in", "rows_out", "mem_mb", "cache", "error"]
+    df = pd.DataFrame(recs, columns=cols)
+    df["ts"] = pd.to_datetime(df["ts"], unit="s")
+    return df
+
+def summary(df: pd.DataFrame | None = None) -> pd.DataFrame:
+    """Per-stage call count, p50/p95/max ms, mean rows out / memory and cache hit rate."""
+    df = recent() if df is None else df
+    cols = ["stage", "calls", "p50_ms", "p95_ms", "max_ms", "rows_out", "mem_mb", "hit_rate", "errors"]
+    if df.empty:
+        return pd.DataFrame(columns=cols)
+    g = df.groupby("stage")
+    out = pd.DataFrame({
+        "calls": g.size(),
+        "p50_ms": g["ms"].quantile(0.5),
+        "p95_ms": g["ms"].quantile(0.95),
+        "max_ms": g["ms"].max(),
+        "rows_out": g["rows_out"].mean(),
+        "mem_mb": g["mem_mb"].mean(),
+        "hit_rate": g["cache"].apply(lambda c: (c == "hit").sum() / c.notna().sum() if c.notna().any() else np.nan),
+        "errors": g["error"].count(),
+    }).reset_index()
+    return out.sort_values("p95_ms", ascending=False, ignore_index=True)[cols]
+
+def clear():
+    with _lock:
+        _ring.clear()
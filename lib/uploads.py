@@ -0,0 +1,165 @@
+"""
+Upload ingestion for the Settings page.
+
+Each uploaded file is parsed once (per Streamlit file id) with pyarrow's CSV reader using explicit
+column types, validated against UPLOAD_SCHEMAS, and key-normalized:
+  - acs / cpi are small and read in one go;
+  - redfin is streamed in BLOCK_BYTES record batches and folded straight into county x month /
+    county x year aggregates (lib/streaming.fold_housing), so a multi-hundred-MB export never
+    exists as a row-level frame. ZIP-level exports are mapped through the ZIP->county crosswalk.
+
+The parsed frames live in st.session_state[UPLOADS_KEY]; load_data overlays them on whatever source
+is selected and re-fingerprints the result, so uploads get their own data version and flow through
+the derived-frame cache like any other source. Per-session memory is capped at MAX_SESSION_MB.
+"""
+import gzip
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import streamlit as st
+
+from lib.crosswalk import load_crosswalk
+from lib.data_loader import UPLOADS_KEY, _pad_fips
+from lib.streaming import fold_housing
+
+BLOCK_BYTES = 16 << 20        # pyarrow read block; bounds the row-level working set for redfin
+MAX_SESSION_MB = 256          # parsed upload frames kept per session
+
+# kind -> {canonical column: arrow type}; columns outside the schema are never parsed
+UPLOAD_SCHEMAS = {
+    "acs": {"county_fips": pa.string(), "county_name": pa.string(), "state": pa.string(),
+            "year": pa.int32(), "income_usd": pa.float64()},
+    "redfin": {"county_fips": pa.string(), "zip_code": pa.string(), "period": pa.string(),
+               "median_sale_price": pa.float64()},
+    "cpi": {"date": pa.string(), "series_id": pa.string(), "value": pa.float64()},
+}
+REQUIRED = {
+    "acs": ["county_fips", "year", "income_usd"],
+    "redfin": ["period", "median_sale_price"],
+    "cpi": ["date", "series_id", "value"],
+}
+# header spellings seen in ACS/Redfin/BLS exports -> canonical names
+ALIASES = {
+    "fips": "county_fips", "geoid": "county_fips", "zip": "zip_code", "region_zip": "zip_code",
+    "period_begin": "period", "month": "period", "median_household_income": "income_usd",
+    "year_month": "date", "period_date": "date",
+}
+
+def _open(file):
+    """Arrow input stream over an upload (gzip detected from the magic bytes)."""
+    file.seek(0)
+    head = file.read(2)
+    file.seek(0)
+    return gzip.GzipFile(fileobj=file) if head == b"\x1f\x8b" else file
+
+def _header(file) -> tuple[list, str]:
+    stream = _open(file)
+    line = stream.readline().decode("utf-8-sig").rstrip("\r\n")
+    file.seek(0)
+    delimiter = "\t" if "\t" in line else ","
+    return [c.strip().strip('"') for c in line.split(delimiter)], delimiter
+
+def _columns(kind: str, header: list) -> dict:
+    """source column -> canonical column for the schema columns present in `header`."""
+    schema = UPLOAD_SCHEMAS[kind]
+    mapping = {}
+    for col in header:
+        canon = col.lower()
+        canon = ALIASES.get(canon, canon)
+        if canon in schema and canon not in mapping.values():
+            mapping[col] = canon
+    missing = [c for c in REQUIRED[kind] if c not in mapping.values()]
+    if kind == "redfin" and not {"county_fips", "zip_code"} & set(mapping.values()):
+        missing.append("county_fips or zip_code")
+    if missing:
+        raise ValueError(f"{kind} upload is missing column(s): {', '.join(missing)} "
+                         f"(found: {', '.join(header[:12])})")
+    return mapping
+
+def _reader(file, kind: str, mapping: dict, delimiter: str):
+    schema = UPLOAD_SCHEMAS[kind]
+    return pv.open_csv(
+        _open(file),
+        read_options=pv.ReadOptions(block_size=BLOCK_BYTES),
+        parse_options=pv.ParseOptions(delimiter=delimiter),
+        convert_options=pv.ConvertOptions(
+            include_columns=list(mapping),
+            column_types={src: schema[canon] for src, canon in mapping.items()},
+            strings_can_be_null=True,
+        ),
+    )
+
+def _batches(reader, mapping: dict):
+    for batch in reader:
+        yield batch.to_pandas().rename(columns=mapping)
+
+def ingest_upload(kind: str, file) -> dict:
+    """
+    Parse + validate + normalize one upload. Returns the load_data frames it replaces:
+    {"acs": ...}, {"cpi": ...} or {"redfin": monthly, "redfin_yearly": yearly}.
+    Raises ValueError on a schema or type mismatch.
+    """
+    header, delimiter = _header(file)
+    mapping = _columns(kind, header)
+    try:
+        reader = _reader(file, kind, mapping, delimiter)
+        if kind == "redfin":
+            geo = set(mapping.values())
+            xwalk = load_crosswalk() if "county_fips" not in geo else None
+            if "county_fips" not in geo and xwalk is None:
+                raise ValueError("ZIP-level redfin upload needs the ZIP->county crosswalk (data/zip_county_crosswalk.csv).")
+            frames = _batches(reader, mapping)
+            if "county_fips" in geo:
+                frames = (b.drop(columns=["zip_code"], errors="ignore") for b in frames)
+            monthly, yearly = fold_housing(frames, _pad_fips, xwalk)
+            if monthly.empty:
+                raise ValueError("redfin upload has no rows with a median_sale_price.")
+            return {"redfin": monthly, "redfin_yearly": yearly}
+        df = pd.concat(list(_batches(reader, mapping)), ignore_index=True)
+    except pa.ArrowInvalid as e:
+        raise ValueError(f"{kind} upload could not be parsed: {e}") from None
+
+    if kind == "acs":
+        df = df.dropna(subset=["county_fips", "year", "income_usd"])
+        df["county_fips"] = _pad_fips(df["county_fips"])
+        df["year"] = df["year"].astype("int32")
+    else:
+        df = df.dropna(subset=["date", "value"])
+        df["date"] = df["date"].str.slice(0, 7)
+    if df.empty:
+        raise ValueError(f"{kind} upload has no usable rows.")
+    return {kind: df.reset_index(drop=True)}
+
+# ---------- session registry ----------
+def _frames_mb(frames: dict) -> float:
+    return sum(df.memory_usage(deep=True).sum() for df in frames.values()) / 1e6
+
+def register_upload(kind: str, file) -> dict:
+    """
+    Ingest `file` unless this exact upload (Streamlit file_id) is already registered for `kind`,
+    and store it in the session. Returns the session record.
+    """
+    uploads = st.session_state.setdefault(UPLOADS_KEY, {})
+    rec = uploads.get(kind)
+    if rec is not None and rec["id"] == file.file_id:
+        return rec
+    frames = ingest_upload(kind, file)
+    others = sum(r["mb"] for k, r in uploads.items() if k != kind)
+    mb = _frames_mb(frames)
+    if others + mb > MAX_SESSION_MB:
+        raise ValueError(f"Uploads would hold {others + mb:,.0f} MB in this session (limit {MAX_SESSION_MB} MB).")
+    rec = {"id": file.file_id, "name": file.name, "mb": mb, "frames": frames,
+           "rows": {name: len(df) for name, df in frames.items()}}
+    uploads[kind] = rec
+    return rec
+
+def drop_upload(kind: str):
+    st.session_state.get(UPLOADS_KEY, {}).pop(kind, None)
+
+def upload_info() -> pd.DataFrame:
+    uploads = st.session_state.get(UPLOADS_KEY, {})
+    rows = [{"dataset": kind, "file": r["name"],
+             "rows": ", ".join(f"{n}: {c:,}" for n, c in r["rows"].items()), "MB": round(r["mb"], 2)}
+            for kind, r in uploads.items()]
+    return pd.DataFrame(rows, columns=["dataset", "file", "rows", "MB"])
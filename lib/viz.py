@@ -1,130 +1,288 @@
+import functools
+import logging
+import re
+import time
+
+import numpy as np
 import plotly.express as px
+import plotly.io as pio
 import pandas as pd
+import streamlit as st
+
+from lib.decimate import POINTS_PER_SERIES, decimate_wide
+from lib.geo import COUNTIES_URL, county_geojson, has_geometry, zoom_for
+from lib.tracing import trace
+
+WEBGL_POINTS = 1_000             # above this many points per figure, lines render as Scattergl
+FLOAT_DECIMALS = 3               # x/y/z floats are rounded to this many decimals before sending
+FIGURE_BYTES_BUDGET = 1_000_000  # serialized size per figure; larger figures log a warning
+
+logger = logging.getLogger(__name__)
+
+# ---------- rendering budget ----------
+def _render_mode(n_points: int) -> str:
+    return "webgl" if n_points > WEBGL_POINTS else "svg"
+
+_CUSTOMDATA_REF = re.compile(r"customdata\[(\d+)\]")
+
+def _slim(fig):
+    """
+    Round float payloads and keep only the customdata columns the hovertemplate reads
+    (plotly.express also ships hidden and duplicated hover columns per point).
+    """
+    for trace in fig.data:
+        for attr in ("x", "y", "z"):
+            values = getattr(trace, attr, None)
+            if values is not None:
+                arr = np.asarray(values)
+                if arr.dtype.kind == "f":
+                    trace[attr] = np.round(arr, FLOAT_DECIMALS)
+        custom = getattr(trace, "customdata", None)
+        if custom is None:
+            continue
+        template = trace.hovertemplate or ""
+        used = sorted({int(i) for i in _CUSTOMDATA_REF.findall(template)})
+        if not used:
+            trace.customdata = None
+            continue
+        custom = np.asarray(custom, dtype=object)
+        if custom.ndim == 2 and len(used) < custom.shape[1]:
+            remap = {old: new for new, old in enumerate(used)}
+            trace.customdata = custom[:, used]
+            trace.hovertemplate = _CUSTOMDATA_REF.sub(lambda m: f"customdata[{remap[int(m.group(1))]}]", template)
+    return fig
+
+def _n_points(fig) -> int:
+    n = 0
+    for trace in fig.data:
+        values = next((v for v in (getattr(trace, a, None) for a in ("y", "z", "locations")) if v is not None), ())
+        n += len(values)
+    return n
+
+def _instrumented(fn):
+    """
+    Slim every figure a chart builder returns (one figure or a {key: figure} dict) and log its
+    build time. With this logger at DEBUG the serialized JSON size is measured too (one extra
+    to_json per figure, so off by default); figures over FIGURE_BYTES_BUDGET then log a warning.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        with trace(f"viz.{fn.__name__}") as span:
+            frames = [a for a in args if isinstance(a, pd.DataFrame)]
+            span.rows_in = sum(len(f) for f in frames) if frames else None
+            out = fn(*args, **kwargs)
+            figs = [_slim(f) for f in (out.values() if isinstance(out, dict) else [out])]
+            n_points = sum(_n_points(f) for f in figs)
+            span.rows_out = n_points            # points plotted
+        ms = (time.perf_counter() - t0) * 1000
+        if not logger.isEnabledFor(logging.DEBUG):
+            logger.info("%s: %d figure(s), %d points, %.0f ms", fn.__name__, len(figs), n_points, ms)
+            return out
+        sizes = [len(pio.to_json(f, validate=False)) for f in figs]
+        largest = max(sizes, default=0)
+        logger.log(logging.WARNING if largest > FIGURE_BYTES_BUDGET else logging.DEBUG,
+                   "%s: %d figure(s), %d points, %.1f KB JSON (largest %.1f KB, budget %.0f KB), %.0f ms",
+                   fn.__name__, len(figs), n_points, sum(sizes) / 1024,
+                   largest / 1024, FIGURE_BYTES_BUDGET / 1024, ms)
+        return out
+    return wrapper
+
+def plotly_chart(fig, **kwargs):
+    """st.plotly_chart, traced: the figure is serialized and sent inside this call."""
+    with trace("st.plotly_chart") as span:
+        span.rows_out = _n_points(fig)
+        return st.plotly_chart(fig, **kwargs)
 
 # ---------- helpers ----------
 def _fips_series(series: pd.Series) -> pd.Series:
     """
-    Convert a county identifier to Plotly-friendly 5-digit FIPS when possible.
-    Non-numeric IDs are kept as-is but will be filtered out from the map.
+    Convert a county identifier to Plotly-friendly 5-digit FIPS when possible; anything that
+    isn't 1-5 digits becomes NA and is left off the map. Validation runs once per distinct ID
+    (a few thousand), not once per row.
+    """
+    codes, uniques = pd.factorize(series)
+    u = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    valid = u.str.fullmatch(r"\d{1,5}").fillna(False).to_numpy(bool)
+    padded = np.where(valid, u.str.zfill(5).to_numpy(object), None)
+    out = np.where(codes >= 0, padded[codes] if len(padded) else None, None)
+    return pd.Series(out, index=series.index, dtype=object)
+
+def _county_geojson(fips: pd.Series, zoom: str = "auto"):
+    """
+    Local, pre-simplified shapes for just these counties (cached per FIPS set and zoom; see
+    lib/geo.py). Falls back to the remote Plotly file (all US counties) when the full local file
+    is not installed (python -m lib.geo); lib/geo logs FIPS that have no local shape.
     """
-    s = series.astype(str).str.strip()
-    is_num = s.str.fullmatch(r"\d+")
-    return s.where(~is_num, s.str.zfill(5))
+    if not has_geometry():
+        return COUNTIES_URL
+    keys = tuple(sorted(fips.unique()))
+    return county_geojson(keys, zoom_for(keys) if zoom == "auto" else zoom)
 
 # ---------- CPI ----------
-def line_cpi(cpi_wide: pd.DataFrame):
+@_instrumented
+def line_cpi(cpi_wide: pd.DataFrame, series: list | None = None, budget: int | None = POINTS_PER_SERIES,
+             x_range: tuple | None = None, method: str = "lttb"):
     """
     Multi-series CPI line chart. Expects a pivoted dataframe with:
       columns: ['date', SERIES_1, SERIES_2, ...]
+    Plots `series` (default: all) over x_range, decimated to at most `budget` points per series
+    (lib/decimate.py); budget=None plots every point.
     """
     cols = [c for c in cpi_wide.columns if c != "date"]
+    series = [c for c in (series if series is not None else cols) if c in cols]
+    long = decimate_wide(cpi_wide, "date", series, budget or len(cpi_wide), x_range, method)
     fig = px.line(
-        cpi_wide,
+        long,
         x="date",
-        y=cols,
+        y="value",
+        color="series_id",
+        render_mode=_render_mode(len(long)),
         title="CPI Series Over Time",
     )
-    fig.update_layout(legend_title_text="Series ID", hovermode="x unified")
+    fig.update_layout(legend_title_text="Series ID", hovermode="x unified", yaxis_title=None)
     return fig
 
-# ---------- County drilldown (kept for compatibility with the Exploration page) ----------
-def line_prices(redfin_yearly: pd.DataFrame, county_meta: pd.DataFrame, county_fips: str):
+# ---------- County drilldown (Exploration page; rows come from lib/county_index.CountyIndex) ----------
+@_instrumented
+def line_prices(county_yearly: pd.DataFrame, name: str):
     """
-    Yearly average price trend for a county.
-    Expects redfin_yearly with columns: ['county_fips','year','avg_price']
+    Yearly average price trend for one county.
+    Expects that county's rows with columns: ['year','avg_price']
     """
-    sub = redfin_yearly[redfin_yearly["county_fips"] == county_fips]
-    if sub.empty:
+    if county_yearly.empty:
         return px.scatter(title="No price data for selected county")
-    name = county_meta.loc[county_meta["county_fips"] == county_fips, "county_name"]
-    name = name.iloc[0] if not name.empty else county_fips
     fig = px.line(
-        sub,
+        county_yearly,
         x="year",
         y="avg_price",
         markers=True,
+        render_mode=_render_mode(len(county_yearly)),
         title=f"Average Median Sale Price per Year — {name}",
     )
     return fig
 
-def line_ratio(ratio_df: pd.DataFrame, county_meta: pd.DataFrame, county_fips: str):
+@_instrumented
+def line_ratio(county_ratio: pd.DataFrame, name: str):
     """
-    Price-to-income ratio trend for a county.
-    Expects ratio_df with columns: ['county_fips','year','price_to_income']
+    Price-to-income ratio trend for one county.
+    Expects that county's rows with columns: ['year','price_to_income']
     """
-    sub = ratio_df[ratio_df["county_fips"] == county_fips]
-    if sub.empty:
+    if county_ratio.empty:
         return px.scatter(title="No affordability ratio for selected county")
-    name = county_meta.loc[county_meta["county_fips"] == county_fips, "county_name"]
-    name = name.iloc[0] if not name.empty else county_fips
     fig = px.line(
-        sub,
+        county_ratio,
         x="year",
         y="price_to_income",
         markers=True,
+        render_mode=_render_mode(len(county_ratio)),
         title=f"Price-to-Income Ratio — {name}",
     )
     return fig
 
 # ---------- Maps ----------
-def choropleth_ratio(ratio_df: pd.DataFrame, counties: pd.DataFrame, year: int):
+def _map_frame(df: pd.DataFrame, value_col: str, counties: pd.DataFrame | None = None) -> pd.DataFrame:
+    """All years at once: validated 5-digit `fips`, county name/state for hover, non-null values."""
+    if counties is not None:
+        meta = [c for c in ("county_name", "state") if c not in df.columns]
+        df = df.merge(counties[["county_fips", *meta]], on="county_fips", how="left")
+    df = df.copy()
+    df["fips"] = _fips_series(df["county_fips"])
+    df = df[df["fips"].notna() & df[value_col].notna()]
+    df["year"] = pd.to_numeric(df["year"], errors="coerce")
+    return df.dropna(subset=["year"])
+
+def _color_range(values: pd.Series) -> tuple[float, float]:
+    """One color scale for every year (2nd-98th percentile, so a single outlier can't wash it out)."""
+    lo, hi = np.nanpercentile(values.to_numpy(np.float64), [2, 98])
+    return (float(lo), float(hi)) if hi > lo else (float(lo), float(lo) + 1.0)
+
+def _choropleth_years(df: pd.DataFrame, value_col: str, title: str, hover_data: dict, zoom: str,
+                      years: list | None = None) -> dict:
+    """
+    year -> choropleth figure, all on one color range and one geometry detail level; each figure
+    carries only its own year's counties. `years` builds only those figures (detail level and
+    color range still come from every year).
+    """
+    if zoom == "auto":
+        zoom = zoom_for(df["fips"].unique())
+    color_range = _color_range(df[value_col])
+    hover_name = "county_name" if "county_name" in df.columns else None
+    figs = {}
+    for year, sub in df.groupby("year", sort=True):
+        if years is not None and int(year) not in years:
+            continue
+        fig = px.choropleth(
+            sub,
+            geojson=_county_geojson(sub["fips"], zoom),
+            locations="fips",
+            color=value_col,
+            range_color=color_range,
+            hover_name=hover_name,
+            hover_data=hover_data,
+            scope="usa",
+            title=title.format(year=int(year)),
+        )
+        fig.update_geos(fitbounds="locations", visible=False)
+        figs[int(year)] = fig
+    return figs
+
+@_instrumented
+def choropleth_ratio_years(ratio_df: pd.DataFrame, counties: pd.DataFrame, zoom: str = "auto",
+                           years: list | None = None) -> dict:
     """
-    County choropleth of price-to-income ratio for a given year.
+    Price-to-income choropleths for every year in ratio_df, keyed by year (see lib/derived.get_ratio_maps).
     Requires ratio_df with ['county_fips','year','price_to_income'] and
     counties with ['county_fips','county_name','state'].
+    zoom picks the geometry detail (lib/geo.ZOOM_LEVELS); "auto" goes by the mapped extent.
+    years limits the output to those years, on the color scale of all of them (precompute.py
+    builds the years in parallel).
     """
-    if ratio_df.empty:
-        return px.scatter(title="No county-level affordability yet")
-
-    df = ratio_df[ratio_df["year"] == year].merge(
-        counties[["county_fips", "county_name", "state"]],
-        on="county_fips",
-        how="left",
-    )
+    df = _map_frame(ratio_df, "price_to_income", counties)
     if df.empty:
-        return px.scatter(title=f"No data for {year}")
+        return {}
+    hover = {"fips": False, "price_to_income": ":.2f"}
+    if "state" in df.columns:
+        hover["state"] = True
+    return _choropleth_years(df, "price_to_income", "Price-to-Income Ratio by County — {year}", hover, zoom, years)
 
-    df["fips"] = _fips_series(df["county_fips"])
-    df = df[df["fips"].str.fullmatch(r"\d{5}") == True]
+@_instrumented
+def choropleth_income_years(acs: pd.DataFrame, zoom: str = "auto") -> dict:
+    """
+    Fallback county choropleths by income when ratio isn't available, keyed by year.
+    Expects acs with ['county_fips','year','income_usd'] (optionally county_name).
+    """
+    df = _map_frame(acs, "income_usd")
     if df.empty:
+        return {}
+    return _choropleth_years(df, "income_usd", "Median Household Income by County — {year}",
+                             {"fips": False, "income_usd": ":,.0f"}, zoom)
+
+def figure_for_year(figs: dict, year: int):
+    """Look up a prepared year's figure, with a placeholder when there is nothing to map."""
+    if not figs:
         return px.scatter(title="No mappable counties (need numeric 5-digit FIPS)")
+    year = int(year)
+    return figs[year] if year in figs else px.scatter(title=f"No data for {year}")
 
-    fig = px.choropleth(
-        df,
-        geojson="https://raw.githubusercontent.com/plotly/datasets/master/geojson-counties-fips.json",
-        locations="fips",
-        color="price_to_income",
-        hover_name="county_name",
-        hover_data={"fips": False, "state": True, "price_to_income": ":.2f"},
-        scope="usa",
-        title=f"Price-to-Income Ratio by County — {year}",
-    )
-    fig.update_geos(fitbounds="locations", visible=False)
-    return fig
+def choropleth_ratio(ratio_df: pd.DataFrame, counties: pd.DataFrame, year: int, zoom: str = "auto"):
+    """
+    County choropleth of price-to-income ratio for a single year. Pages should prefer
+    lib/derived.get_ratio_maps, which builds every year once per data version.
+    """
+    if ratio_df.empty:
+        return px.scatter(title="No county-level affordability yet")
+    df = ratio_df[ratio_df["year"] == year]
+    if df.empty:
+        return px.scatter(title=f"No data for {year}")
+    return figure_for_year(choropleth_ratio_years(df, counties, zoom), year)
 
-def choropleth_income(acs_year: pd.DataFrame):
+def choropleth_income(acs_year: pd.DataFrame, zoom: str = "auto"):
     """
-    Fallback county choropleth by income when ratio isn't available.
-    Expects acs_year with ['county_fips','income_usd'] (optionally county_name).
+    Fallback county choropleth by income for a single year.
+    Expects acs_year with ['county_fips','year','income_usd'] (optionally county_name).
     """
     if acs_year.empty:
         return px.scatter(title="No county income to map")
-
-    df = acs_year.copy()
-    df["fips"] = _fips_series(df["county_fips"])
-    df = df[df["fips"].str.fullmatch(r"\d{5}") == True]
-    if df.empty:
-        return px.scatter(title="No mappable counties (need numeric 5-digit FIPS)")
-
-    fig = px.choropleth(
-        df,
-        geojson="https://raw.githubusercontent.com/plotly/datasets/master/geojson-counties-fips.json",
-        locations="fips",
-        color="income_usd",
-        hover_name="county_name" if "county_name" in df.columns else None,
-        hover_data={"fips": False, "income_usd": ":,.0f"},
-        scope="usa",
-        title="Median Household Income by County",
-    )
-    fig.update_geos(fitbounds="locations", visible=False)
-    return fig
+    figs = choropleth_income_years(acs_year, zoom)
+    return figure_for_year(figs, next(iter(figs), 0))
@@ -0,0 +1,104 @@
+"""
+Build-once SQLite sample warehouse.
+
+data/sample_dw.sqlite is a pure function of the sample CSVs, so it is only rebuilt when their
+content hash changes. The hash is stored inside the database (table _build_info). A rebuild is
+written to a temp file next to the target and os.replace()d into place, so concurrent sessions
+and open connections only ever see a complete warehouse.
+
+    python -m lib.warehouse            # build if the CSVs changed
+    python -m lib.warehouse --force    # always rebuild
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+
+from lib.aggregates import build_aggregates
+from lib.data_loader import CSV_FILES, DATA_DIR, SQLITE_PATH, _load_csv, _normalize, get_sqlite_engine
+from lib.engines import dispose_engine
+from lib.sql_utils import load_sample_into_sqlite
+
+# bump when load_sample_into_sqlite / SQLITE_INDEXES / the agg tables change shape
+WAREHOUSE_VERSION = 1
+
+_lock = threading.Lock()
+_hashes: dict = {}   # (path, size, mtime_ns) -> sha1 of the file, so reruns don't re-read the CSVs
+
+def _file_hash(path: str) -> str:
+    st_ = os.stat(path)
+    key = (path, st_.st_size, st_.st_mtime_ns)
+    if key not in _hashes:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _hashes[key] = h.hexdigest()
+    return _hashes[key]
+
+def source_hash() -> str:
+    """Content hash of the sample CSVs plus WAREHOUSE_VERSION."""
+    h = hashlib.sha1(f"warehouse:{WAREHOUSE_VERSION}".encode())
+    for name in sorted(CSV_FILES.values()):
+        h.update(f"{name}:{_file_hash(os.path.join(DATA_DIR, name))}".encode())
+    return h.hexdigest()[:16]
+
+def built_hash(db_path: str | None = None) -> str | None:
+    """Source hash the warehouse at db_path was built from (None if missing or pre-dates _build_info)."""
+    db_path = db_path or SQLITE_PATH
+    if not os.path.exists(db_path):
+        return None
+    try:
+        with sqlite3.connect(f"file:{db_path}?mode=ro", uri=True) as conn:
+            row = conn.execute("SELECT value FROM _build_info WHERE key = 'source_hash'").fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+def _build(db_path: str, source: str):
+    tmp = f"{db_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        # source dtypes, not the compact load_data ones: float32 would round the stored measures
+        dfs = _normalize(_load_csv("raw"), compact=False)
+        redfin_rows = dfs["redfin"].drop(columns=["year", "month"])  # keep the fact table at its source shape
+        load_sample_into_sqlite(tmp, dfs["acs"], redfin_rows, dfs["cpi"], dfs["counties"])
+        engine = get_sqlite_engine(tmp)
+        build_aggregates(engine)
+        dispose_engine(engine)   # registry engine for the temp file; close it before the replace
+        with sqlite3.connect(tmp) as conn:
+            conn.execute("CREATE TABLE _build_info(key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("INSERT INTO _build_info VALUES ('source_hash', ?)", (source,))
+            conn.execute("ANALYZE")
+        conn.close()
+        os.replace(tmp, db_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def ensure_warehouse(db_path: str | None = None, force: bool = False) -> bool:
+    """
+    Make sure db_path holds the warehouse for the current CSVs; returns True if it was (re)built.
+    Cheap when up to date: a stat per CSV and one read of _build_info.
+    """
+    db_path = db_path or SQLITE_PATH
+    source = source_hash()
+    if not force and built_hash(db_path) == source:
+        return False
+    with _lock:
+        # another session may have finished the build while we waited
+        if not force and built_hash(db_path) == source:
+            return False
+        _build(db_path, source)
+    return True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the SQLite sample warehouse from the sample CSVs.")
+    parser.add_argument("--db", default=SQLITE_PATH)
+    parser.add_argument("--force", action="store_true", help="rebuild even if the CSVs are unchanged")
+    args = parser.parse_args(argv)
+    built = ensure_warehouse(args.db, args.force)
+    print(f"{args.db}: {'built' if built else 'up to date'} (source {source_hash()})")
+
+if __name__ == "__main__":
+    main()
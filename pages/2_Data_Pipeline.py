@@ -40,8 +40,12 @@ st.code("""
 # Option 1: Keep as pandas and cache in Streamlit
 st.session_state['dfs'] = {'acs': acs, 'redfin': redfin, 'cpi': cpi}
 
-# Option 2: Write to data warehouse (MySQL) via SQLAlchemy
-yearly_prices.to_sql("fact_housing_yearly", engine, if_exists="replace", index=False)
+# Option 2: Materialize aggregates inside the warehouse (MySQL or the SQLite sample)
+#   agg_housing_county_month, agg_housing_county_year, agg_price_to_income
+from lib.aggregates import build_aggregates
+build_aggregates(engine)                    # full rebuild
+build_aggregates(engine, since="2024-01")   # after a load: only the new/restated months
+# load_data() reads these tables when they exist
 """, language="python")
 
 st.success("This page documents the pipeline logic with real code snippets for your portfolio.")
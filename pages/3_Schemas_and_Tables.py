@@ -1,9 +1,32 @@
 import streamlit as st
+from lib.catalog import get_catalog
+from lib.data_loader import SQLITE_PATH, get_mysql_engine, get_sqlite_engine, secrets_has_mysql
 from lib.sql_utils import MYSQL_DDL
+from lib.warehouse import ensure_warehouse
 
 st.title("🧬 Schemas & Tables")
 
-st.markdown("Below are MySQL DDLs for a small data warehouse used in this project.")
+# Rendered from the live warehouse (introspected once per process, see lib/catalog.py)
+catalog = None
+if secrets_has_mysql():
+    try:
+        catalog, label = get_catalog(get_mysql_engine()), "MySQL warehouse"
+    except Exception as e:
+        st.warning(f"MySQL schema unavailable ({e}). Showing the SQLite sample warehouse.")
+if catalog is None:
+    ensure_warehouse(SQLITE_PATH)
+    catalog, label = get_catalog(get_sqlite_engine()), "embedded SQLite sample warehouse"
+
+tbl, geo = catalog.housing_table()
+st.markdown(f"Tables in the **{label}**. Housing fact in use: `{tbl}` ({geo} level).")
+st.dataframe(catalog.to_frame(), hide_index=True)
+
+for name in sorted(catalog.tables):
+    with st.expander(f"{name} — ~{catalog.rows(name) or 0:,} rows"):
+        st.dataframe(catalog.columns_frame(name), hide_index=True)
+
+st.markdown("#### Reference MySQL DDL")
+st.caption("DDL for the full MySQL warehouse this project targets.")
 for name, ddl in MYSQL_DDL.items():
-    st.markdown(f"**{name}**")
-    st.code(ddl, language="sql")
+    with st.expander(name):
+        st.code(ddl, language="sql")
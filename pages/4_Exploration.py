@@ -1,29 +1,59 @@
 import streamlit as st
 import pandas as pd
-from lib.data_loader import load_data, compute_price_to_income, cpi_pivot
-from lib.viz import line_prices, line_ratio
+from lib.data_loader import load_data, load_raw_housing
+from lib.derived import get_county_index, get_deflator, get_real_index
+from lib.deflate import ALL_ITEMS
+from lib.viz import line_prices, line_ratio, plotly_chart
 
 st.title("🔎 Exploration — County Drilldown")
 
 data = load_data("auto")
 acs, redfin, cpi, counties = data["acs"], data["redfin"], data["cpi"], data["counties"]
-ratio_df = compute_price_to_income(acs, redfin)
 
-display_names = (counties["county_name"] + ", " + counties["state"] + " — " + counties["county_fips"])
-choice = st.selectbox("Choose a county", display_names)
-selected_fips = choice.split("—")[-1].strip()
+# Built once per data version: labels plus per-county row spans (no per-selection scans)
+index = get_county_index(data)
 
-# Yearly prices
-redfin_yearly = (redfin.assign(year=redfin['period'].str.slice(0,4).astype(int))
-                 .groupby(['county_fips','year'], as_index=False)['median_sale_price'].mean()
-                 .rename(columns={'median_sale_price':'avg_price'}))
+# options are FIPS; type a county name or FIPS to search the labels
+selected_fips = st.selectbox("Choose a county", index.fips, format_func=index.label)
+name = index.name(selected_fips)
+
+# Yearly prices (aggregated in the warehouse by load_data)
+county_yearly = index.rows("redfin_yearly", selected_fips)
+county_ratio = index.rows("ratio", selected_fips)
+
+# Real dollars: prices deflated monthly, incomes by the yearly average CPI, both to the base month
+deflator = get_deflator(data)
+ratio_plot = county_ratio
+dollars = st.radio("Dollars", ["Nominal", "Real"], horizontal=True, disabled=not deflator.months)
+if dollars == "Real":
+    series = list(deflator.series)
+    d1, d2, d3 = st.columns(3)
+    default = series.index(ALL_ITEMS) if ALL_ITEMS in series else 0
+    price_series = d1.selectbox("Deflate prices by", series, index=default)
+    income_series = d2.selectbox("Deflate incomes by", series, index=default)
+    base = d3.select_slider("Base month", options=deflator.months, value=deflator.default_base())
+    real = get_real_index(data, price_series, income_series, base).rows("real", selected_fips)
+    county_yearly = real[["county_fips", "year", "real_price"]].rename(columns={"real_price": "avg_price"})
+    county_ratio = real
+    ratio_plot = real.drop(columns="price_to_income").rename(columns={"real_price_to_income": "price_to_income"})
+    st.caption(f"Prices and incomes in {base} dollars; the ratio columns compare real price to real income.")
 
 c1, c2 = st.columns(2)
 with c1:
-    st.plotly_chart(line_prices(redfin_yearly, counties, selected_fips), use_container_width=True)
+    plotly_chart(line_prices(county_yearly, name), use_container_width=True)
 with c2:
-    st.plotly_chart(line_ratio(ratio_df, counties, selected_fips), use_container_width=True)
+    plotly_chart(line_ratio(ratio_plot, name), use_container_width=True)
 
 st.markdown("---")
 st.write("Raw yearly table:")
-st.dataframe(ratio_df[ratio_df["county_fips"]==selected_fips].sort_values("year"))
+st.dataframe(county_ratio)
+
+# Raw rows are only fetched on explicit drill-down
+with st.expander("Drill down: raw housing rows"):
+    years = list(county_yearly["year"].unique())
+    if years:
+        drill_year = st.selectbox("Year", years, index=len(years) - 1)
+        if st.button("Load raw rows"):
+            st.dataframe(load_raw_housing("auto", county_fips=selected_fips, year=int(drill_year)))
+    else:
+        st.write("No housing rows for this county.")
@@ -1,12 +1,14 @@
 import streamlit as st
-from lib.data_loader import load_data, compute_price_to_income
-from lib.viz import choropleth_ratio
+from lib.data_loader import load_data
+from lib.derived import get_ratio_df, get_ratio_maps
+from lib.geo import ZOOM_LEVELS
+from lib.viz import figure_for_year, plotly_chart
 
 st.title("🗺️ Maps — Price-to-Income Ratio by County")
 
 data = load_data("auto")
 acs, redfin, cpi, counties = data["acs"], data["redfin"], data["cpi"], data["counties"]
-ratio_df = compute_price_to_income(acs, redfin)
+ratio_df = get_ratio_df(data)
 
 year = st.slider("Year",
                  int(ratio_df["year"].min()),
@@ -14,6 +16,10 @@ year = st.slider("Year",
                  int(ratio_df["year"].max()),
                  step=1)
 
-fig = choropleth_ratio(ratio_df, counties, year)
-st.plotly_chart(fig, use_container_width=True)
-st.caption("Map uses Plotly county GeoJSON; only 5-digit numeric FIPS are plotted.")
+zoom = st.selectbox("Geometry detail", ["auto", *ZOOM_LEVELS], index=0)
+
+# every year is built once per data version; moving the slider is a dict lookup
+fig = figure_for_year(get_ratio_maps(data, zoom), year)
+plotly_chart(fig, use_container_width=True)
+st.caption("Map uses local, pre-simplified county shapes (lib/geo.py) when data/geo/us_counties.geojson is "
+           "installed, else Plotly's remote county file; only 5-digit numeric FIPS are plotted.")
@@ -1,25 +1,85 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
 import os
-from lib.data_loader import load_data
-from lib.sql_utils import load_sample_into_sqlite
+import time
+import pandas as pd
+from lib.catalog import scan_warnings
+from lib.data_loader import get_sqlite_engine, load_data
+from lib.duck_exec import THREADS, DuckQueryJob, duckdb_available, frame_views, parquet_views
+from lib.query_exec import MAX_ROWS, PAGE_ROWS, TIMEOUT_S, QueryJob
+from lib.warehouse import ensure_warehouse
 
 st.title("🧪 SQL Workbench — Try Queries on the Sample Warehouse")
 
 db_path = os.path.join("data", "sample_dw.sqlite")
 
-# Load data and build SQLite (idempotent)
-dfs = load_data("csv")
-load_sample_into_sqlite(db_path, dfs["acs"], dfs["redfin"], dfs["cpi"], dfs["counties"])
+# Build SQLite once per CSV content hash (no-op on reruns)
+ensure_warehouse(db_path)
+
+engine = st.radio("Engine", ["SQLite", "DuckDB"], horizontal=True, disabled=not duckdb_available())
+if not duckdb_available():
+    st.caption("DuckDB backend unavailable: `pip install duckdb` to query the loaded frames in place.")
+
+if engine == "SQLite":
+    st.info("Running against an embedded SQLite database created from the sample CSVs (read-only).")
+    default_sql = "SELECT name FROM sqlite_master WHERE type='table';"
+else:
+    frames = frame_views(load_data("auto"))
+    views = sorted({*frames, *parquet_views()})
+    st.info(f"Running on DuckDB ({THREADS} threads) over the frames already loaded by the app and any "
+            f"Parquet files in data/parquet, registered as views: {', '.join(views)}.")
+    default_sql = "SELECT state, count(*) AS counties, median(income_usd) AS median_income\n" \
+                  "FROM acs GROUP BY state ORDER BY median_income DESC;"
 
-st.info("Running against an embedded SQLite database created from the sample CSVs.")
+q = st.text_area("SQL", default_sql, height=150, key=f"workbench_sql_{engine}")
+c1, c2, c3 = st.columns(3)
+max_rows = c1.number_input("Row limit", min_value=100, max_value=1_000_000, value=MAX_ROWS, step=1_000)
+page_rows = c2.number_input("Page size", min_value=100, max_value=50_000, value=PAGE_ROWS, step=100)
+timeout_s = c3.number_input("Timeout (s)", min_value=1.0, max_value=300.0, value=TIMEOUT_S, step=1.0)
 
-q = st.text_area("SQL", "SELECT name FROM sqlite_master WHERE type='table';", height=150)
-if st.button("Run"):
-    try:
-        with sqlite3.connect(db_path) as conn:
-            out = pd.read_sql_query(q, conn)
+job = st.session_state.get("workbench_job")
+b1, b2, b3 = st.columns(3)
+if b1.button("Run"):
+    if job is not None:
+        job.close()
+    limits = dict(page_rows=int(page_rows), max_rows=int(max_rows), timeout_s=float(timeout_s))
+    if engine == "SQLite":
+        job = QueryJob(db_path, q, **limits).start()
+        # EXPLAIN against the schema catalog: flag full scans of large tables before the rows arrive
+        st.session_state["workbench_scans"] = scan_warnings(get_sqlite_engine(db_path), q)
+    else:
+        job = DuckQueryJob(frames, q, **limits).start()
+        st.session_state["workbench_scans"] = []
+    job.engine, job.run_no = engine, len(st.session_state.get("workbench_history", {}))
+    st.session_state["workbench_job"] = job
+if b2.button("Cancel", disabled=job is None or not job.running):
+    job.cancel()
+if b3.button("Load more", disabled=job is None or job.running or job.exhausted):
+    job.load_more()
+
+if job is not None:
+    for w in st.session_state.get("workbench_scans", []):
+        st.warning(w)
+    # poll instead of blocking, so a Cancel click can interrupt this run
+    status, t0 = st.empty(), time.perf_counter()
+    while not job.wait(0.2):
+        status.caption(f"Running… {time.perf_counter() - t0:.1f}s")
+    status.empty()
+
+    if job.error:
+        st.error(job.error)
+    out = job.frame
+    if job.columns:
         st.dataframe(out)
-    except Exception as e:
-        st.error(str(e))
+    steps = f" · ~{job.steps:,} VM steps" if job.engine == "SQLite" else ""
+    st.caption(f"{job.engine}: {len(out):,} rows · {job.elapsed:.3f}s{steps}")
+    if job.truncated:
+        st.warning(f"Stopped at the {job.max_rows:,}-row limit; raise it and re-run to see more.")
+    elif not job.exhausted:
+        st.caption("More rows available — use **Load more**.")
+
+    # timings per run (updated as pages are loaded), to compare the two engines on the same SQL
+    history = st.session_state.setdefault("workbench_history", {})
+    history[job.run_no] = {"engine": job.engine, "sql": " ".join(job.sql.split())[:80], "rows": len(out),
+                        "seconds": round(job.elapsed, 4), "error": job.error}
+    st.markdown("#### Recent runs")
+    st.dataframe(pd.DataFrame(list(history.values())[-10:]).iloc[::-1], hide_index=True)
@@ -22,8 +22,10 @@ st.write("Pivoting enables multi-series line charts for CPI categories.")
 
 st.markdown("### 3) Choropleth Map Setup")
 st.code("""
+from lib.geo import county_geojson, zoom_for
+fips = tuple(sorted(df['fips'].unique()))
 px.choropleth(df,
-              geojson='https://raw.githubusercontent.com/plotly/datasets/master/geojson-counties-fips.json',
+              geojson=county_geojson(fips, zoom_for(fips)),   # local, simplified, only these counties
               locations='fips', color='price_to_income', scope='usa')
 """, language="python")
-st.write("Plotly comes with a ready USA counties GeoJSON for choropleths.")
+st.write("County shapes are loaded once from a local GeoJSON, pre-simplified per zoom level and subset to the mapped FIPS.")
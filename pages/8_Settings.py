@@ -1,23 +1,65 @@
 import streamlit as st
-import pandas as pd
+from lib import refresher
+from lib.artefacts import artefact_info
+from lib.catalog import clear_catalogs
+from lib.data_loader import load_data
+from lib.derived import derived_stats, clear_derived
+from lib.normalize import memory_report
+from lib.snapshot import snapshot_info, clear_snapshots
+from lib.uploads import MAX_SESSION_MB, drop_upload, register_upload, upload_info
 
 st.title("⚙️ Settings — Source, Uploads & Cache")
 
 st.markdown("Choose data source (sidebar), or upload real datasets to override samples.")
 
-acs_file = st.file_uploader("Upload ACS income CSV", type=["csv"])
-redfin_file = st.file_uploader("Upload Redfin housing CSV", type=["csv"])
-cpi_file = st.file_uploader("Upload BLS CPI CSV", type=["csv"])
+UPLOADS = {
+    "acs": "Upload ACS income CSV (county_fips, year, income_usd)",
+    "redfin": "Upload Redfin housing CSV/TSV (county_fips or zip_code, period, median_sale_price)",
+    "cpi": "Upload BLS CPI CSV (date, series_id, value)",
+}
+received = False
+for kind, label in UPLOADS.items():
+    f = st.file_uploader(label, type=["csv", "tsv", "txt", "gz"], key=f"upload_{kind}")
+    if f is None:
+        drop_upload(kind)
+        continue
+    try:
+        # parsed once per file; reruns reuse the session copy
+        register_upload(kind, f)
+        received = True
+    except ValueError as e:
+        drop_upload(kind)
+        st.error(str(e))
 
-session_overrides = {}
-if acs_file: session_overrides["acs"] = pd.read_csv(acs_file)
-if redfin_file: session_overrides["redfin"] = pd.read_csv(redfin_file)
-if cpi_file: session_overrides["cpi"] = pd.read_csv(cpi_file)
+if received:
+    st.success("Uploads validated. Other pages now use them for this session.")
+    st.caption(f"Redfin uploads are kept as county x month aggregates; at most {MAX_SESSION_MB} MB per session.")
+    st.dataframe(upload_info(), hide_index=True)
 
-if session_overrides:
-    st.session_state["overrides"] = session_overrides
-    st.success("Uploads received. Navigate to other pages to use them.")
+st.markdown("#### Derived-frame cache")
+st.caption("ratio_df, cpi_wide and redfin_yearly are built once per data version and shared across pages and sessions.")
+st.dataframe(derived_stats(), hide_index=True)
+
+st.markdown("#### Memory")
+st.caption("Frames are stored with categorical keys, int16/int8 year and month, and float32 measures.")
+report = memory_report(load_data("auto"))
+st.dataframe(report, hide_index=True)
+st.caption(f"Total: {report['MB'].sum():,.2f} MB")
+
+st.markdown("#### Local snapshots")
+st.caption("Arrow files written after each warehouse load; reused while the warehouse is unchanged.")
+st.dataframe(snapshot_info(), hide_index=True)
+if st.button("Delete local snapshots"):
+    clear_snapshots()
+    st.success("Snapshots deleted; the next load re-queries the warehouse.")
+
+st.markdown("#### Precomputed artefacts")
+st.caption("Built offline by `python precompute.py`; opened for the matching data version instead of computed here.")
+st.dataframe(artefact_info(), hide_index=True)
 
 if st.button("Clear Streamlit cache"):
     st.cache_data.clear()
+    clear_derived()
+    clear_catalogs()
+    refresher.clear()
     st.success("Cache cleared.")
@@ -0,0 +1,41 @@
+import streamlit as st
+from lib import tracing
+
+st.title("⏱️ Performance — Stage Traces")
+
+st.markdown("Wall time, rows and frame memory of each pipeline stage, from the last "
+            f"{tracing.RING_SIZE:,} traced calls in this process (lib/tracing.py).")
+
+c1, c2 = st.columns(2)
+enabled = c1.toggle("Tracing enabled", value=tracing.ENABLED)
+trace_file = c2.text_input("JSON-lines file (optional)", value=tracing.TRACE_FILE or "")
+if enabled != tracing.ENABLED or (trace_file or None) != tracing.TRACE_FILE:
+    tracing.set_enabled(enabled, trace_file or None)
+
+df = tracing.recent()
+if df.empty:
+    st.info("No traces yet: open the main page or another page, then come back.")
+    st.stop()
+
+st.markdown("#### Per stage")
+st.caption("p50/p95 over all recorded calls; hit_rate is the share of cached results (load_data, derived frames).")
+st.dataframe(tracing.summary(df), hide_index=True)
+
+# the most recent finished rerun from another page of this session (this page's own run is in progress)
+this_run = tracing.run_id()
+session = this_run.split("-")[0] if this_run else None
+runs = df.loc[df["run"].notna() & (df["run"] != this_run), "run"]
+if session:
+    runs = runs[runs.str.startswith(session)]
+if not runs.empty:
+    last = df[df["run"] == runs.iloc[-1]]
+    st.markdown("#### Last rerun in this session")
+    st.caption(f"{len(last)} stages · {last['ms'].sum():,.0f} ms traced in total (nested stages overlap)")
+    st.dataframe(last.drop(columns=["run"]), hide_index=True)
+
+st.markdown("#### Recent traces")
+st.dataframe(df.tail(200).iloc[::-1], hide_index=True)
+
+if st.button("Clear traces"):
+    tracing.clear()
+    st.success("Trace buffer cleared.")
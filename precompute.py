@@ -0,0 +1,161 @@
+"""
+Offline precompute: rebuild every derived artefact from the raw housing history on all cores,
+so the app only opens files.
+
+    python precompute.py                          # source from secrets (MySQL) or the CSV samples
+    python precompute.py --source sqlite --workers 16
+
+Steps:
+  1. Read the raw sources through lib/data_loader (row-level housing, ACS, CPI, counties) and
+     take the warehouse stamp first, so a change during the build is picked up by the app.
+  2. Partition the housing rows and incomes by state FIPS (the first two digits of county_fips),
+     balanced by row count. Counties never cross states, so each partition's county x month and
+     county x year aggregates and price-to-income ratios are final; a ProcessPoolExecutor runs one
+     task per partition, alongside the CPI pivot.
+  3. Concatenate the partitions into the aggregate-mode load_data result and write it as the
+     Arrow snapshot for (source, "aggregate") with that stamp: load_data then reads it
+     instead of querying the warehouse, and its data version is the one built here.
+  4. Build the per-year affordability maps in parallel (years split across workers, one shared
+     color scale) and write them with the CPI pivot to lib/artefacts under that data version;
+     lib/derived opens them instead of building in the web worker.
+
+ZIP-level MySQL housing arrives already mapped to counties (the raw loader applies the ZIP->county
+crosswalk, lib/crosswalk.py). If no county keys can be derived the run stops before writing
+anything: a county-less snapshot would be trusted by load_data under the live warehouse stamp.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+from lib import data_loader as dl
+from lib.artefacts import write_artefacts
+from lib.snapshot import write_snapshot
+from lib.viz import choropleth_ratio_years
+
+MAP_ZOOM = "auto"     # lib/derived.get_ratio_maps default
+
+# ---------- worker tasks (module level so they pickle under spawn) ----------
+def county_task(redfin: pd.DataFrame, acs: pd.DataFrame) -> tuple:
+    """County x month and county x year price aggregates and price-to-income for one partition."""
+    monthly = dl._monthly_from_rows(redfin)
+    yearly = dl._yearly_from_rows(redfin)
+    return monthly, yearly, dl.compute_price_to_income(acs, monthly, yearly)
+
+def cpi_task(cpi: pd.DataFrame) -> pd.DataFrame:
+    return dl.cpi_pivot(cpi)
+
+def map_task(ratio: pd.DataFrame, counties: pd.DataFrame, years: list, zoom: str) -> dict:
+    """Plotly JSON of the given years' choropleths (serialized here, so the parent only writes)."""
+    figs = choropleth_ratio_years(ratio, counties, zoom, years=years)
+    return {year: pio.to_json(fig, validate=False) for year, fig in figs.items()}
+
+# ---------- partitioning ----------
+def state_partitions(redfin: pd.DataFrame, n: int) -> list[np.ndarray]:
+    """
+    Up to n arrays of state FIPS codes with roughly equal housing row counts (largest states
+    first, each to the currently lightest partition).
+    """
+    counts = pd.Series(_states(redfin["county_fips"])).value_counts()
+    bins, load = [[] for _ in range(min(n, len(counts)))], np.zeros(min(n, len(counts)))
+    for code, rows in counts.items():
+        i = int(load.argmin())
+        bins[i].append(code)
+        load[i] += rows
+    return [np.array(b) for b in bins if b]
+
+def _states(fips: pd.Series) -> np.ndarray:
+    """State FIPS per row; categorical keys are sliced once per category."""
+    if isinstance(fips.dtype, pd.CategoricalDtype):
+        states = fips.cat.categories.astype(str).str.slice(0, 2).to_numpy(object)
+        return np.append(states, None)[fips.cat.codes.to_numpy()]     # code -1 (NA) -> None
+    return fips.astype(str).str.slice(0, 2).to_numpy(object)
+
+def _rows_in(df: pd.DataFrame, states: np.ndarray) -> pd.DataFrame:
+    return df[np.isin(_states(df["county_fips"]), states)]
+
+def _sorted(df: pd.DataFrame, keys: list) -> pd.DataFrame:
+    # partition order depends on the worker count; sorting keeps the data version independent of it
+    keys = [k for k in keys if k in df.columns]
+    return df.sort_values(keys, ignore_index=True) if keys else df.reset_index(drop=True)
+
+# ---------- build ----------
+def precompute(source: str = "auto", workers: int | None = None, zoom: str = MAP_ZOOM) -> dict:
+    """Run the full rebuild; returns per-stage seconds plus the data version and partition count."""
+    if source == "auto":
+        source = "mysql" if dl.secrets_has_mysql() else "csv"
+    workers = workers or os.cpu_count() or 1
+    timings, t_all = {}, time.perf_counter()
+
+    t0 = time.perf_counter()
+    stamp = dl.warehouse_stamp(source)
+    raw = dl._normalize(dl._LOADERS[source]("raw"))
+    redfin, acs = raw["redfin"], raw["acs"]
+    if "county_fips" not in redfin.columns or not redfin["county_fips"].notna().any():
+        raise RuntimeError(f"{source} housing has no county_fips and no ZIP->county crosswalk; "
+                           "nothing precomputed.")
+    timings["load raw"] = time.perf_counter() - t0
+
+    # spawn: workers start clean instead of inheriting the loader's engine pools and threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        t0 = time.perf_counter()
+        cpi_future = pool.submit(cpi_task, raw["cpi"])
+        parts = state_partitions(redfin, workers)
+        futures = [pool.submit(county_task, _rows_in(redfin, p), _rows_in(acs, p)) for p in parts]
+        results = [f.result() for f in futures]
+        del raw["redfin"], redfin
+        monthly, yearly, ratio = (pd.concat([r[i] for r in results], ignore_index=True) for i in range(3))
+        if ratio.empty:
+            raise RuntimeError("No county matched an ACS income; snapshot and artefacts not written.")
+        timings["county aggregation + ratio"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        data = {"acs": acs, "redfin": _sorted(monthly, ["county_fips", "period"]), "cpi": raw["cpi"],
+                "counties": raw["counties"], "redfin_yearly": _sorted(yearly, ["county_fips", "year"]),
+                "price_to_income": _sorted(ratio, ["county_fips", "year"])}
+        data = dl._normalize(data)
+        write_snapshot(source, "aggregate", data, stamp)
+        timings["snapshot"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        ratio = data["price_to_income"]
+        years = sorted(int(y) for y in ratio["year"].unique())
+        chunks = [c.tolist() for c in np.array_split(years, min(workers, len(years))) if len(c)] if years else []
+        map_futures = [pool.submit(map_task, ratio, data["counties"], c, zoom) for c in chunks]
+        maps = {}
+        for f in map_futures:
+            maps.update(f.result())
+        cpi_wide = cpi_future.result()
+        timings["maps + cpi pivot"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    write_artefacts(data["version"], {"cpi_wide": cpi_wide}, {f"ratio_maps:{zoom}": maps},
+                    {"source": source, "seconds": round(t0 - t_all, 3), "workers": workers,
+                     "partitions": len(parts)})
+    timings["write artefacts"] = time.perf_counter() - t0
+    timings["total"] = time.perf_counter() - t_all
+    return {"source": source, "version": data["version"], "partitions": len(parts), "workers": workers,
+            "timings": timings}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute load_data snapshots and derived artefacts on all cores.")
+    parser.add_argument("--source", default="auto", choices=["auto", "csv", "sqlite", "mysql"])
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--zoom", default=MAP_ZOOM, help="map geometry detail (lib/geo.ZOOM_LEVELS or auto)")
+    args = parser.parse_args(argv)
+    try:
+        out = precompute(args.source, args.workers, args.zoom)
+    except RuntimeError as e:
+        parser.exit(1, f"precompute: {e}\n")
+    print(f"{out['source']}: data version {out['version']}, {out['partitions']} state partition(s) "
+          f"on {out['workers']} worker(s)")
+    for stage, seconds in out["timings"].items():
+        print(f"  {stage:<28} {seconds:8.2f}s")
+
+if __name__ == "__main__":
+    main()